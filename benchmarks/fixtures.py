@@ -0,0 +1,127 @@
+##Written by kelseykm
+
+""" Pages shaped like the ones each site serves, for benchmarking without network access """
+
+import random
+
+#chrome around the content every site page has: menus, sidebars, comments and scripts
+def _page(title: str, content: str, noise: int = 200) -> bytes:
+    rand = random.Random(title)
+    menu = ''.join(f'<li class="menu-item"><a href="/category/{i}">Category {i}</a></li>' for i in range(40))
+    sidebar = ''.join(
+        f'<div class="widget"><h4>Popular {i}</h4><p>{"lorem ipsum dolor sit amet " * rand.randint(2, 8)}</p>'
+        f'<img src="/img/{i}.jpg" alt="poster {i}"></div>'
+        for i in range(noise // 4)
+    )
+    comments = ''.join(
+        f'<div class="comment" id="c{i}"><span class="author">user{i}</span>'
+        f'<p>{"great show, thanks for the upload " * rand.randint(1, 6)}</p></div>'
+        for i in range(noise)
+    )
+    scripts = ''.join(f'<script>var ad{i} = {{"slot": {i}, "size": [300, 250]}};</script>' for i in range(30))
+    return (
+        f'<!DOCTYPE html><html><head><title>{title}</title>{scripts}</head><body>'
+        f'<header><nav><ul>{menu}</ul></nav></header>'
+        f'<main><div class="container"><div class="content">{content}</div>'
+        f'<aside class="sidebar">{sidebar}</aside></div>'
+        f'<section class="comments">{comments}</section></main>'
+        f'<footer><p>Copyright</p></footer></body></html>'
+    ).encode()
+
+def netnaija_series(base: str, seasons: int) -> bytes:
+    """ A netnaija series page listing its seasons """
+    content = ''.join(f'<div class="season"><a href="{base}/season-{s}">Season {s}</a></div>' for s in range(1, seasons + 1))
+    return _page('NetNaija series', content)
+
+def netnaija_season(base: str, season: int, episodes: int) -> bytes:
+    """ A netnaija season page listing its episodes """
+    content = ''.join(
+        f'<article class="file-one"><div class="info"><h2><a href="{base}/season-{season}/episode-{e}">'
+        f'Season {season} Episode {e}</a></h2></div></article>'
+        for e in range(1, episodes + 1)
+    )
+    return _page(f'NetNaija season {season}', content)
+
+def netnaija_search(base: str, series: str, results: int) -> bytes:
+    """ A netnaija search results page """
+    content = ''.join(
+        f'<article class="result"><div class="info"><h3><a href="{base}/videos/series/{i}-{series}/season-{i % 9 + 1}">'
+        f'{series} Season {i % 9 + 1}</a></h3></div></article>'
+        for i in range(results)
+    )
+    return _page('NetNaija search', content)
+
+def netnaija_listing(base: str, page: int, pages: int, per_page: int) -> bytes:
+    """ A page of netnaija's series listing, newest first, empty past the last page """
+    first = (page - 1) * per_page
+    content = ''.join(
+        f'<article class="result"><div class="info"><h3><a href="{base}/videos/series/{i}-show-{i}/season-{i % 9 + 1}">'
+        f'Show {i} Season {i % 9 + 1}</a></h3></div></article>'
+        for i in range(first, first + per_page)
+    ) if page <= pages else ''
+    return _page('NetNaija series', content)
+
+def lightdl_post(seasons: int, episodes: int) -> bytes:
+    """ A lightdl post listing the episodes of every season """
+    content = ''.join(
+        f'<p><a href="https://files.example.com/lightdl/show.S{s:02d}E{e:02d}.mkv">show S{s:02d}E{e:02d}</a></p>'
+        for s in range(1, seasons + 1) for e in range(1, episodes + 1)
+    )
+    return _page('LightDL post', content)
+
+def lightdl_search(base: str, series: str, results: int) -> bytes:
+    """ A lightdl search results page """
+    content = ''.join(
+        f'<div class="post"><h3 class="post-title"><a href="{base}/{i}/{series}.html" title="{series}">{series}</a></h3>'
+        f'<div class="post-body">{"episode notes " * 20}</div></div>'
+        for i in range(results)
+    )
+    return _page('LightDL search', content)
+
+def lightdl_listing(base: str, page: int, pages: int, per_page: int) -> bytes:
+    """ A page of lightdl's post listing, newest first, empty past the last page """
+    first = (page - 1) * per_page
+    content = ''.join(
+        f'<div class="post"><h3 class="post-title"><a href="{base}/{i}/show-{i}.html" title="Show {i}">Show {i}</a></h3>'
+        f'<div class="post-body">{"episode notes " * 20}</div></div>'
+        for i in range(first, first + per_page)
+    ) if page <= pages else ''
+    return _page('LightDL posts', content)
+
+def o2tvseries_series(base: str, seasons: int) -> bytes:
+    """ An o2tvseries series page listing its seasons """
+    content = ''.join(f'<div class="data"><a href="{base}/Season-{s:02d}/index.html">Season {s:02d}</a></div>' for s in range(1, seasons + 1))
+    return _page('O2tvSeries series', content)
+
+def o2tvseries_season(base: str, season: int, page: int, pages: int, per_page: int) -> bytes:
+    """ A page of an o2tvseries season listing some of its episodes """
+    first = (page - 1) * per_page + 1
+    content = ''.join(
+        f'<div class="data"><a href="{base}/Season-{season:02d}/Episode-{e:02d}/index.html">Episode {e:02d}</a></div>'
+        for e in range(first, first + per_page)
+    )
+    pagination = ''.join(
+        f'<a href="{base}/Season-{season:02d}/page{p}.html">{p}</a>' for p in range(2, pages + 1)
+    ) if pages > 1 else ''
+    return _page(f'O2tvSeries season {season}', content + f'<div class="pagination">{pagination}</div>')
+
+def o2tvseries_episode(base: str, season: int, episode: int) -> bytes:
+    """ An o2tvseries episode page with its download qualities """
+    content = (
+        f'<div class="data"><a href="{base}/download/{season}/{episode}/mp4">Click to Download Episode {episode:02d} in Mp4 Format</a></div>'
+        f'<div class="data"><a href="{base}/download/{season}/{episode}/hd">Click to Download Episode {episode:02d} in HD Mp4 Format</a></div>'
+    )
+    return _page(f'O2tvSeries episode {episode}', content)
+
+def sabishare_file(file_id: str = '') -> bytes:
+    """ A sabishare file page whose download button asks for the link over xhr """
+    endpoint = f'/api/download/{file_id}' if file_id else '/api/download'
+    return _page('Sabishare file', f'<button class="download" data-href="{endpoint}">Download</button>', noise=40)
+
+def sabishare_direct(link: str) -> bytes:
+    """ A sabishare file page whose download button points straight at the file """
+    return _page('Sabishare file', f'<a class="download" href="{link}">Download</a>', noise=40)
+
+def sabishare_not_found() -> bytes:
+    """ A sabishare page for a file that no longer exists """
+    return _page('404 Not Found', '<p>File not found</p>', noise=0)
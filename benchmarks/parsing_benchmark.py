@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+##Written by kelseykm
+
+""" Compare how fast each parser backend runs each site's extractor, with and without tag-restricted parsing """
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ketter_links import parsing, scraper, search
+from benchmarks import fixtures
+import argparse
+import re
+import time
+from typing import Callable, Optional
+
+BASE = "https://example.com"
+
+#site, page, tags the extractor needs, extractor
+CASES: list[tuple[str, bytes, parsing.Only, Callable[[parsing.Element], list]]] = [
+    (
+        'netnaija season',
+        fixtures.netnaija_season(BASE, 1, 200),
+        scraper.LINK_TAGS,
+        lambda doc: doc.find_all("a", text=re.compile(r'^Season \d Episode (\d{1,6})$')),
+    ),
+    (
+        'lightdl post',
+        fixtures.lightdl_post(10, 24),
+        scraper.LINK_TAGS,
+        lambda doc: doc.find_all("a", text=re.compile(r's0?(\d{1,6})e0?(\d{1,6})', re.I)),
+    ),
+    (
+        'o2tvseries season',
+        fixtures.o2tvseries_season(BASE, 1, 1, 8, 50),
+        scraper.EPISODES_PAGE_TAGS,
+        lambda doc: [ doc.find("div", {"class": "pagination"}), doc.find_all("a", text=re.compile(r'^Episode 0?(\d{1,6})')) ],
+    ),
+    (
+        'o2tvseries episode',
+        fixtures.o2tvseries_episode(BASE, 1, 1),
+        scraper.LINK_TAGS,
+        lambda doc: doc.find("a", text=re.compile(r'^Click to Download Episode \d{1,6}(.+)? in HD Mp4 Format$', re.I)),
+    ),
+    (
+        'netnaija search',
+        fixtures.netnaija_search(BASE, 'show', 20),
+        search.RESULT_TAGS,
+        lambda doc: [ a.get('href') for result in doc.find_all("div", {'class': 'info'}) for a in result.find_all("a") ],
+    ),
+    (
+        'lightdl search',
+        fixtures.lightdl_search(BASE, 'show', 20),
+        search.POST_TAGS,
+        lambda doc: [ h3.find("a", {'title': re.compile(r'^show$', re.I)}) for h3 in doc.find_all("h3") ],
+    ),
+]
+
+def time_case(page: bytes, only: Optional[parsing.Only], backend: str, extractor: Callable, rounds: int) -> float:
+    """ Get the average seconds to parse a page and run its extractor """
+    start = time.perf_counter()
+    for _ in range(rounds):
+        extractor(parsing.parse(page, only=only, backend=backend))
+    return (time.perf_counter() - start) / rounds
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', help='Times to parse each page', type=int, default=20)
+    args = parser.parse_args()
+
+    backends = parsing.available_backends()
+    print(f"{'site':<20}{'backend':<14}{'full (ms)':>12}{'restricted (ms)':>18}{'speedup':>10}")
+    for site, page, only, extractor in CASES:
+        baseline = time_case(page, None, parsing.DEFAULT_BACKEND, extractor, args.rounds)
+        for backend in backends:
+            full = time_case(page, None, backend, extractor, args.rounds)
+            restricted = time_case(page, only, backend, extractor, args.rounds)
+            print(f"{site:<20}{backend:<14}{full * 1000:>12.2f}{restricted * 1000:>18.2f}{baseline / restricted:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
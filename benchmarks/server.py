@@ -0,0 +1,206 @@
+##Written by kelseykm
+
+""" Local stand-in for every site, serving the fixture pages by Host header with a configurable latency """
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+from typing import Any, Optional
+
+from . import fixtures
+
+NETNAIJA = 'www.thenetnaija.com'
+LIGHTDL = 'www.lightdl.xyz'
+O2TVSERIES = 'o2tvseries.com'
+SABISHARE = 'www.sabishare.com'
+FILES = 'files.example.com'
+
+#every host the stand-in serves
+HOSTS = (NETNAIJA, LIGHTDL, O2TVSERIES, SABISHARE, FILES)
+
+class Shape:
+    """ How big the stand-in series are """
+
+    def __init__(self, seasons: int = 3, episodes: int = 20, per_page: int = 10, search_results: int = 20, listing_pages: int = 5) -> None:
+        self.seasons = seasons
+        self.episodes = episodes
+        self.per_page = per_page
+        self.search_results = search_results
+        self.listing_pages = listing_pages
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """ Answers requests for any of the sites from the fixtures """
+
+    protocol_version = 'HTTP/1.1'
+    server: 'StandInServer'
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def send_body(self, body: bytes, content_type: str = 'text/html; charset=utf-8', status: int = 200, headers: Optional[dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def redirect(self, location: str) -> None:
+        self.send_response(302)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.latency)
+        host = (self.headers.get('Host') or '').split(':')[0]
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        shape = self.server.shape
+
+        route = getattr(self, 'route_' + host.replace('.', '_'), None)
+        if route is None or not route(url.path, query, shape):
+            self.send_body(fixtures.sabishare_not_found(), status=404)
+
+    def do_HEAD(self) -> None:
+        self.do_GET()
+
+    def route_www_thenetnaija_com(self, path: str, query: dict[str, list[str]], shape: Shape) -> bool:
+        if path == '/search':
+            series = query.get('t', ['show'])[0]
+            self.send_body(fixtures.netnaija_search(f'https://{NETNAIJA}', series, shape.search_results))
+            return True
+
+        if path.rstrip('/') == '/videos/series':
+            page = int(query.get('page', ['1'])[0])
+            self.send_body(fixtures.netnaija_listing(f'https://{NETNAIJA}', page, shape.listing_pages, shape.search_results))
+            return True
+
+        page = re.match(r'^(/videos/series/[^/]+)(?:/season-(\d+)(?:/episode-(\d+)(/download)?)?)?/?$', path)
+        if not page:
+            return False
+        base, season, episode, download = page.groups()
+        base = f'https://{NETNAIJA}{base}'
+
+        if download:
+            self.redirect(f'https://{SABISHARE}/file/{season}-{episode}')
+        elif episode:
+            return False
+        elif season:
+            self.send_body(fixtures.netnaija_season(base, int(season), shape.episodes))
+        else:
+            self.send_body(fixtures.netnaija_series(base, shape.seasons))
+        return True
+
+    def route_www_sabishare_com(self, path: str, query: dict[str, list[str]], shape: Shape) -> bool:
+        page = re.match(r'^/(file|direct|api/download)/(\d+)-(\d+)$', path)
+        if not page:
+            return False
+        kind, season, episode = page.groups()
+        link = f'https://{FILES}/netnaija/show.S{int(season):02d}E{int(episode):02d}.mp4'
+
+        if kind == 'file':
+            self.send_body(fixtures.sabishare_file(f'{season}-{episode}'))
+        elif kind == 'direct':
+            self.send_body(fixtures.sabishare_direct(link))
+        else:
+            self.send_body(json.dumps({'url': link}).encode(), 'application/json')
+        return True
+
+    def route_www_lightdl_xyz(self, path: str, query: dict[str, list[str]], shape: Shape) -> bool:
+        if path == '/search' and 'q' not in query:
+            page = int(query.get('start', ['0'])[0]) // shape.search_results + 1
+            self.send_body(fixtures.lightdl_listing(f'https://{LIGHTDL}', page, shape.listing_pages, shape.search_results))
+            return True
+
+        if path == '/search':
+            series = query['q'][0]
+            self.send_body(fixtures.lightdl_search(f'https://{LIGHTDL}', series, shape.search_results))
+            return True
+
+        if not path.endswith('.html'):
+            return False
+        self.send_body(fixtures.lightdl_post(shape.seasons, shape.episodes))
+        return True
+
+    def route_o2tvseries_com(self, path: str, query: dict[str, list[str]], shape: Shape) -> bool:
+        download = re.match(r'^/download/(\d+)/(\d+)/(hd|mp4)$', path)
+        if download:
+            season, episode, quality = download.groups()
+            self.redirect(f'https://{FILES}/o2tvseries/show.S{int(season):02d}E{int(episode):02d}.{quality}.mp4')
+            return True
+
+        page = re.match(r'^(/[^/]+)(?:/Season-(\d+)(?:/Episode-(\d+))?)?/(index|page(\d+))\.html$', path)
+        if not page:
+            return False
+        base, season, episode, _, page_number = page.groups()
+        base = f'https://{O2TVSERIES}{base}'
+        pages = -(-shape.episodes // shape.per_page)
+
+        if episode:
+            self.send_body(fixtures.o2tvseries_episode(f'https://{O2TVSERIES}', int(season), int(episode)))
+        elif season:
+            self.send_body(fixtures.o2tvseries_season(base, int(season), int(page_number or 1), pages, shape.per_page))
+        else:
+            self.send_body(fixtures.o2tvseries_series(base, shape.seasons))
+        return True
+
+    def route_files_example_com(self, path: str, query: dict[str, list[str]], shape: Shape) -> bool:
+        body = b'\0' * 1024
+        byte_range = re.match(r'^bytes=(\d+)-(\d+)$', self.headers.get('Range', ''))
+        if byte_range:
+            start, end = int(byte_range.group(1)), min(int(byte_range.group(2)), len(body) - 1)
+            self.send_body(body[start:end + 1], 'video/mp4', 206, {'Content-Range': f'bytes {start}-{end}/{len(body)}'})
+        else:
+            self.send_body(body, 'video/mp4', headers={'Accept-Ranges': 'bytes'})
+        return True
+
+class StandInServer(ThreadingHTTPServer):
+    """ Stand-in server for every site, answering each request after latency seconds """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, shape: Optional[Shape] = None, address: tuple[str, int] = ('127.0.0.1', 0)) -> None:
+        super().__init__(address, StandInHandler)
+        self.latency = latency
+        self.shape = shape or Shape()
+        self._thread: Optional[threading.Thread] = None
+
+    def handle_error(self, request: Any, client_address: tuple[str, int]) -> None:
+        #clients drop connections whose bodies they do not read, like the resolvers do with files
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def origin(self) -> str:
+        """ The url the sites are served from """
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def origins(self) -> dict[str, str]:
+        """ The origin of every site, to route a transport to the stand-in """
+        return { host: self.origin for host in HOSTS }
+
+    def start(self) -> 'StandInServer':
+        """ Serve in a background thread """
+        self._thread = threading.Thread(target=self.serve_forever, name='stand-in', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """ Stop serving """
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+##Written by kelseykm
+
+""" Scrape and search every site end to end against a local stand-in server, reporting throughput, latency and memory """
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ketter_links import cache, index, parsing, ratelimit, scheduler, sites, transport, verify
+from ketter_links.selection import Selection
+from benchmarks.server import LIGHTDL, NETNAIJA, O2TVSERIES, Shape, StandInServer
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+import argparse
+import json
+import multiprocessing
+import resource
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Iterable
+
+SERIES = 'show'
+
+#case, how to run it against the stand-in, returning the links it got
+CASES: dict[str, Callable[[scheduler.Scheduler], Iterable[Any]]] = {
+    'netnaija scrape': lambda sched: sites.get_site(NETNAIJA).load().scrape(
+        urlparse('https://www.thenetnaija.com/videos/series/1-show'), Selection.everything(), Selection.everything(), sched
+    ),
+    'lightdl scrape': lambda sched: sites.get_site(LIGHTDL).load().scrape(
+        urlparse('https://www.lightdl.xyz/2021/01/show.html'), Selection.everything(), Selection.everything(), sched
+    ),
+    'lightdl verify': lambda sched: sites.get_site(LIGHTDL).load().scrape(
+        urlparse('https://www.lightdl.xyz/2021/01/show.html'), Selection.everything(), Selection.everything(), sched
+    ),
+    'o2tvseries scrape': lambda sched: sites.get_site(O2TVSERIES).load().scrape(
+        urlparse('https://o2tvseries.com/Show/index.html'), Selection.everything(), Selection.everything(), sched
+    ),
+    'netnaija verify': lambda sched: sites.get_site(NETNAIJA).load().scrape(
+        urlparse('https://www.thenetnaija.com/videos/series/1-show'), Selection.everything(), Selection.everything(), sched
+    ),
+    'netnaija search': lambda sched: sites.get_site(NETNAIJA).load().search(SERIES) or [],
+    'lightdl search': lambda sched: sites.get_site(LIGHTDL).load().search(SERIES) or [],
+    'netnaija index': lambda sched: indexed_search(NETNAIJA, f'{SERIES} 7 season 8'),
+    'lightdl index': lambda sched: indexed_search(LIGHTDL, f'{SERIES} 42'),
+}
+
+def indexed_search(netloc: str, search_string: str) -> Iterable[Any]:
+    """ Build a site's title index from its listing, then search it from the index """
+    plugin = sites.get_site(netloc).load()
+    plugin.refresh_index()
+    return plugin.search(search_string) or []
+
+def percentile(values: list[float], percent: int) -> float:
+    """ Get the value below which percent of values fall """
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
+
+def run_case(case: str, origins: dict[str, str], backend: str, rate: float, processes: int = 0) -> dict[str, Any]:
+    """ Run a case in this process against the stand-in at origins and measure it """
+    parsing.configure(backend, processes=processes)
+    cache.configure(enabled=False)
+    #pace as fast as the stand-in answers, so the crawl engine is what gets measured
+    ratelimit.configure(rate=rate)
+    transport.configure(origins=origins, dns_ttl=0)
+    #live searches are measured live, index cases build their own index
+    temporary = tempfile.TemporaryDirectory()
+    index.configure(enabled=case.endswith(' index'), path=os.path.join(temporary.name, 'titles.sqlite3'))
+    verify.configure(enabled=case.endswith(' verify'))
+
+    start = time.perf_counter()
+    with scheduler.Scheduler() as sched:
+        links = sum(1 for _ in CASES[case](sched))
+    elapsed = time.perf_counter() - start
+    parsing.close()
+
+    stats = transport.get_transport().stats()
+    latencies = [ latency for host_latencies in transport.get_transport().latencies().values() for latency in host_latencies ]
+    pages = sum(host_stats['requests'] for host_stats in stats.values())
+    return {
+        'case': case,
+        'seconds': elapsed,
+        'pages': pages,
+        'links': links,
+        'bytes': sum(host_stats['bytes'] for host_stats in stats.values()),
+        'pages_per_second': pages / elapsed,
+        'links_per_second': links / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        #kilobytes on linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', help='Milliseconds the stand-in waits before answering each request', type=float, default=50)
+    parser.add_argument('--seasons', help='Seasons of each stand-in series', type=int, default=3)
+    parser.add_argument('--episodes', help='Episodes of each stand-in season', type=int, default=20)
+    parser.add_argument('--per-page', help='Episodes on each o2tvseries season page', type=int, default=10)
+    parser.add_argument('--cases', help='Cases to run', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--parser', help='Parser backend to parse pages with', choices=parsing.available_backends(), default=parsing.DEFAULT_BACKEND)
+    parser.add_argument('--parse-processes', help='Processes to extract links from pages in', type=int, default=0)
+    parser.add_argument('--rate', help='Requests per second to each site', type=float, default=1000)
+    parser.add_argument('--json', help='Print the results as json lines', action='store_true')
+    args = parser.parse_args()
+
+    shape = Shape(seasons=args.seasons, episodes=args.episodes, per_page=args.per_page)
+    results = []
+    with StandInServer(latency=args.latency / 1000, shape=shape) as server:
+        for case in args.cases:
+            #a fresh process per case, so peak rss is the case's own
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                results.append(executor.submit(run_case, case, server.origins, args.parser, args.rate, args.parse_processes).result())
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    print(f"{'case':<20}{'pages':>7}{'links':>7}{'seconds':>9}{'pages/s':>9}{'links/s':>9}{'p50 (ms)':>10}{'p95 (ms)':>10}{'rss (MB)':>10}")
+    for result in results:
+        print(
+            f"{result['case']:<20}{result['pages']:>7}{result['links']:>7}{result['seconds']:>9.2f}"
+            f"{result['pages_per_second']:>9.1f}{result['links_per_second']:>9.1f}"
+            f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['peak_rss_mb']:>10.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+##Written by kelseykm
+
+import requests
+from requests.structures import CaseInsensitiveDict
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+from typing import Any, Optional
+
+from . import metrics
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')), 'ketter_links')
+
+#headers describing the body as sent on the wire, which no longer apply to the decoded body that is stored
+_WIRE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+class ResponseCache:
+    """ SQLite-backed store of responses, evicting least recently used responses past a size cap """
+
+    MAX_SIZE = 200 * 1024 * 1024 #bytes of response bodies kept
+    DEFAULT_TTL = 60 * 60 #seconds a response is used without revalidating it
+
+    #seconds a response is used without revalidating it, per site
+    SITE_TTLS = {
+        'www.thenetnaija.com': 6 * 60 * 60,
+        'www.lightdl.xyz': 60 * 60,
+        'o2tvseries.com': 6 * 60 * 60,
+    }
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_size: int = MAX_SIZE) -> None:
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'responses.sqlite3')
+        self.max_size = max_size
+
+        logger.debug("Opening response cache at %s", self.path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                final_url TEXT,
+                status_code INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                content BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        #caches from before the url a request was redirected to was stored
+        if 'final_url' not in [ column[1] for column in self._conn.execute("PRAGMA table_info(responses)") ]:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN final_url TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+
+    def ttl(self, url: str) -> int:
+        """ Get the seconds a response for url stays fresh """
+        return self.SITE_TTLS.get(urlparse(url).netloc, self.DEFAULT_TTL)
+
+    def get(self, url: str) -> Optional[dict[str, Any]]:
+        """ Get the stored response for url """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT final_url, status_code, headers, content, stored_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return
+
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+        final_url, status_code, headers, content, stored_at = row
+        return {
+            'url': url,
+            'final_url': final_url or url,
+            'status_code': status_code,
+            'headers': CaseInsensitiveDict(json.loads(headers)),
+            'content': content,
+            'stored_at': stored_at,
+        }
+
+    def is_fresh(self, entry: dict[str, Any]) -> bool:
+        """ Check whether a stored response can be used without revalidating it """
+        return time.time() - entry['stored_at'] < self.ttl(entry['url'])
+
+    def store(self, url: str, resp: requests.models.Response) -> None:
+        """ Store a response for url, with the url it was redirected to """
+        headers = { k: v for k, v in resp.headers.items() if k.lower() not in _WIRE_HEADERS }
+        content = resp.content
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "REPLACE INTO responses (url, final_url, status_code, headers, content, size, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, resp.url or url, resp.status_code, json.dumps(headers), content, len(content), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, url: str) -> None:
+        """ Mark the stored response for url as fresh after the server confirmed it is unchanged """
+        with self._lock:
+            now = time.time()
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """ Delete least recently used responses until the cache fits its size cap """
+        total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self.max_size:
+            return
+
+        logger.debug("Evicting responses from cache, %s bytes over cap", total_size - self.max_size)
+        for url, size in self._conn.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total_size -= size
+            if total_size <= self.max_size:
+                break
+
+    def close(self) -> None:
+        """ Close the cache database """
+        with self._lock:
+            self._conn.close()
+
+def _response_from_entry(entry: dict[str, Any]) -> requests.models.Response:
+    """ Build a response object from a stored response """
+    resp = requests.models.Response()
+    #the url after redirects, which relative links on the page are resolved against
+    resp.url = entry['final_url']
+    resp.status_code = entry['status_code']
+    resp.reason = 'OK'
+    resp.headers = CaseInsensitiveDict(entry['headers'])
+    resp._content = entry['content']
+    resp._content_consumed = True
+    resp.from_cache = True
+    return resp
+
+#headers of requests that must be answered by the site itself, not from the cache
+BYPASS_HEADERS = ('Range', 'Cache-Control', 'If-None-Match', 'If-Modified-Since')
+
+class CachedSession(requests.Session):
+    """ Requests session that answers GETs from the response cache and revalidates stale responses """
+
+    def __init__(self, cache: Optional[ResponseCache] = None) -> None:
+        super().__init__()
+        self.cache = cache if cache is not None else get_cache()
+
+    def request(self, method: str, url: str, *args: Any, **kwargs: Any) -> requests.models.Response:
+        if (
+                self.cache is None
+                or method.upper() != 'GET'
+                or args
+                or any(header in (kwargs.get('headers') or {}) for header in BYPASS_HEADERS)
+                or not kwargs.get('allow_redirects', True)
+           ):
+            return super().request(method, url, *args, **kwargs)
+
+        key = requests.Request('GET', url, params=kwargs.get('params')).prepare().url
+        entry = self.cache.get(key)
+        if entry and self.cache.is_fresh(entry):
+            logger.debug("Cache hit for %s", key)
+            metrics.count('cache_hits')
+            return _response_from_entry(entry)
+
+        if entry:
+            logger.debug("Revalidating cached response for %s", key)
+            headers = dict(kwargs.get('headers') or {})
+            if 'ETag' in entry['headers']:
+                headers['If-None-Match'] = entry['headers']['ETag']
+            if 'Last-Modified' in entry['headers']:
+                headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+            kwargs['headers'] = headers
+
+        resp = super().request(method, url, **kwargs)
+
+        if resp.status_code == 304 and entry:
+            logger.debug("Cached response for %s not modified", key)
+            metrics.count('cache_revalidations')
+            resp.close()
+            self.cache.refresh(key)
+            return _response_from_entry(entry)
+
+        metrics.count('cache_misses')
+        #streamed bodies may be closed before they are read in full, so only whole bodies are stored
+        if not kwargs.get('stream') and resp.status_code == 200 and 'no-store' not in resp.headers.get('Cache-Control', ''):
+            self.cache.store(key, resp)
+
+        return resp
+
+_cache: Optional[ResponseCache] = None
+_cache_enabled = True
+_cache_dir = DEFAULT_CACHE_DIR
+_cache_lock = threading.Lock()
+
+def configure(enabled: bool = True, cache_dir: Optional[str] = None) -> None:
+    """ Configure the cache shared by all site classes """
+    global _cache, _cache_enabled, _cache_dir
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+        _cache_enabled = enabled
+        _cache_dir = cache_dir or DEFAULT_CACHE_DIR
+
+def get_cache() -> Optional[ResponseCache]:
+    """ Get the cache shared by all site classes, or None if caching is disabled """
+    global _cache, _cache_enabled
+    with _cache_lock:
+        if _cache_enabled and _cache is None:
+            try:
+                _cache = ResponseCache(_cache_dir)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Could not open response cache, caching disabled: %s", e)
+                _cache_enabled = False
+        return _cache
@@ -0,0 +1,93 @@
+##Written by kelseykm
+
+from concurrent.futures import ThreadPoolExecutor
+import collections
+import threading
+import logging
+from urllib.parse import urlparse
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+R = TypeVar('R')
+
+class Crawler:
+    """ Bounded thread pool for fetching pages concurrently, capped per host """
+
+    MAX_WORKERS = 16 #total number of fetches in flight
+    MAX_PER_HOST = 8 #number of fetches in flight to a single host, the rate limiter ramps up to it while the host is healthy
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_per_host: int = MAX_PER_HOST) -> None:
+        logger.debug("Creating crawler thread pool")
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='crawler')
+
+        self._host_limits: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def host_limit(self, url: str) -> threading.BoundedSemaphore:
+        """ Get the semaphore capping concurrent fetches to the url's host """
+        netloc = urlparse(url).netloc
+        with self._lock:
+            if netloc not in self._host_limits:
+                logger.debug("Creating host limit for %s", netloc)
+                self._host_limits[netloc] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[netloc]
+
+    def fetch(self, func: Callable[..., R], url: str, *args: Any) -> R:
+        """ Call func on url while holding a slot for the url's host """
+        self._local.in_worker = True
+        with self.host_limit(url):
+            return func(url, *args)
+
+    def map(self, func: Callable[..., R], urls: Iterable[str], *args: Any) -> list[R]:
+        """ Call func on every url concurrently and return the results in the order of urls """
+        urls = list(urls)
+
+        #a worker waiting on futures queued behind it could starve the pool, so run nested maps inline
+        if getattr(self._local, 'in_worker', False) or len(urls) < 2:
+            logger.debug("Fetching %s urls inline", len(urls))
+            return [ func(url, *args) for url in urls ]
+
+        logger.debug("Fetching %s urls concurrently", len(urls))
+        futures = [ self.executor.submit(self.fetch, func, url, *args) for url in urls ]
+        return [ future.result() for future in futures ]
+
+    def imap(self, func: Callable[..., R], urls: Iterable[str], *args: Any) -> Iterator[R]:
+        """ Call func on urls concurrently as they come, yielding the results in the order of urls as soon as they are ready """
+
+        if getattr(self._local, 'in_worker', False):
+            for url in urls:
+                yield func(url, *args)
+            return
+
+        #only pull a bounded number of urls ahead of the results, so urls can themselves be produced lazily
+        window = collections.deque()
+        for url in urls:
+            window.append(self.executor.submit(self.fetch, func, url, *args))
+            while window and (window[0].done() or len(window) >= self.max_workers * 2):
+                yield window.popleft().result()
+
+        while window:
+            yield window.popleft().result()
+
+    def close(self) -> None:
+        """ Shut down the thread pool """
+        logger.debug("Shutting down crawler thread pool")
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'Crawler':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
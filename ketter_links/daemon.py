@@ -0,0 +1,258 @@
+##Written by kelseykm
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hmac
+import http.client
+import ipaddress
+import json
+import logging
+import os
+import socket
+import socketserver
+from urllib.parse import urlparse
+from typing import Any, Callable, Iterator, Optional, Union
+
+from . import metrics
+from .exceptions import DaemonError, InvalidInput, UnimplementedSite
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+#unix socket the daemon listens on, unless given a localhost http address
+DEFAULT_ADDRESS = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')), 'ketter_links', 'daemon.sock')
+
+#environment variable holding the secret clients must send in TOKEN_HEADER, if the daemon was started with one
+TOKEN_ENV = 'KETTER_LINKS_TOKEN'
+TOKEN_HEADER = 'X-Ketter-Links-Token'
+
+#a job takes the request a client sent and returns the messages to stream back, raising InvalidInput or UnimplementedSite before streaming if the request is bad
+Job = Callable[[dict[str, Any]], Iterator[dict[str, Any]]]
+
+def is_http_address(address: str) -> bool:
+    """ Check whether address is an http url rather than the path of a unix socket """
+    return address.startswith('http://')
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """ Answers clients of the daemon, streaming each job's messages back as json lines """
+
+    server: Union['HTTPDaemonServer', 'UnixDaemonServer']
+
+    def log_message(self, format: str, *args: Any) -> None:
+        #unix socket clients have no address to log
+        logger.debug(format, *args)
+
+    def send_json(self, message: dict[str, Any], status: int = 200) -> None:
+        body = json.dumps(message).encode() + b'\n'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path == '/health':
+            self.send_json({'ok': True})
+        elif self.path == '/metrics':
+            body = metrics.get_metrics().to_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_json({'error': f"Unknown path {self.path}"}, status=404)
+
+    def do_POST(self) -> None:
+        token = self.server.token
+        if token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, '').encode(), token.encode()):
+            logger.warning("Refused %s request without the daemon's token", self.path)
+            self.send_json({'error': 'Missing or wrong token'}, status=401)
+            return
+
+        job = self.server.jobs.get(self.path.strip('/'))
+        if job is None:
+            self.send_json({'error': f"Unknown job {self.path}"}, status=404)
+            return
+
+        #web pages can post forms and plain text to a localhost daemon without asking it first, but not json
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self.send_json({'error': 'Requests must be application/json'}, status=415)
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            if not isinstance(request, dict):
+                raise InvalidInput('Request must be a json object')
+            messages = job(request)
+        except (ValueError, InvalidInput, UnimplementedSite) as e:
+            logger.warning("Bad %s request: %s", self.path, e)
+            self.send_json({'error': str(e)}, status=400)
+            return
+
+        logger.debug("Streaming %s job", self.path)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        try:
+            for message in messages:
+                self.wfile.write(json.dumps(message).encode() + b'\n')
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info("Client of %s job went away", self.path)
+        except Exception as e:
+            logger.error("%s job failed: %s", self.path, e)
+            try:
+                self.wfile.write(json.dumps({'error': str(e)}).encode() + b'\n')
+            except OSError:
+                pass
+        finally:
+            #stop the job's scrapes if the client went away early
+            close = getattr(messages, 'close', None)
+            if close is not None:
+                close()
+
+class HTTPDaemonServer(ThreadingHTTPServer):
+    """ Daemon listening on localhost over http """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], jobs: dict[str, Job], token: Optional[str] = None) -> None:
+        self.jobs = jobs
+        self.token = token
+        super().__init__(address, DaemonHandler)
+
+    def close(self) -> None:
+        """ Stop listening """
+        self.server_close()
+
+class UnixDaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ Daemon listening on a unix socket only its user can connect to """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, jobs: dict[str, Job], token: Optional[str] = None) -> None:
+        self.jobs = jobs
+        self.token = token
+        self.path = path
+        super().__init__(path, DaemonHandler)
+
+    def server_bind(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(self.path):
+            #a socket left behind by a daemon that did not shut down cleanly is removed, a live one is not
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                logger.debug("Removing stale socket %s", self.path)
+                os.remove(self.path)
+            else:
+                raise DaemonError(f"A daemon is already listening on {self.path}")
+            finally:
+                probe.close()
+
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+    def close(self) -> None:
+        """ Stop listening and remove the socket """
+        self.server_close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def make_server(address: str, jobs: dict[str, Job], token: Optional[str] = None) -> Union[HTTPDaemonServer, UnixDaemonServer]:
+    """ Create a daemon listening on address, a unix socket path or a localhost http url, that runs jobs by name for clients sending token """
+    if token is None:
+        token = os.environ.get(TOKEN_ENV) or None
+
+    if not is_http_address(address):
+        logger.debug("Listening on unix socket %s", address)
+        return UnixDaemonServer(address, jobs, token=token)
+
+    url = urlparse(address)
+    if url.hostname is None or url.port is None:
+        raise ValueError(f"Daemon address {address} needs a host and a port")
+    if url.hostname != 'localhost' and not ipaddress.ip_address(url.hostname).is_loopback:
+        raise ValueError("Daemon only listens on localhost")
+
+    logger.debug("Listening on %s", address)
+    return HTTPDaemonServer((url.hostname, url.port), jobs, token=token)
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """ Http connection over a unix socket """
+
+    def __init__(self, path: str, timeout: Optional[float] = None) -> None:
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+class Client:
+    """ Sends jobs to a daemon, yielding its messages as they stream back """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: Optional[float] = None, token: Optional[str] = None) -> None:
+        self.address = address
+        self.timeout = timeout
+        self.token = token if token is not None else os.environ.get(TOKEN_ENV) or None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if not is_http_address(self.address):
+            return UnixHTTPConnection(self.address, timeout=self.timeout)
+        url = urlparse(self.address)
+        return http.client.HTTPConnection(url.hostname, url.port, timeout=self.timeout)
+
+    def run(self, job: str, request: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        """ Run a job on the daemon, yielding each message it streams back """
+        connection = self._connection()
+        try:
+            try:
+                headers = {'Content-Type': 'application/json'}
+                if self.token:
+                    headers[TOKEN_HEADER] = self.token
+                connection.request('POST', f'/{job}', body=json.dumps(request), headers=headers)
+                resp = connection.getresponse()
+            except OSError as e:
+                raise DaemonError(f"Could not reach the daemon at {self.address}: {e}")
+
+            if resp.status != 200:
+                #read the whole answer, so the daemon is not cut off while sending it
+                error = json.loads(resp.read() or b'{}').get('error')
+                if resp.status == 400:
+                    raise InvalidInput(error)
+                if resp.status == 401:
+                    raise DaemonError(f"Daemon at {self.address} refused the token, set {TOKEN_ENV} to the daemon's")
+                raise DaemonError(f"Daemon answered {resp.status} to the {job} job: {error}")
+
+            for line in resp:
+                message = json.loads(line)
+                if 'error' in message:
+                    raise DaemonError(f"Daemon failed the {job} job: {message['error']}")
+                yield message
+        finally:
+            connection.close()
+
+    def scrape(self, series: list[dict[str, Optional[str]]]) -> Iterator[dict[str, Any]]:
+        """ Scrape series, each a url with optional seasons and episodes, on the daemon """
+        return self.run('scrape', {'series': series})
+
+    def search(self, series: str, season: Optional[str] = None, episode: Optional[str] = None, timeout: Optional[float] = None) -> Iterator[dict[str, Any]]:
+        """ Search every site for a series on the daemon """
+        return self.run('search', {'series': series, 'season': season, 'episode': episode, 'timeout': timeout})
@@ -1,12 +1,17 @@
 ##Written by kelseykm
 
-import selenium
-from selenium import webdriver
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions
-from selenium.webdriver.common.by import By
+import abc
 import logging
-from typing import Optional
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+#selenium is slow to import, so it is only imported once a driver is launched
+if TYPE_CHECKING:
+    import selenium.webdriver
+
+from . import metrics
 
 #Create logging object
 logger = logging.getLogger(__name__)
@@ -18,30 +23,234 @@ formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(messag
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
-class Sabishare:
-    """ Class for getting download links from saboshare """
+#url patterns of the resources a profile may block, by kind
+BLOCKED_RESOURCES = {
+    'images': ('*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*'),
+    'media': ('*.mp4*', '*.webm*', '*.mkv*', '*.mp3*', '*.m4a*', '*.ogg*', '*.m3u8*'),
+    'fonts': ('*.woff*', '*.woff2*', '*.ttf*', '*.otf*', '*.eot*'),
+    'ads': (
+        '*doubleclick.net*', '*googlesyndication.com*', '*googleadservices.com*', '*google-analytics.com*',
+        '*googletagmanager.com*', '*adservice.google.*', '*popads.net*', '*popcash.net*', '*propellerads.com*',
+        '*adsterra.com*', '*onclickads.net*', '*exoclick.com*', '*juicyads.com*', '*histats.com*',
+    ),
+}
+
+PROFILES = ('full', 'light')
+DEFAULT_PROFILE = 'full'
+
+def _process_tree_rss(pid: int) -> Optional[int]:
+    """ Get the resident memory, in bytes, of a process and all its descendants, or None where /proc is not available """
+    page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+    total = 0
+    pids = [pid]
+    try:
+        while pids:
+            pid = pids.pop()
+            with open(f'/proc/{pid}/statm') as f:
+                total += int(f.read().split()[1]) * page_size
+            for task in os.listdir(f'/proc/{pid}/task'):
+                with open(f'/proc/{pid}/task/{task}/children') as f:
+                    pids.extend(int(child) for child in f.read().split())
+    except (OSError, ValueError):
+        if not total:
+            return None
+    return total
+
+class DriverProfile:
+    """ How drivers launch chrome: headless or not, when a page counts as loaded, which resources it blocks and where it keeps its browser profile """
+
+    def __init__(
+            self,
+            name: str,
+            headless: bool = False,
+            page_load_strategy: str = 'normal',
+            blocked: Iterable[str] = (),
+            user_data_dir: Optional[str] = None
+            ) -> None:
+        unknown = set(blocked) - set(BLOCKED_RESOURCES)
+        if unknown:
+            raise ValueError(f"Unknown resource kinds {', '.join(sorted(unknown))}")
+
+        self.name = name
+        self.headless = headless
+        self.page_load_strategy = page_load_strategy
+        self.blocked = tuple(blocked)
+        self.user_data_dir = user_data_dir
 
+        self._claimed: set[str] = set()
+        self._lock = threading.Lock()
+
+    def blocked_urls(self, allowed: Iterable[str] = ()) -> list[str]:
+        """ Get the url patterns to block, leaving out the kinds of resources allowed """
+        return [ pattern for kind in self.blocked if kind not in allowed for pattern in BLOCKED_RESOURCES[kind] ]
+
+    def claim_user_data_dir(self, site: str) -> Optional[str]:
+        """ Get a browser profile directory for a driver of site, chrome locks it, so each running driver gets its own """
+        if self.user_data_dir is None:
+            return None
+
+        with self._lock:
+            slot = 0
+            while os.path.join(self.user_data_dir, f'{site}-{slot}') in self._claimed:
+                slot += 1
+            path = os.path.join(self.user_data_dir, f'{site}-{slot}')
+            self._claimed.add(path)
+        return path
+
+    def release_user_data_dir(self, path: Optional[str]) -> None:
+        """ Let another driver reuse a browser profile directory """
+        with self._lock:
+            self._claimed.discard(path)
+
+    def options(self, user_data_dir: Optional[str] = None, page_load_strategy: Optional[str] = None) -> 'selenium.webdriver.ChromeOptions':
+        """ Create chrome options for the profile """
+        from selenium import webdriver
+
+        option: selenium.webdriver.ChromeOptions = webdriver.ChromeOptions()
+        if self.headless:
+            option.add_argument("--headless=new")
+            option.add_argument("--disable-gpu")
+        if user_data_dir is None:
+            option.add_argument("--incognito")
+        else:
+            #a kept profile keeps its cache and cookies, so pages load faster on the next run
+            option.add_argument(f"--user-data-dir={user_data_dir}")
+        option.add_argument("--ignore-certificate-errors")
+        option.add_experimental_option("prefs", {"download.prompt_for_download": True})
+        option.page_load_strategy = page_load_strategy or self.page_load_strategy
+        return option
+
+def make_profile(name: str = DEFAULT_PROFILE, user_data_dir: Optional[str] = None) -> DriverProfile:
+    """ Create one of the named profiles """
+    if name == 'full':
+        #a visible browser loading everything, for pages that need a person or break without their resources
+        return DriverProfile('full', user_data_dir=user_data_dir)
+    if name == 'light':
+        return DriverProfile(
+            'light',
+            headless=True,
+            page_load_strategy='eager',
+            blocked=('images', 'media', 'fonts', 'ads'),
+            user_data_dir=user_data_dir
+        )
+    raise ValueError(f"Unknown driver profile {name}")
+
+_profile = make_profile()
+
+def configure(profile: str = DEFAULT_PROFILE, user_data_dir: Optional[str] = None) -> None:
+    """ Choose the profile every driver is launched with """
+    global _profile
+    logger.debug("Launching drivers with the %s profile", profile)
+    _profile = make_profile(profile, user_data_dir)
+
+def get_profile() -> DriverProfile:
+    """ Get the profile every driver is launched with """
+    return _profile
+
+class ChromeDriver(abc.ABC):
+    """ Chrome webdriver launched with a profile, recording how long and how much memory each resolution takes """
+
+    SITE = 'chrome' #label of the driver's metrics
     TIMEOUT = 5 #timeout for WebDriverWait
+    ALLOWED_RESOURCES: tuple[str, ...] = () #kinds of resources the site breaks without, never blocked
+    PAGE_LOAD_STRATEGY: Optional[str] = None #page load strategy the site needs, instead of the profile's
+
+    def __init__(self, profile: Optional[DriverProfile] = None) -> None:
+        from selenium import webdriver
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        self.profile = profile or get_profile()
+        self.user_data_dir = self.profile.claim_user_data_dir(self.SITE)
+        self.resolutions = 0
+        self.seconds = 0.0
+        self.peak_memory: Optional[int] = None
 
-    def __init__(self) -> None:
         #create driver options
-        logger.debug("Creating and adding webdriver options")
-        self.option: selenium.webdriver.chrome.options.Options = webdriver.ChromeOptions()
-        # self.option.headless = True ##too heavy on resources to run efficiently
-        self.option.add_argument("--incognito")
-        self.option.add_argument("--ignore-certificate-errors")
-        self.option.add_experimental_option("prefs", {"download.prompt_for_download": True})
+        logger.debug("Creating and adding webdriver options for the %s profile", self.profile.name)
+        self.option: selenium.webdriver.ChromeOptions = self.profile.options(self.user_data_dir, self.PAGE_LOAD_STRATEGY)
 
         #create driver
         logger.debug("Creating chrome webdriver")
-        self.driver: selenium.webdriver.chrome.webdriver.WebDriver = webdriver.Chrome(options=self.option)
+        metrics.count('driver_launches', site=self.SITE, profile=self.profile.name)
+        try:
+            with metrics.span('driver_launch', site=self.SITE, profile=self.profile.name):
+                self.driver: selenium.webdriver.chrome.webdriver.WebDriver = webdriver.Chrome(options=self.option)
+        except Exception:
+            self.profile.release_user_data_dir(self.user_data_dir)
+            raise
+
+        blocked_urls = self.profile.blocked_urls(self.ALLOWED_RESOURCES)
+        if blocked_urls:
+            logger.debug("Blocking %s url patterns", len(blocked_urls))
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_urls})
 
         #explicit wait
         logger.debug("Creating webdriver wait object")
         self.wait: selenium.webdriver.support.wait.WebDriverWait = WebDriverWait(driver=self.driver, timeout=self.TIMEOUT)
 
     def get_download_link(self, url: str) -> Optional[str]:
-        """ Get download link from sabishare """
+        """ Get download link for url, recording the resolution's latency and the browser's memory after it """
+        start = time.perf_counter()
+        try:
+            with metrics.span('driver', site=self.SITE, profile=self.profile.name):
+                return self._get_download_link(url)
+        finally:
+            self._record(time.perf_counter() - start)
+
+    @abc.abstractmethod
+    def _get_download_link(self, url: str) -> Optional[str]:
+        """ Get download link for url on the site's pages """
+
+    def _record(self, seconds: float) -> None:
+        """ Record a resolution that took seconds """
+        self.resolutions += 1
+        self.seconds += seconds
+        metrics.count('driver_resolutions', site=self.SITE, profile=self.profile.name)
+
+        service = getattr(self.driver, 'service', None)
+        process = getattr(service, 'process', None)
+        memory = _process_tree_rss(process.pid) if process is not None else None
+        if memory is not None:
+            self.peak_memory = max(self.peak_memory or 0, memory)
+            #with driver_resolutions, gives the mean memory per resolution
+            metrics.count('driver_memory_bytes', memory, site=self.SITE, profile=self.profile.name)
+        logger.debug("Resolution took %.2fs, browser memory %s bytes", seconds, memory)
+
+    def report(self) -> dict[str, Any]:
+        """ Get how many resolutions the driver made, their mean latency and the browser's peak memory """
+        return {
+            'site': self.SITE,
+            'profile': self.profile.name,
+            'resolutions': self.resolutions,
+            'mean_seconds': self.seconds / self.resolutions if self.resolutions else None,
+            'peak_memory_bytes': self.peak_memory,
+        }
+
+    def close_driver(self) -> None:
+        """ Close webdriver """
+        logger.debug("Closing webdriver")
+        self.driver.close()
+
+    def quit_driver(self) -> None:
+        """ Quit webdriver and the browser behind it """
+        logger.debug("Quitting webdriver")
+        logger.info("Driver report: %s", self.report())
+        try:
+            self.driver.quit()
+        finally:
+            self.profile.release_user_data_dir(self.user_data_dir)
+
+class Sabishare(ChromeDriver):
+    """ Class for getting download links from saboshare """
+
+    SITE = 'sabishare'
+
+    def _get_download_link(self, url: str) -> Optional[str]:
+        """ Drive sabishare's download button to get the download link """
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions
 
         logger.debug("Getting url with driver")
         self.driver.get(url)
@@ -56,7 +265,7 @@ class Sabishare:
                     method=expected_conditions.presence_of_element_located((By.CLASS_NAME, 'download')),
                     message="Download button not found" #message returned if method fails
                     )
-            except selenium.common.exceptions.TimeoutException as e:
+            except TimeoutException as e:
                 logger.error("%s", e)
             else:
                 logger.debug("Clicking download button")
@@ -68,48 +277,24 @@ class Sabishare:
                     method=expected_conditions.presence_of_element_located((By.CLASS_NAME, 'download-url')),
                     message="Download link not found" #message returned of method fails
                 )
-            except selenium.common.exceptions.TimeoutException as e:
+            except TimeoutException as e:
                 logger.error("%s", e)
             else:
                 logger.debug("Getting href from element")
                 link = link_element.get_attribute('href') #get href from WebElement
                 return link
 
-    def close_driver(self) -> None:
-        """ Close webdriver """
-        logger.debug("Closing webdriver")
-        self.driver.close()
-
-class O2tvSeries:
+class O2tvSeries(ChromeDriver):
     """ Class for getting download links from o2tvseries """
 
-    TIMEOUT = 5 #timeout for WebDriverWait
-
-    def __init__(self) -> None:
-        #create driver options
-        logger.debug("Creating and adding webdriver options")
-        self.option: selenium.webdriver.chrome.options.Options = webdriver.ChromeOptions()
-        self.option.add_argument("--incognito")
-        self.option.add_argument("--ignore-certificate-errors")
-        self.option.add_experimental_option("prefs", {"download.prompt_for_download": True})
-
-        #create driver
-        logger.debug("Creating chrome webdriver")
-        self.driver: selenium.webdriver.chrome.webdriver.WebDriver = webdriver.Chrome(options=self.option)
-
-        #explicit wait
-        logger.debug("Creating webdriver wait object")
-        self.wait: selenium.webdriver.support.wait.WebDriverWait = WebDriverWait(driver=self.driver, timeout=self.TIMEOUT)
+    SITE = 'o2tvseries'
+    ALLOWED_RESOURCES = ('images',) #its captcha is an image
+    PAGE_LOAD_STRATEGY = 'normal' #its challenge only redirects once the page has fully loaded
 
-    def get_download_link(self, url: str) -> str:
-        """ Get download link from o2tvseries """
+    def _get_download_link(self, url: str) -> str:
+        """ Get the url o2tvseries redirects to """
         logger.debug("Getting url with driver")
         self.driver.get(url)
 
         logger.debug("Returning redirected url")
         return self.driver.current_url
-
-    def close_driver(self) -> None:
-        """ Close webdrive"""
-        logger.debug("Closing webdriver")
-        self.driver.close()
@@ -5,3 +5,12 @@ class UnimplementedSite(Exception):
 
 class InvalidInput(Exception):
     """ Invalid input recieved from user """
+
+class ResolverFailed(Exception):
+    """ HTTP resolver could not reproduce the browser flow for a link """
+
+class DaemonError(Exception):
+    """ Daemon could not be reached, or failed a job """
+
+class TaskFailed(Exception):
+    """ Queued task could not be finished """
@@ -0,0 +1,222 @@
+##Written by kelseykm
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from . import metrics
+from .cache import DEFAULT_CACHE_DIR
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+DEFAULT_INDEX = os.path.join(DEFAULT_CACHE_DIR, 'titles.sqlite3')
+
+class IndexEntry(NamedTuple):
+    """ A title listed by a site, with the series and season its url belongs to """
+    site: str
+    title: str
+    slug: str
+    url: str
+    series_url: str
+    season: Optional[int] = None
+
+def normalize(title: str) -> str:
+    """ Lowercase a title and keep only its words, so titles compare however they are punctuated """
+    return ' '.join(re.findall(r'[a-z0-9]+', title.lower()))
+
+def trigrams(text: str) -> set[str]:
+    """ Get the trigrams of the words of normalized text, padded so word starts and ends count """
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class TitleIndex:
+    """ SQLite-backed index of the titles each site lists, looked up by title prefix or trigram similarity """
+
+    MIN_SIMILARITY = 0.4 #share of trigrams a title must have in common with a query to match it
+    NEAR_BEST = 0.8 #share of the best match's similarity the other matches need, so near matches only show without a close one
+    MAX_RESULTS = 20 #entries a lookup returns
+
+    def __init__(self, path: str = DEFAULT_INDEX) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+
+        logger.debug("Opening title index at %s", self.path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS titles (
+                id INTEGER PRIMARY KEY,
+                site TEXT NOT NULL,
+                url TEXT NOT NULL,
+                title TEXT NOT NULL,
+                slug TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                grams INTEGER NOT NULL,
+                series_url TEXT NOT NULL,
+                season INTEGER,
+                indexed_at REAL NOT NULL,
+                UNIQUE (site, url)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS titles_normalized ON titles (site, normalized)")
+        #without rowids, each trigram costs only its text and the title's id
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS grams (
+                gram TEXT NOT NULL,
+                title INTEGER NOT NULL,
+                PRIMARY KEY (gram, title)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS refreshes (
+                site TEXT PRIMARY KEY,
+                refreshed_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def add(self, entries: Iterable[IndexEntry]) -> int:
+        """ Add entries not yet in the index, returning how many were new """
+        added = 0
+        now = time.time()
+        with self._lock:
+            for entry in entries:
+                normalized = normalize(entry.title)
+                grams = trigrams(normalized)
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO titles (site, url, title, slug, normalized, grams, series_url, season, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (entry.site, entry.url, entry.title, entry.slug, normalized, len(grams), entry.series_url, entry.season, now)
+                )
+                if not cursor.rowcount:
+                    continue
+                added += 1
+                self._conn.executemany("INSERT OR IGNORE INTO grams VALUES (?, ?)", ((gram, cursor.lastrowid) for gram in grams))
+            self._conn.commit()
+        return added
+
+    def lookup(self, site: str, query: str) -> list[IndexEntry]:
+        """ Get the entries of site whose titles start with query or share enough trigrams with it, best matches first """
+        return [ entry for entry, _ in self.match(site, query) ]
+
+    def match(self, site: str, query: str) -> list[tuple[IndexEntry, bool]]:
+        """ Get the entries lookup gets, each with whether its title starts with query rather than only looking like it """
+        normalized = normalize(query)
+        if not normalized:
+            return []
+        grams = trigrams(normalized)
+
+        with metrics.span('index_lookup', site=site), self._lock:
+            scores: dict[int, float] = {}
+            #titles starting with the query match it fully
+            prefixed = {
+                title_id for (title_id,) in self._conn.execute(
+                    "SELECT id FROM titles WHERE site = ? AND normalized >= ? AND normalized < ?",
+                    (site, normalized, normalized + '\uffff')
+                )
+            }
+            scores.update(dict.fromkeys(prefixed, 1.0))
+
+            placeholders = ','.join('?' * len(grams))
+            for title_id, title_grams, shared in self._conn.execute(
+                    f"SELECT titles.id, titles.grams, COUNT(*) FROM grams JOIN titles ON titles.id = grams.title "
+                    f"WHERE grams.gram IN ({placeholders}) AND titles.site = ? GROUP BY titles.id",
+                    (*grams, site)
+                    ):
+                similarity = shared / (len(grams) + title_grams - shared)
+                if similarity >= self.MIN_SIMILARITY:
+                    scores[title_id] = max(scores.get(title_id, 0.0), similarity)
+
+            if not scores:
+                return []
+            cutoff = max(scores.values()) * self.NEAR_BEST
+            best = sorted((title_id for title_id in scores if scores[title_id] >= cutoff), key=lambda title_id: -scores[title_id])[:self.MAX_RESULTS]
+            rows = {
+                row[0]: row[1:]
+                for row in self._conn.execute(
+                    f"SELECT id, site, title, slug, url, series_url, season FROM titles WHERE id IN ({','.join('?' * len(best))})", best
+                )
+            }
+
+        return [ (IndexEntry(*rows[title_id]), title_id in prefixed) for title_id in best ]
+
+    def refreshed_at(self, site: str) -> Optional[float]:
+        """ Get when site's listing was last crawled into the index """
+        with self._lock:
+            row = self._conn.execute("SELECT refreshed_at FROM refreshes WHERE site = ?", (site,)).fetchone()
+        return row[0] if row else None
+
+    def mark_refreshed(self, site: str) -> None:
+        """ Record that site's listing was just crawled into the index """
+        with self._lock:
+            self._conn.execute("REPLACE INTO refreshes VALUES (?, ?)", (site, time.time()))
+            self._conn.commit()
+
+    def refresh(self, site: str, listing_page: Callable[[int], list[IndexEntry]], max_pages: int, full: bool = False) -> int:
+        """ Crawl site's listing pages, newest first, into the index, returning how many titles were new
+
+        Unless full, the crawl stops at the first page with nothing new, as the rest were indexed before
+        """
+        added = 0
+        for page in range(1, max_pages + 1):
+            entries = listing_page(page)
+            if not entries:
+                break
+
+            new = self.add(entries)
+            logger.debug("Indexed %s new of %s titles from %s listing page %s", new, len(entries), site, page)
+            added += new
+            if not new and not full and self.refreshed_at(site) is not None:
+                break
+
+        self.mark_refreshed(site)
+        return added
+
+    def close(self) -> None:
+        """ Close the index """
+        with self._lock:
+            self._conn.close()
+
+#the index shared by all searches, opened on first use
+_index: Optional[TitleIndex] = None
+_index_enabled = True
+_index_path = DEFAULT_INDEX
+_index_lock = threading.Lock()
+
+def configure(enabled: bool = True, path: Optional[str] = None) -> None:
+    """ Configure the index shared by all searches """
+    global _index, _index_enabled, _index_path
+    with _index_lock:
+        if _index is not None:
+            _index.close()
+            _index = None
+        _index_enabled = enabled
+        _index_path = path or DEFAULT_INDEX
+
+def get_index() -> Optional[TitleIndex]:
+    """ Get the index shared by all searches, or None if it is disabled """
+    global _index, _index_enabled
+    with _index_lock:
+        if _index_enabled and _index is None:
+            try:
+                _index = TitleIndex(_index_path)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Could not open title index, searching live: %s", e)
+                _index_enabled = False
+        return _index
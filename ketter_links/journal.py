@@ -0,0 +1,111 @@
+##Written by kelseykm
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, TypeVar
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+R = TypeVar('R')
+
+DEFAULT_JOURNAL = 'urls.journal'
+
+class Journal:
+    """ Append-only record of crawled pages and resolved links, for resuming a scrape """
+
+    SCOPE = 'scope'
+    PAGE = 'page'
+    LINK = 'link'
+
+    def __init__(self, path: str = DEFAULT_JOURNAL, resume: bool = False, scope: str = '') -> None:
+        self.path = path
+        self.scope = scope
+        self._entries: dict[tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(path) and self._load():
+            logger.info("Resuming from %s finished entries in %s", len(self._entries), path)
+            self._file = open(path, 'a')
+            #end a line cut short by the run that died, so new entries start on their own line
+            if self._file.tell() and not self._ends_with_newline():
+                self._file.write('\n')
+        else:
+            self._entries.clear()
+            self._file = open(path, 'w')
+            self.record(self.SCOPE, scope, None)
+
+    def _load(self) -> bool:
+        """ Read finished entries from the journal file, returning whether it belongs to this scrape """
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    #the last line is cut short if the run died while writing it
+                    logger.debug("Skipping incomplete journal line")
+                    continue
+                self._entries[(entry['kind'], entry['key'])] = entry['value']
+
+        #pages are filtered by the seasons and episodes asked for, so they only carry over to the same scrape
+        if (self.SCOPE, self.scope) not in self._entries:
+            logger.warning("Journal %s is for a different scrape, starting over", self.path)
+            return False
+        return True
+
+    def _ends_with_newline(self) -> bool:
+        """ Check whether the journal file ends with a newline """
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def get(self, kind: str, key: str) -> tuple[bool, Any]:
+        """ Get whether an entry is finished, and its value """
+        with self._lock:
+            if (kind, key) in self._entries:
+                return True, self._entries[(kind, key)]
+        return False, None
+
+    def record(self, kind: str, key: str, value: Any) -> None:
+        """ Record a finished entry, making sure it reaches the disk """
+        with self._lock:
+            self._entries[(kind, key)] = value
+            self._file.write(json.dumps({'kind': kind, 'key': key, 'value': value}) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def journaled(self, kind: str, func: Callable[..., R]) -> Callable[..., R]:
+        """ Wrap func(key, ...) to skip finished keys and record the ones it finishes """
+        def wrapper(key: str, *args: Any) -> R:
+            found, value = self.get(kind, key)
+            if found:
+                logger.debug("Skipping finished %s %s", kind, key)
+                return value
+
+            value = func(key, *args)
+            #failures are not recorded, so a resumed run retries them
+            if value is not None:
+                self.record(kind, key, value)
+            return value
+
+        return wrapper
+
+    def close(self) -> None:
+        """ Close the journal file """
+        with self._lock:
+            self._file.close()
+
+    def remove(self) -> None:
+        """ Close and delete the journal file once the scrape has finished """
+        self.close()
+        logger.debug("Removing journal %s", self.path)
+        os.remove(self.path)
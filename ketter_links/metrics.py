@@ -0,0 +1,166 @@
+##Written by kelseykm
+
+import contextlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Iterator, Optional
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+FORMATS = ('json', 'prometheus')
+PREFIX = 'ketter_links'
+
+#a metric's name and its labels, sorted so the same labels always make the same key
+Key = tuple[str, tuple[tuple[str, str], ...]]
+
+def _key(name: str, labels: dict[str, Any]) -> Key:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+def _prometheus_labels(labels: tuple[tuple[str, str], ...], **extra: str) -> str:
+    """ Format labels the way the prometheus text format writes them """
+    pairs = [ *labels, *extra.items() ]
+    if not pairs:
+        return ''
+    escaped = ( (label, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for label, value in pairs )
+    return '{' + ','.join(f'{label}="{value}"' for label, value in escaped) + '}'
+
+class SpanStats:
+    """ How many times a span ran, for how long, and how those times spread over the buckets """
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.bucket_counts = [0] * len(buckets)
+
+class Metrics:
+    """ Counters and timed spans of a run, exportable as json or prometheus text """
+
+    #upper bounds, in seconds, of the span histogram buckets
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self) -> None:
+        self._counters: dict[Key, float] = {}
+        self._spans: dict[Key, SpanStats] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        """ Add value to a counter """
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        """ Record a span that took seconds """
+        key = _key(name, labels)
+        with self._lock:
+            stats = self._spans.setdefault(key, SpanStats(self.BUCKETS))
+            stats.count += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            for index, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    stats.bucket_counts[index] += 1
+                    break
+
+    @contextlib.contextmanager
+    def span(self, name: str, **labels: Any) -> Iterator[None]:
+        """ Time the code run inside the span """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def to_dict(self) -> dict[str, list[dict[str, Any]]]:
+        """ Get the counters and spans as plain data """
+        with self._lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                'spans': [
+                    {
+                        'name': name,
+                        'labels': dict(labels),
+                        'count': stats.count,
+                        'seconds': stats.seconds,
+                        'max_seconds': stats.max_seconds,
+                    }
+                    for (name, labels), stats in sorted(self._spans.items())
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        """ Get the counters and spans in the prometheus text format, spans as histograms """
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f'{PREFIX}_{name}_total'
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f'# TYPE {metric} counter')
+                lines.append(f'{metric}{_prometheus_labels(labels)} {value:g}')
+
+            for (name, labels), stats in sorted(self._spans.items()):
+                metric = f'{PREFIX}_{name}_seconds'
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f'# TYPE {metric} histogram')
+                cumulative = 0
+                for bound, bucket_count in zip(self.BUCKETS, stats.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{metric}_bucket{_prometheus_labels(labels, le=f"{bound:g}")} {cumulative}')
+                lines.append(f'{metric}_bucket{_prometheus_labels(labels, le="+Inf")} {stats.count}')
+                lines.append(f'{metric}_sum{_prometheus_labels(labels)} {stats.seconds:.6f}')
+                lines.append(f'{metric}_count{_prometheus_labels(labels)} {stats.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str, metrics_format: Optional[str] = None) -> None:
+        """ Write the metrics to path, as json if it ends with .json and prometheus text otherwise, unless a format is given """
+        if metrics_format is None:
+            metrics_format = 'json' if path.endswith('.json') else 'prometheus'
+        if metrics_format not in FORMATS:
+            raise ValueError(f"Unknown metrics format {metrics_format}")
+
+        logger.debug("Writing %s metrics to %s", metrics_format, path)
+        with open(path, 'w') as f:
+            if metrics_format == 'json':
+                json.dump(self.to_dict(), f, indent=2)
+                f.write('\n')
+            else:
+                f.write(self.to_prometheus())
+
+    def reset(self) -> None:
+        """ Forget every counter and span """
+        with self._lock:
+            self._counters.clear()
+            self._spans.clear()
+
+#the metrics every module records to
+_metrics = Metrics()
+
+def get_metrics() -> Metrics:
+    """ Get the metrics every module records to """
+    return _metrics
+
+def count(name: str, value: float = 1, **labels: Any) -> None:
+    """ Add value to a counter of the shared metrics """
+    _metrics.count(name, value, **labels)
+
+def span(name: str, **labels: Any) -> contextlib.AbstractContextManager:
+    """ Time the code run inside the span in the shared metrics """
+    return _metrics.span(name, **labels)
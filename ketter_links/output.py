@@ -0,0 +1,82 @@
+##Written by kelseykm
+
+import json
+import logging
+import re
+import sys
+from typing import Any, NamedTuple, Optional, TextIO
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+DEFAULT_OUTPUT = 'urls.txt'
+FORMATS = ('text', 'jsonl')
+
+class Link(NamedTuple):
+    """ A download link and what it is a link to """
+    url: str
+    season: Optional[int] = None
+    episode: Optional[int] = None
+    source: Optional[str] = None #the page or link it was resolved from
+    size: Optional[int] = None #bytes, if the link was verified and its server says
+    accept_ranges: Optional[bool] = None #whether its server takes range requests, if the link was verified
+
+SEASON_PATTERN = re.compile(r'season[-_ ]?0*(\d{1,6})', re.I)
+EPISODE_PATTERN = re.compile(r'episode[-_ ]?0*(\d{1,6})', re.I)
+SEASON_EPISODE_PATTERN = re.compile(r's0*(\d{1,6})e0*(\d{1,6})', re.I)
+
+def season_episode(text: str) -> tuple[Optional[int], Optional[int]]:
+    """ Get the season and episode numbers from a link or its text """
+    season = SEASON_PATTERN.search(text)
+    episode = EPISODE_PATTERN.search(text)
+    if season or episode:
+        return int(season.group(1)) if season else None, int(episode.group(1)) if episode else None
+
+    season_episode = SEASON_EPISODE_PATTERN.search(text)
+    if season_episode:
+        return int(season_episode.group(1)), int(season_episode.group(2))
+
+    return None, None
+
+class LinkWriter:
+    """ Write links as soon as they are resolved, so a downloader can start on them while scraping continues """
+
+    def __init__(self, path: str = DEFAULT_OUTPUT, output_format: str = 'text', append: bool = False) -> None:
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown output format {output_format}")
+        self.path = path
+        self.output_format = output_format
+        self.count = 0
+
+        #opening a named pipe blocks until a reader opens it too
+        logger.debug("Opening %s for links", path)
+        self._file: TextIO = sys.stdout if path == '-' else open(path, 'a' if append else 'w')
+
+    def write(self, link: Link, **extra: Any) -> None:
+        """ Write a link, flushing it straight away """
+        if self.output_format == 'jsonl':
+            line = json.dumps({ **link._asdict(), **extra })
+        else:
+            line = link.url
+
+        self._file.write(line + '\n')
+        self._file.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        """ Close the output, unless it is stdout """
+        if self._file is not sys.stdout:
+            self._file.close()
+
+    def __enter__(self) -> 'LinkWriter':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
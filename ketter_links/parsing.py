@@ -0,0 +1,321 @@
+##Written by kelseykm
+
+from bs4 import BeautifulSoup, SoupStrainer
+import abc
+import bs4
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import codecs
+import html.parser
+import importlib.util
+import logging
+import multiprocessing
+import re
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar, Union
+
+from . import metrics
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+#tags to keep when parsing, with the attributes they must have to be kept, '*' for tags of any name
+Only = dict[str, dict[str, Union[str, re.Pattern]]]
+#attributes an element must have to match, either exact (class: any of its classes) or a regex searched for
+Attrs = dict[str, Union[str, re.Pattern]]
+
+BACKENDS = ('html.parser', 'lxml', 'selectolax')
+DEFAULT_BACKEND = 'html.parser'
+
+#modules each backend needs
+_BACKEND_MODULES = {
+    'html.parser': 'bs4',
+    'lxml': 'lxml',
+    'selectolax': 'selectolax',
+}
+
+_backend = DEFAULT_BACKEND
+
+R = TypeVar('R')
+
+#processes extracting links from pages besides this one, 0 to extract them in the thread that fetched the page
+_processes = 0
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def available_backends() -> list[str]:
+    """ Get the backends whose modules are installed """
+    return [ backend for backend in BACKENDS if importlib.util.find_spec(_BACKEND_MODULES[backend]) is not None ]
+
+def configure(backend: str = DEFAULT_BACKEND, processes: int = 0) -> None:
+    """ Choose the backend every page is parsed with, and how many processes extract links from pages """
+    global _backend, _processes
+    if backend not in available_backends():
+        raise ValueError(f"Parser backend {backend} is not available")
+    if processes < 0:
+        raise ValueError("Parse processes cannot be negative")
+    logger.debug("Parsing pages with %s in %s processes", backend, processes)
+    #workers parse with the backend they were started with
+    close()
+    _backend = backend
+    _processes = processes
+
+def _init_worker(backend: str) -> None:
+    """ Parse with the same backend as the process that started the worker """
+    global _backend
+    _backend = backend
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """ Get the pool of processes extracting links, started when first needed """
+    global _pool
+    with _pool_lock:
+        if _pool is None and _processes:
+            logger.debug("Starting %s parse processes", _processes)
+            #spawned rather than forked, forking a process with running threads can deadlock the child
+            _pool = ProcessPoolExecutor(
+                max_workers=_processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(_backend,)
+            )
+        return _pool
+
+def extract(extractor: Callable[..., R], data: bytes, *args: Any) -> R:
+    """ Run a link extractor on a page's bytes, in a parse process if there are any so parsing many pages at once is not held to one core
+
+    Extractors must be picklable, e.g. module functions or classmethods, and should return only the links they find
+    """
+    pool = _get_pool()
+    if pool is not None:
+        try:
+            with metrics.span('parse_pool'):
+                return pool.submit(extractor, data, *args).result()
+        except BrokenProcessPool:
+            logger.warning("Parse processes died, extracting links in this process")
+            close()
+    return extractor(data, *args)
+
+def close() -> None:
+    """ Stop the parse processes, if any were started """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+def _attribute_matches(value: Any, expected: Union[str, re.Pattern], multi_valued: bool) -> bool:
+    """ Check an attribute's value against what is expected of it """
+    if value is None:
+        return False
+    if isinstance(value, (list, tuple)):
+        value = ' '.join(value)
+    if isinstance(expected, re.Pattern):
+        return expected.search(value) is not None
+    if multi_valued:
+        return expected in value.split()
+    return value == expected
+
+def _attributes_match(attributes: dict[str, Any], attrs: Optional[Attrs]) -> bool:
+    """ Check all of an element's attributes against what is expected of them """
+    return all(
+        _attribute_matches(attributes.get(name), expected, multi_valued=(name == 'class'))
+        for name, expected in (attrs or {}).items()
+    )
+
+class Element(abc.ABC):
+    """ An element of a parsed page """
+
+    @abc.abstractmethod
+    def get(self, name: str) -> Optional[str]:
+        """ Get the value of an attribute """
+
+    @abc.abstractmethod
+    def text(self) -> str:
+        """ Get the text inside the element """
+
+    @abc.abstractmethod
+    def find_all(self, tag: str, attrs: Optional[Attrs] = None, text: Optional[re.Pattern] = None) -> list['Element']:
+        """ Find all descendant tags, of any name if tag is '*', with matching attributes and text """
+
+    def find(self, tag: str, attrs: Optional[Attrs] = None, text: Optional[re.Pattern] = None) -> Optional['Element']:
+        """ Find the first descendant tag with matching attributes and text """
+        elements = self.find_all(tag, attrs, text)
+        if elements:
+            return elements[0]
+
+def _soup_name(tag: str) -> Union[str, bool]:
+    """ Get the name beautiful soup matches tags of any name with """
+    return True if tag == '*' else tag
+
+class SoupElement(Element):
+    """ An element of a page parsed by beautiful soup """
+
+    def __init__(self, tag: Union[bs4.Tag, BeautifulSoup]) -> None:
+        self.tag = tag
+
+    def get(self, name: str) -> Optional[str]:
+        return self.tag.get(name)
+
+    def text(self) -> str:
+        return self.tag.get_text()
+
+    def find_all(self, tag: str, attrs: Optional[Attrs] = None, text: Optional[re.Pattern] = None) -> list[Element]:
+        return [ SoupElement(element) for element in self.tag.find_all(_soup_name(tag), attrs or {}, string=text) ]
+
+    def find(self, tag: str, attrs: Optional[Attrs] = None, text: Optional[re.Pattern] = None) -> Optional[Element]:
+        element = self.tag.find(_soup_name(tag), attrs or {}, string=text)
+        if element is not None:
+            return SoupElement(element)
+
+class SelectolaxElement(Element):
+    """ An element of a page parsed by selectolax """
+
+    def __init__(self, node: Any) -> None:
+        self.node = node
+
+    def get(self, name: str) -> Optional[str]:
+        return self.node.attributes.get(name)
+
+    def text(self) -> str:
+        return self.node.text(deep=True)
+
+    def find_all(self, tag: str, attrs: Optional[Attrs] = None, text: Optional[re.Pattern] = None) -> list[Element]:
+        elements = []
+        for node in self.node.css(tag):
+            if not _attributes_match(node.attributes, attrs):
+                continue
+            #like beautiful soup, only match the text of tags without child tags
+            if text is not None and (
+                    any(child.tag != '-text' for child in node.iter(include_text=True))
+                    or not text.search(node.text(deep=True))
+                    ):
+                continue
+            elements.append(SelectolaxElement(node))
+        return elements
+
+class StreamElement(Element):
+    """ An element of a page parsed as it streams in, keeping its attributes and text but not its descendants """
+
+    def __init__(self, tag: str, attributes: dict[str, str]) -> None:
+        self.tag = tag
+        self.attributes = attributes
+        self.has_children = False
+        self._text: list[str] = []
+
+    def get(self, name: str) -> Optional[str]:
+        return self.attributes.get(name)
+
+    def text(self) -> str:
+        return ''.join(self._text)
+
+    def find_all(self, tag: str, attrs: Optional[Attrs] = None, text: Optional[re.Pattern] = None) -> list[Element]:
+        return []
+
+class _StreamParser(html.parser.HTMLParser):
+    """ Incremental parser collecting the tags it looks for as each one closes """
+
+    def __init__(self, tag: str, attrs: Optional[Attrs], text: Optional[re.Pattern]) -> None:
+        super().__init__(convert_charrefs=True)
+        self.tag = tag
+        self.attrs = attrs
+        self.text_pattern = text
+        self.open: list[StreamElement] = []
+        self.found: list[StreamElement] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        for element in self.open:
+            element.has_children = True
+        if tag == self.tag:
+            self.open.append(StreamElement(tag, { name: value or '' for name, value in attrs }))
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        for element in self.open:
+            element.has_children = True
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag != self.tag or not self.open:
+            return
+        element = self.open.pop()
+        if not _attributes_match(element.attributes, self.attrs):
+            return
+        #like beautiful soup, only match the text of tags without child tags
+        if self.text_pattern is not None and (element.has_children or not self.text_pattern.search(element.text())):
+            return
+        self.found.append(element)
+
+    def handle_data(self, data: str) -> None:
+        for element in self.open:
+            element._text.append(data)
+
+def iter_stream(chunks: Iterable[bytes], tag: str, attrs: Optional[Attrs] = None, text: Optional[re.Pattern] = None, encoding: Optional[str] = None) -> Iterator[StreamElement]:
+    """ Parse a page as its chunks come in, yielding each matching tag as soon as it closes, so callers can stop reading once they have what they need
+
+    Streamed pages are parsed with the standard library's incremental parser whichever backend is configured
+    """
+    decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    parser = _StreamParser(tag, attrs, text)
+    seconds = 0.0
+    try:
+        for chunk in chunks:
+            start = time.perf_counter()
+            parser.feed(decoder.decode(chunk))
+            seconds += time.perf_counter() - start
+            found, parser.found = parser.found, []
+            yield from found
+
+        start = time.perf_counter()
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+        seconds += time.perf_counter() - start
+        yield from parser.found
+    finally:
+        #only the parsing is timed, not the reading or what the caller does between tags
+        metrics.get_metrics().observe('parse', seconds, backend='stream')
+
+class _Strainer(SoupStrainer):
+    """ Strainer keeping only the tags in only, with the attributes they must have """
+
+    def __init__(self, only: Only) -> None:
+        super().__init__(list(only))
+        self.only = only
+
+    def _keep(self, name: str, attributes: Optional[dict[str, Any]]) -> bool:
+        return any(
+            tag in self.only and _attributes_match(attributes or {}, self.only[tag])
+            for tag in (name, '*')
+        )
+
+    #beautiful soup 4.13 and later
+    def allow_tag_creation(self, nsprefix: Optional[str], name: str, attrs: Optional[dict[str, Any]]) -> bool:
+        return self._keep(name, attrs)
+
+    #beautiful soup before 4.13
+    def search_tag(self, markup_name: Any = None, markup_attrs: Any = {}) -> Any:
+        if isinstance(markup_name, bs4.Tag):
+            return markup_name if self._keep(markup_name.name, markup_name.attrs) else None
+        return markup_name if self._keep(markup_name, markup_attrs) else None
+
+def parse(data: Union[bytes, str], only: Optional[Only] = None, backend: Optional[str] = None) -> Element:
+    """ Parse a page, keeping only the tags in only (and everything inside them) if given """
+    backend = backend or _backend
+
+    with metrics.span('parse', backend=backend):
+        if backend == 'selectolax':
+            try:
+                from selectolax.lexbor import LexborHTMLParser as HTMLParser
+            except ImportError:
+                #selectolax before 0.3.13 only has the modest parser
+                from selectolax.parser import HTMLParser
+            #selectolax builds the whole tree in C faster than beautiful soup can skip tags
+            return SelectolaxElement(HTMLParser(data))
+
+        parse_only = _Strainer(only) if only else None
+        return SoupElement(BeautifulSoup(data, backend, parse_only=parse_only))
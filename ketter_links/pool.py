@@ -0,0 +1,186 @@
+##Written by kelseykm
+
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import logging
+from typing import Any, Callable, Iterable, Optional
+
+from . import drivers
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+Driver = drivers.ChromeDriver
+
+class DriverPool:
+    """ Pool of long-lived webdrivers shared by link resolutions """
+
+    MAX_USES = 50 #resolutions a driver serves before it is recycled
+    WAIT_INTERVAL = 1 #seconds between checks for a free slot while waiting for a driver
+
+    def __init__(self, driver_class: type, size: int = 1, max_uses: int = MAX_USES) -> None:
+        if size < 1:
+            raise ValueError("Driver pool size must be at least 1")
+
+        self.driver_class = driver_class
+        self.size = size
+        self.max_uses = max_uses
+
+        self._idle: queue.Queue = queue.Queue()
+        self._uses: dict[int, int] = {}
+        self._launched = 0 #drivers alive or being launched
+        self._drivers: set[Driver] = set() #every live driver, idle or checked out
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _create_driver(self) -> Driver:
+        """ Launch a new driver for the pool """
+        logger.debug("Launching %s driver for pool", self.driver_class.__name__)
+        driver = self.driver_class()
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._uses[id(driver)] = 0
+                self._drivers.add(driver)
+
+        if closed:
+            #the pool was closed while chrome was starting, acquire gives its slot back
+            self._quit_driver(driver)
+            raise RuntimeError("Driver pool is closed")
+        return driver
+
+    def _quit_driver(self, driver: Driver) -> None:
+        """ Quit a driver, ignoring errors from one that already died """
+        #selenium is slow to import, and is already imported once a driver was launched
+        from selenium.common.exceptions import WebDriverException
+        try:
+            driver.quit_driver()
+        except WebDriverException as e:
+            logger.debug("Error quitting driver: %s", e)
+
+    def _discard_driver(self, driver: Driver) -> None:
+        """ Quit a driver and forget it """
+        with self._lock:
+            if driver not in self._drivers:
+                #close got to it first
+                return
+            self._drivers.discard(driver)
+            self._launched -= 1
+            self._uses.pop(id(driver), None)
+
+        self._quit_driver(driver)
+
+    def acquire(self) -> Driver:
+        """ Take an idle driver, launching one if the pool is not full yet """
+        while True:
+            if self._closed:
+                raise RuntimeError("Driver pool is closed")
+
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                #reserve the slot before launching, chrome takes a while to start
+                launch = self._launched < self.size
+                if launch:
+                    self._launched += 1
+
+            if launch:
+                try:
+                    return self._create_driver()
+                except Exception:
+                    with self._lock:
+                        self._launched -= 1
+                    raise
+
+            #a recycled driver frees a slot without returning to the queue, so check again periodically
+            logger.debug("Waiting for an idle driver")
+            try:
+                return self._idle.get(timeout=self.WAIT_INTERVAL)
+            except queue.Empty:
+                continue
+
+    def release(self, driver: Driver, broken: bool = False) -> None:
+        """ Return a driver to the pool, recycling it if it crashed or is worn out """
+        if self._closed:
+            logger.debug("Quitting %s driver released after the pool closed", self.driver_class.__name__)
+            self._discard_driver(driver)
+            return
+
+        with self._lock:
+            self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+            uses = self._uses[id(driver)]
+
+        if broken:
+            logger.warning("Recycling crashed %s driver", self.driver_class.__name__)
+            self._discard_driver(driver)
+        elif uses >= self.max_uses:
+            logger.debug("Recycling %s driver after %s uses", self.driver_class.__name__, self.max_uses)
+            self._discard_driver(driver)
+        else:
+            self._idle.put(driver)
+
+    def resolve(self, url: str) -> Optional[str]:
+        """ Get the download link for url on a pooled driver, retrying once on a fresh driver if it crashes """
+        for attempt in 1, 2:
+            driver = self.acquire()
+            #selenium is slow to import, and is already imported once a driver was launched
+            from selenium.common.exceptions import WebDriverException
+            try:
+                link = driver.get_download_link(url)
+            except WebDriverException as e:
+                logger.error("Driver crashed on attempt %s for %s: %s", attempt, url, e)
+                self.release(driver, broken=True)
+            else:
+                self.release(driver)
+                return link
+
+    def resolve_all(self, urls: Iterable[str], callback: Optional[Callable[[str, Optional[str]], None]] = None) -> list[Optional[str]]:
+        """ Get the download links for urls in parallel across the pool, in the order of urls
+
+        callback is called with each url and its link as soon as it is resolved
+        """
+        def resolve(url: str) -> Optional[str]:
+            link = self.resolve(url)
+            if callback is not None:
+                callback(url, link)
+            return link
+
+        urls = list(urls)
+        if self.size == 1 or len(urls) < 2:
+            return [ resolve(url) for url in urls ]
+
+        with ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='driver-pool') as executor:
+            return list(executor.map(resolve, urls))
+
+    def close(self) -> None:
+        """ Quit every driver in the pool, including those still checked out """
+        logger.debug("Closing driver pool")
+        with self._lock:
+            self._closed = True
+            drivers = list(self._drivers)
+
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+        for driver in drivers:
+            self._discard_driver(driver)
+
+    def __enter__(self) -> 'DriverPool':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
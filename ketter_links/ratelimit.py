@@ -0,0 +1,211 @@
+##Written by kelseykm
+
+import requests
+from requests.adapters import HTTPAdapter
+import email.utils
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlparse
+from typing import Any, Optional
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+class RateLimited(requests.exceptions.HTTPError):
+    """ Site kept throttling requests after backing off """
+
+#statuses a site answers with when it wants requests to slow down, any other error is the caller's to handle unless it comes with a Retry-After
+THROTTLE_STATUSES = {429, 503}
+
+#methods that may be sent again without changing what the first one did
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'}
+
+def is_throttled(resp: requests.models.Response) -> bool:
+    """ Check whether a response asks for requests to slow down """
+    return resp.status_code in THROTTLE_STATUSES or 'Retry-After' in resp.headers
+
+def retry_after(resp: requests.models.Response) -> Optional[float]:
+    """ Get the seconds a response asks to wait before retrying, from its Retry-After header """
+    value = resp.headers.get('Retry-After')
+    if not value:
+        return
+
+    if value.strip().isdigit():
+        return float(value)
+
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        logger.debug("Ignoring invalid Retry-After %s", value)
+        return
+    return max(date.timestamp() - time.time(), 0.0)
+
+class HostLimiter:
+    """ Paces requests to one host with a token bucket, and a concurrency limit that grows while the host is healthy and halves when it pushes back """
+
+    RATE = 4.0 #requests per second
+    BURST = 8 #requests that may be sent at once after a quiet spell
+    INITIAL_CONCURRENCY = 2 #requests in flight before the host has proven healthy
+    MAX_CONCURRENCY = 8
+    HEALTHY_STREAK = 10 #healthy responses in a row before one more request may be in flight
+    BASE_BACKOFF = 1.0 #seconds waited after the first throttled response, doubling with each one after
+    MAX_BACKOFF = 60.0
+
+    def __init__(
+            self,
+            netloc: str,
+            rate: float = RATE,
+            burst: int = BURST,
+            initial_concurrency: int = INITIAL_CONCURRENCY,
+            max_concurrency: int = MAX_CONCURRENCY
+            ) -> None:
+        self.netloc = netloc
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.concurrency = min(initial_concurrency, max_concurrency)
+
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._streak = 0
+        self._failures = 0
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        """ Add the tokens earned since the last refill """
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def acquire(self) -> None:
+        """ Wait until a request may be sent to the host """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                wait: Optional[float] = self._blocked_until - now
+                if wait <= 0:
+                    if self._in_flight >= self.concurrency:
+                        #a release wakes us up
+                        wait = None
+                    elif self._tokens < 1:
+                        wait = (1 - self._tokens) / self.rate
+                    else:
+                        self._tokens -= 1
+                        self._in_flight += 1
+                        return
+
+                self._cond.wait(wait)
+
+    def release(self, throttled: bool = False, delay: Optional[float] = None) -> Optional[float]:
+        """ Finish a request, backing off if the host throttled it, and return the seconds until the host may be retried """
+        with self._cond:
+            self._in_flight -= 1
+
+            if throttled:
+                self._failures += 1
+                self._streak = 0
+                self.concurrency = max(1, self.concurrency // 2)
+
+                if delay is None:
+                    #equal jitter, so requests that were throttled together do not all retry together
+                    backoff = min(self.MAX_BACKOFF, self.BASE_BACKOFF * 2 ** (self._failures - 1))
+                    delay = backoff / 2 + random.uniform(0, backoff / 2)
+                self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+                logger.info("%s is throttling, backing off for %.1f seconds with %s requests in flight", self.netloc, delay, self.concurrency)
+
+            elif self._failures or self.concurrency < self.max_concurrency:
+                self._failures = 0
+                self._streak += 1
+                if self._streak >= self.HEALTHY_STREAK and self.concurrency < self.max_concurrency:
+                    self._streak = 0
+                    self.concurrency += 1
+                    logger.debug("%s is healthy, allowing %s requests in flight", self.netloc, self.concurrency)
+
+            self._cond.notify_all()
+            return delay
+
+class RateLimiter:
+    """ The host limiters of every host requests are sent to """
+
+    def __init__(self, rate: float = HostLimiter.RATE, max_concurrency: int = HostLimiter.MAX_CONCURRENCY) -> None:
+        self.rate = rate
+        self.max_concurrency = max_concurrency
+        self._limiters: dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def host_limiter(self, url: str) -> HostLimiter:
+        """ Get the limiter of the url's host """
+        netloc = urlparse(url).netloc
+        with self._lock:
+            if netloc not in self._limiters:
+                logger.debug("Creating rate limiter for %s", netloc)
+                self._limiters[netloc] = HostLimiter(netloc, rate=self.rate, max_concurrency=self.max_concurrency)
+            return self._limiters[netloc]
+
+class RateLimitedAdapter(HTTPAdapter):
+    """ Transport adapter sending every request through its host's limiter, retrying throttled responses """
+
+    MAX_RETRIES = 5 #retries of a throttled request before giving up
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, max_throttled_retries: int = MAX_RETRIES, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self.max_throttled_retries = max_throttled_retries
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.models.Response:
+        host_limiter = (self.limiter or get_limiter()).host_limiter(request.url)
+
+        for attempt in range(self.max_throttled_retries + 1):
+            host_limiter.acquire()
+            try:
+                resp = super().send(request, *args, **kwargs)
+            except Exception:
+                host_limiter.release()
+                raise
+
+            throttled = is_throttled(resp)
+            #the wait happens in the next acquire, which every request to the host goes through
+            delay = host_limiter.release(throttled, retry_after(resp) if throttled else None)
+            if not throttled:
+                return resp
+
+            if request.method not in IDEMPOTENT_METHODS:
+                #sending it again could repeat what it did, so the host still backs off but the caller decides
+                logger.info("Got status %s for %s %s, not retrying", resp.status_code, request.method, request.url)
+                return resp
+
+            if attempt < self.max_throttled_retries:
+                logger.info("Got status %s for %s, retrying in %.1f seconds", resp.status_code, request.url, delay)
+                resp.close()
+
+        logger.warning("Giving up on %s after %s throttled responses", request.url, attempt + 1)
+        raise RateLimited(f"{urlparse(request.url).netloc} kept answering {resp.status_code} for {request.url}", response=resp)
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+def configure(rate: float = HostLimiter.RATE, max_concurrency: int = HostLimiter.MAX_CONCURRENCY) -> None:
+    """ Configure the rate limiter shared by every session """
+    global _limiter
+    with _limiter_lock:
+        _limiter = RateLimiter(rate=rate, max_concurrency=max_concurrency)
+
+def get_limiter() -> RateLimiter:
+    """ Get the rate limiter shared by every session """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
@@ -0,0 +1,209 @@
+##Written by kelseykm
+
+import requests
+from . import parsing
+from .exceptions import ResolverFailed
+import json
+import logging
+import re
+from urllib.parse import urljoin
+from typing import Any, Optional
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+class Sabishare:
+    """ Class for getting download links from sabishare without a browser """
+
+    TIMEOUT = 10 #timeout for each request
+    MAX_RESPONSE_SIZE = 512 * 1024 #bytes of the xhr response read while looking for the link
+
+    #attributes the download button may carry the xhr endpoint in
+    BUTTON_ATTRIBUTES = ('data-href', 'data-url', 'data-link', 'data-action', 'href')
+    #keys the xhr json response may carry the download url in
+    LINK_KEYS = ('url', 'link', 'href', 'download', 'download_url', 'downloadUrl')
+
+    #tags of the file page and xhr response each lookup needs parsed
+    PAGE_TAGS: parsing.Only = {'*': {'class': re.compile(r'(^|\s)download(-url)?(\s|$)')}, 'script': {}, 'title': {}}
+    LINK_TAGS: parsing.Only = {'*': {'class': 'download-url'}}
+
+    def __init__(self, sess: requests.sessions.Session) -> None:
+        self.sess = sess
+
+    def _find_endpoint(self, page: parsing.Element, page_url: str) -> Optional[str]:
+        """ Find the url the download button's xhr calls """
+
+        logger.debug("Finding download button")
+        button = page.find('*', {'class': 'download'})
+        if button:
+            for attribute in self.BUTTON_ATTRIBUTES:
+                value = button.get(attribute)
+                if value and not value.startswith(('#', 'javascript:')):
+                    return urljoin(page_url, value)
+
+        logger.debug("Looking for download endpoint in page scripts")
+        endpoint_pattern = re.compile(r'''["'](https?://[^"'\s]+/download[^"'\s]*)["']''')
+        for script in page.find_all("script"):
+            endpoint = endpoint_pattern.search(script.text())
+            if endpoint:
+                return endpoint.group(1)
+
+    def _link_from_json(self, data: Any) -> Optional[str]:
+        """ Find the download url under one of the link keys of the xhr's json response, however deep """
+        if isinstance(data, list):
+            for item in data:
+                link = self._link_from_json(item)
+                if link:
+                    return link
+
+        if isinstance(data, dict):
+            for key in self.LINK_KEYS:
+                if isinstance(data.get(key), str) and data[key].startswith('http'):
+                    return data[key]
+            #other strings, e.g. thumbnails, are never taken for the link
+            for value in data.values():
+                link = self._link_from_json(value) if isinstance(value, (dict, list)) else None
+                if link:
+                    return link
+
+    def get_download_link(self, url: str) -> Optional[str]:
+        """ Get download link from sabishare """
+
+        try:
+            logger.debug("Getting sabishare page")
+            with self.sess.get(url, timeout=self.TIMEOUT) as resp:
+                page_url = resp.url
+                status_code = resp.status_code
+                data = resp.content
+        except requests.exceptions.RequestException as e:
+            raise ResolverFailed(f"Could not get {url}: {e}") from e
+
+        if status_code >= 400 and status_code != 404:
+            raise ResolverFailed(f"Got status {status_code} for {url}")
+
+        page = parsing.parse(data, only=self.PAGE_TAGS)
+
+        #stop if video is not available
+        title = page.find('title')
+        if status_code == 404 or (title and '404' in title.text()):
+            logger.warning("URL page not found: %s", page_url)
+            return
+
+        #the link is already on the page if the button was rendered server side
+        link_element = page.find('*', {'class': 'download-url'})
+        if link_element and link_element.get('href'):
+            logger.debug("Getting href from element")
+            return link_element.get('href')
+
+        endpoint = self._find_endpoint(page, page_url)
+        if not endpoint:
+            raise ResolverFailed(f"Download button endpoint not found on {page_url}")
+
+        try:
+            logger.debug("Sending download button xhr")
+            with self.sess.get(
+                    endpoint,
+                    headers={'X-Requested-With': 'XMLHttpRequest', 'Referer': page_url, 'Accept': 'application/json, text/html;q=0.9'},
+                    stream=True,
+                    timeout=self.TIMEOUT
+                    ) as resp:
+                resp.raise_for_status()
+                content_type = resp.headers.get('Content-Type', '')
+                #a button pointing straight at the file is the link, so do not download it
+                if 'json' not in content_type and 'html' not in content_type:
+                    logger.debug("Download button points at the file")
+                    return resp.url
+                data = resp.raw.read(self.MAX_RESPONSE_SIZE, decode_content=True)
+        except requests.exceptions.RequestException as e:
+            raise ResolverFailed(f"Download button xhr to {endpoint} failed: {e}") from e
+
+        if 'json' in content_type:
+            try:
+                data = json.loads(data)
+                #the response may be the link itself
+                link = data if isinstance(data, str) and data.startswith('http') else self._link_from_json(data)
+            except ValueError as e:
+                raise ResolverFailed(f"Invalid json from {endpoint}") from e
+        else:
+            link_element = parsing.parse(data, only=self.LINK_TAGS).find('*', {'class': 'download-url'})
+            link = link_element.get('href') if link_element else None
+
+        if not link:
+            raise ResolverFailed(f"Download link not found in response from {endpoint}")
+
+        return link
+
+class O2tvSeries:
+    """ Class for getting download links from o2tvseries by following redirects without a browser """
+
+    TIMEOUT = 10 #timeout for each request
+    MAX_REDIRECTS = 10
+    MAX_PAGE_SIZE = 512 * 1024 #bytes of an html page read while looking for a redirect
+
+    #markers of pages that need a real browser to get past
+    CHALLENGE_PATTERN = re.compile(
+            r'captcha|cf-challenge|challenge-form|jschl|(window\.|document\.)?location(\.href)?\s*=|location\.(replace|assign)\(',
+            re.IGNORECASE
+    )
+    META_REFRESH_PATTERN = re.compile(r'^\s*\d+\s*(;\s*(url\s*=\s*)?["\']?(?P<url>[^"\']+)["\']?)?\s*$', re.IGNORECASE)
+
+    #attributes of meta refresh tags, the only tags of a page a redirect is looked for on
+    REFRESH_ATTRS: parsing.Attrs = {'http-equiv': re.compile(r'^refresh$', re.IGNORECASE)}
+    PAGE_TAGS: parsing.Only = {'meta': REFRESH_ATTRS}
+
+    def __init__(self, sess: requests.sessions.Session) -> None:
+        self.sess = sess
+
+    def _meta_refresh(self, page: parsing.Element, page_url: str) -> Optional[str]:
+        """ Get the url a meta refresh tag redirects to """
+        for meta in page.find_all("meta", self.REFRESH_ATTRS):
+            refresh = self.META_REFRESH_PATTERN.match(meta.get('content') or '')
+            if refresh and refresh.group('url'):
+                return urljoin(page_url, refresh.group('url').strip())
+
+    def get_download_link(self, url: str) -> str:
+        """ Get download link from o2tvseries """
+
+        current_url = url
+        for _ in range(self.MAX_REDIRECTS):
+            try:
+                logger.debug("Getting %s without following redirects", current_url)
+                with self.sess.get(current_url, allow_redirects=False, stream=True, timeout=self.TIMEOUT) as resp:
+                    if resp.is_redirect:
+                        current_url = urljoin(current_url, resp.headers['Location'])
+                        continue
+
+                    if resp.status_code >= 400:
+                        raise ResolverFailed(f"Got status {resp.status_code} for {current_url}")
+
+                    #anything but an html page is the file itself, so do not download it
+                    if 'html' not in resp.headers.get('Content-Type', ''):
+                        logger.debug("Returning redirected url")
+                        return current_url
+
+                    data = resp.raw.read(self.MAX_PAGE_SIZE, decode_content=True)
+            except requests.exceptions.RequestException as e:
+                raise ResolverFailed(f"Could not get {current_url}: {e}") from e
+
+            page = parsing.parse(data, only=self.PAGE_TAGS)
+
+            refresh_url = self._meta_refresh(page, current_url)
+            if refresh_url:
+                current_url = refresh_url
+                continue
+
+            if self.CHALLENGE_PATTERN.search(data.decode('utf-8', 'replace')):
+                raise ResolverFailed(f"Browser challenge on {current_url}")
+
+            #a plain page is where the browser would have stopped too
+            logger.debug("Returning redirected url")
+            return current_url
+
+        raise ResolverFailed(f"Too many redirects from {url}")
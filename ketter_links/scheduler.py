@@ -0,0 +1,124 @@
+##Written by kelseykm
+
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import logging
+from typing import Any, Hashable, Iterator, Optional
+
+from .crawler import Crawler
+from .output import Link
+from .pool import DriverPool
+from .transport import Transport, get_transport
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+class Scheduler:
+    """ Runs many scrapes at once, sharing one crawler, one transport and one driver pool per driver class """
+
+    MAX_SERIES = 4 #series scraped at once
+    QUEUE_SIZE = 256 #links held for the consumer before the series wait for it
+    WAIT_INTERVAL = 1 #seconds between checks for a stopped run while waiting on the consumer
+
+    def __init__(
+            self,
+            max_series: int = MAX_SERIES,
+            pool_size: int = 1,
+            max_driver_uses: int = DriverPool.MAX_USES,
+            max_workers: int = Crawler.MAX_WORKERS,
+            max_per_host: int = Crawler.MAX_PER_HOST,
+            transport: Optional[Transport] = None
+            ) -> None:
+        if max_series < 1:
+            raise ValueError("Scheduler must scrape at least 1 series at once")
+
+        self.max_series = max_series
+        self.pool_size = pool_size
+        self.max_driver_uses = max_driver_uses
+        #the per host limits live in the crawler, so they hold across all series
+        self.crawler = Crawler(max_workers=max_workers, max_per_host=max_per_host)
+        self.transport = transport or get_transport()
+        self.failed: set[Hashable] = set()
+
+        self._driver_pools: dict[type, DriverPool] = {}
+        self._lock = threading.Lock()
+
+    def driver_pool(self, driver_class: type) -> DriverPool:
+        """ Get the driver pool shared by every scrape needing driver_class, drivers are only launched when used """
+        with self._lock:
+            if driver_class not in self._driver_pools:
+                logger.debug("Creating shared %s driver pool", driver_class.__name__)
+                self._driver_pools[driver_class] = DriverPool(driver_class, size=self.pool_size, max_uses=self.max_driver_uses)
+            return self._driver_pools[driver_class]
+
+    def run(self, jobs: dict[Hashable, Iterator[Link]]) -> Iterator[tuple[Hashable, Link]]:
+        """ Scrape the series in jobs at once, yielding each link with its job's key as soon as it is resolved
+
+        Jobs that raise are logged and added to failed, without stopping the others
+        """
+        results: queue.Queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        stop = threading.Event()
+        done = object()
+
+        def put(item: tuple[Hashable, Any]) -> bool:
+            #give up if the consumer went away, rather than waiting on it forever
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=self.WAIT_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def scrape(key: Hashable, links: Iterator[Link]) -> None:
+            try:
+                for link in links:
+                    if not put((key, link)):
+                        links.close()
+                        return
+            except Exception as e:
+                logger.error("Scraping %s failed: %s", key, e)
+                with self._lock:
+                    self.failed.add(key)
+            finally:
+                put((key, done))
+
+        logger.debug("Scraping %s series, %s at once", len(jobs), self.max_series)
+        executor = ThreadPoolExecutor(max_workers=self.max_series, thread_name_prefix='scheduler')
+        for key, links in jobs.items():
+            executor.submit(scrape, key, links)
+
+        try:
+            remaining = len(jobs)
+            while remaining:
+                key, link = results.get()
+                if link is done:
+                    logger.debug("Finished scraping %s", key)
+                    remaining -= 1
+                    continue
+                yield key, link
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def close(self) -> None:
+        """ Shut down the crawler and close the shared driver pools, the transport outlives the scheduler """
+        self.crawler.close()
+        with self._lock:
+            for driver_pool in self._driver_pools.values():
+                driver_pool.close()
+            self._driver_pools.clear()
+
+    def __enter__(self) -> 'Scheduler':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
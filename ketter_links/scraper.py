@@ -1,12 +1,39 @@
 ##Written by kelseykm
 
 import requests
-from bs4 import BeautifulSoup
-from . import drivers
+from . import drivers, metrics, parsing, resolvers, verify
+from .crawler import Crawler
+from .exceptions import ResolverFailed
+from .journal import Journal
+from .output import Link, season_episode
+from .pool import DriverPool
+from .selection import Selection
+from .transport import Transport, get_transport
+import collections
+import contextlib
 import logging
 import re
 from urllib.parse import ParseResult
-from typing import Optional
+from typing import Any, Callable, ContextManager, Iterable, Iterator, NamedTuple, Optional, TypeVar, Union
+
+R = TypeVar('R')
+
+#tags each extractor needs parsed
+LINK_TAGS: parsing.Only = {'a': {}}
+EPISODES_PAGE_TAGS: parsing.Only = {'a': {}, 'div': {'class': 'pagination'}}
+
+#bytes of a streamed page read at a time
+STREAM_CHUNK_SIZE = 16 * 1024
+
+class Listing(NamedTuple):
+    """ The season and episode numbers listed at a url, and the pages they are listed on """
+    episodes: set[tuple[int, int]]
+    pages: list[str]
+
+def _numbered(links: Iterable[str]) -> set[tuple[int, int]]:
+    """ Get the season and episode numbers of links, skipping links without both """
+    numbers = ( season_episode(link) for link in links )
+    return { (season, episode) for season, episode in numbers if season is not None and episode is not None }
 
 #create logger
 logger = logging.getLogger(__name__)
@@ -19,270 +46,481 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 
-def get_headers(url_netloc: str) -> dict[str, str]:
-    """ Generate headers to be used when making requests """
-    logger.debug(f"Passing header to %s", url_netloc)
-    return {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "Accept-Encoding": "gzip",
-                "Accept-Language": "en",
-                "Dnt": "1",
-                "Host": f"{url_netloc}",
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-Site": "none",
-                "Sec-Fetch-User": "?1",
-                "Upgrade-Insecure-Requests": "1",
-                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.82 Safari/537.36'
-            }
+@contextlib.contextmanager
+def _crawler(crawler: Optional[Crawler]) -> Iterator[Crawler]:
+    """ Use the crawler passed in, or a short-lived one for this call """
+    if crawler is not None:
+        yield crawler
+    else:
+        with Crawler() as crawler:
+            yield crawler
+
+@contextlib.contextmanager
+def _driver_pool(driver_pool: Optional[DriverPool], driver_class: type) -> Iterator[DriverPool]:
+    """ Use the driver pool passed in, or a single-driver pool for this call """
+    if driver_pool is not None:
+        yield driver_pool
+    else:
+        with DriverPool(driver_class) as driver_pool:
+            yield driver_pool
+
+def _journaled(journal: Optional[Journal], kind: str, func: Callable[..., R]) -> Callable[..., R]:
+    """ Skip and record finished work in the journal, if there is one """
+    if journal is None:
+        return func
+    return journal.journaled(kind, func)
+
+def _stream_encoding(resp: requests.models.Response) -> Optional[str]:
+    """ Get the encoding to decode a streamed page with, None for utf-8 """
+    #requests falls back to latin-1 for pages without a charset, which are nearly always utf-8
+    if 'charset' in resp.headers.get('Content-Type', '').lower():
+        return resp.encoding
+
+def _resolve_over_http(url: str, resolver: Union[resolvers.Sabishare, resolvers.O2tvSeries]) -> tuple[Optional[str], bool]:
+    """ Resolve a download link without a browser, returning the link and whether the resolver failed """
+    try:
+        return resolver.get_download_link(url), False
+    except ResolverFailed as e:
+        logger.info("HTTP resolver failed, will use a browser: %s", e)
+        return None, True
+
+def _resolve(url: str, resolver: Union[resolvers.Sabishare, resolvers.O2tvSeries], driver_pool: DriverPool) -> Optional[str]:
+    """ Resolve a download link over http, falling back to the driver pool if the resolver fails """
+    final_link, failed = _resolve_over_http(url, resolver)
+    if failed:
+        logger.debug("Falling back to driver pool for %s", url)
+        final_link = driver_pool.resolve(url)
+    return final_link
+
+def resolve_link(link: Link, transport: Transport, resolver_class: type, driver_pool: DriverPool) -> Optional[Link]:
+    """ Resolve one link, for callers that resolve links one at a time rather than as a stream """
+    final_link = _resolve(link.url, resolver_class(transport.session(cached=False)), driver_pool)
+    if final_link:
+        return Link(final_link, link.season, link.episode, source=link.url)
+
+def _iter_resolved_links(
+        links: Iterable[Link],
+        transport: Transport,
+        resolver_class: type,
+        crawler_context: ContextManager[Crawler],
+        driver_pool_context: ContextManager[DriverPool],
+        journal: Optional[Journal] = None
+        ) -> Iterator[Link]:
+    """ Resolve links over http concurrently, falling back to the driver pool, yielding final links in order as soon as they are resolved """
+
+    with crawler_context as crawler, driver_pool_context as driver_pool:
+        #the links redirect to other hosts, so the host header must not be pinned, and expire, so they are never cached
+        resolver = resolver_class(transport.session(cached=False))
+
+        def resolve(url: str) -> Optional[str]:
+            return _resolve(url, resolver, driver_pool)
+
+        journaled_resolve = _journaled(journal, Journal.LINK, resolve)
+
+        #links are produced lazily, so keep their metadata in step with the urls handed to the crawler
+        pending = collections.deque()
+        def urls() -> Iterator[str]:
+            for link in links:
+                pending.append(link)
+                yield link.url
+
+        def resolved() -> Iterator[Link]:
+            logger.debug("Resolving links")
+            for final_link in crawler.imap(journaled_resolve, urls()):
+                link = pending.popleft()
+                if final_link:
+                    yield Link(final_link, link.season, link.episode, source=link.url)
+
+        verifier = verify.get_verifier()
+        if verifier is None:
+            yield from resolved()
+        else:
+            #dead links are resolved again past the journal, which holds the dead link, by the uncached resolver, so the pages leading to it are read afresh
+            yield from verifier.verify(resolved(), crawler, resolve)
 
 class NetNaija:
     """ Class for scraping netnaija """
 
-    def __init__(self, parsed_url: ParseResult, seasons_regex: str, episodes_regex: str) -> None:
+    #link texts the season and episode numbers are taken from
+    SEASON_PATTERN = re.compile(r'^Season (\d{1,6})$')
+    EPISODE_PATTERN = re.compile(r'^Season \d Episode (\d{1,6})$')
+
+    def __init__(self, parsed_url: ParseResult, seasons: Selection, episodes: Selection, crawler: Optional[Crawler] = None, driver_pool: Optional[DriverPool] = None, journal: Optional[Journal] = None, transport: Optional[Transport] = None) -> None:
         self.parsed_url = parsed_url
         self.url: str = parsed_url.geturl()
-        self.seasons_regex = seasons_regex
-        self.episodes_regex = episodes_regex
+        self.seasons = seasons
+        self.episodes = episodes
+        self.transport = transport or get_transport()
+        self.crawler = crawler
+        self.driver_pool = driver_pool
+        self.journal = journal
 
     def _get_download_links(self) -> Optional[list[str]]:
         """ Get download links from netnaija """
+        return self._crawl_download_links(self.url)
+
+    @classmethod
+    def extract_season_links(cls, data: bytes, seasons: Selection) -> list[str]:
+        """ Get the links of the selected seasons on a series page """
+        soup = parsing.parse(data, only=LINK_TAGS)
+        with metrics.span('regex'):
+            return [
+                element.get('href') for element in soup.find_all("a", text=cls.SEASON_PATTERN)
+                if seasons.select(element.text(), cls.SEASON_PATTERN)
+            ]
+
+    @classmethod
+    def extract_episode_links(cls, data: bytes, episodes: Selection) -> list[str]:
+        """ Get the download page links of the selected episodes on a season page """
+        soup = parsing.parse(data, only=LINK_TAGS)
+        with metrics.span('regex'):
+            # append download to each href to avoid having to go to the final download page
+            return [
+                element.get('href') + "/download" for element in soup.find_all("a", text=cls.EPISODE_PATTERN)
+                if episodes.select(element.text(), cls.EPISODE_PATTERN)
+            ]
+
+    def get_season_links(self, url: str, sess: requests.sessions.Session) -> list[str]:
+        """ Get the links of the selected seasons on the series page at url """
+        with sess.get(url) as resp:
+            data = resp.content
+        return parsing.extract(self.extract_season_links, data, self.seasons)
+
+    def get_episode_links(self, url: str, sess: requests.sessions.Session) -> list[str]:
+        """ Get the download page links of the selected episodes on the season page at url """
+        with sess.get(url) as resp:
+            logger.debug("Getting url content")
+            data = resp.content
+
+        logger.debug("Extracting episode links")
+        return parsing.extract(self.extract_episode_links, data, self.episodes)
+
+    def _crawl_download_links(self, page_url: str) -> Optional[list[str]]:
+        """ Crawl netnaija for the download links of the episodes at page_url """
+
+        sess = self.transport.session(self.parsed_url.netloc)
+        #each page is journaled, so a resumed scrape only reads the season pages it did not finish
+        get_season_links = _journaled(self.journal, Journal.PAGE, self.get_season_links)
+        get_episode_links = _journaled(self.journal, Journal.PAGE, self.get_episode_links)
 
-        logger.debug("Creating requests session")
-        with requests.Session() as sess:
-            logger.debug("Updating session headers")
-            sess.headers.update(get_headers(self.parsed_url.netloc))
-
-            #if season is not specified in url
-            if not re.search(r'/season-\d', self.url):
-                with sess.get(self.url) as resp:
-                    data = resp.content
-
-                soup = BeautifulSoup(data, "html.parser")
-                text_pattern = re.compile(fr'^Season ({self.seasons_regex})$')
-                elements = soup.find_all("a", text=text_pattern)
-                season_links = []
-                if elements:
-                    for element in elements:
-                        season_links.append(element.get('href'))
-
-                episode_links = []
-
-                for url in season_links:
-                    #get episodes
-                    with sess.get(url) as resp:
-                        logger.debug("Getting url content")
-                        data = resp.content
-
-                    # find all links matching the text_pattern regex
-                    logger.debug("Creating beautiful soup parser")
-                    soup = BeautifulSoup(data, "html.parser")
-                    logger.debug("Using beautiful soup object to find elements matching regex")
-                    text_pattern = re.compile(fr'^Season \d Episode ({self.episodes_regex})$')
-                    elements = soup.find_all("a", text=text_pattern)
-
-                    if elements:
-                        # for each element in the ResultSet element, get the href and
-                        # append download to avoid having to go to the final download page
-                        for link in elements:
-                            logger.debug("Getting href from beautiful soup element")
-                            l = link.get('href')
-                            episode_links.append(l + "/download")
+        #if season is not specified in url
+        if not re.search(r'/season-\d', page_url):
+            episode_links = []
+            for url in get_season_links(page_url, sess):
+                episode_links.extend(get_episode_links(url, sess))
 
+            if episode_links:
+                return episode_links
+
+        #if season is specified in url
+        else:
+            #if episode is not specified in url
+            if not re.search(r'episode-\d', page_url):
+                episode_links = get_episode_links(page_url, sess)
                 if episode_links:
                     return episode_links
 
-            #if season is specified in url
-            else:
-                #if episode is not specified in url
-                if not re.search(r'episode-\d', self.url):
-                    #get episodes
-                    with sess.get(self.url) as resp:
-                        logger.debug("Getting url content")
-                        data = resp.content
-
-                    # find all links matching the text_pattern regex
-                    logger.debug("Creating beautiful soup parser")
-                    soup = BeautifulSoup(data, "html.parser")
-                    logger.debug("Using beautiful soup object to find elements matching regex")
-                    text_pattern = re.compile(fr'^Season \d Episode ({self.episodes_regex})$')
-                    elements = soup.find_all("a", text=text_pattern)
-
-                    if elements:
-                        # for each element in the ResultSet element, get the href and
-                        # append download to avoid having to go to the final download page
-                        episode_links = []
-                        for link in elements:
-                            logger.debug("Getting href from beautiful soup element")
-                            l = link.get('href')
-                            episode_links.append(l + "/download")
-
-                        if episode_links:
-                            return episode_links
-
-                #if episode is specified in url
-                elif re.search(r'episode-\d{1,6}/?$', self.url):
-                    return [ self.url + "/download" if not self.url.endswith('/') else self.url + "download" ]
-
-                #if final episode download link
-                elif re.search(r'/download$', self.url):
-                    return [ self.url ]
+            #if episode is specified in url
+            elif re.search(r'episode-\d{1,6}/?$', page_url):
+                return [ page_url + "/download" if not page_url.endswith('/') else page_url + "download" ]
+
+            #if final episode download link
+            elif re.search(r'/download$', page_url):
+                return [ page_url ]
 
         logger.warning("%s - No elements match regex", self.__class__)
 
-    def get_sabishare_links(self) -> Optional[list[str]]:
-        """ Get download links from sabishare """
-        #netnaija stores the videos at sabishare
+    def list_episodes(self) -> Listing:
+        """ List the selected episodes at the url, and the pages they are listed on, without resolving them """
+        if re.search(r'episode-\d', self.url):
+            return Listing(_numbered([self.url]), [])
 
-        download_links = self._get_download_links()
+        sess = self.transport.session(self.parsed_url.netloc)
+        if re.search(r'/season-\d', self.url):
+            season_links = [self.url]
+            pages = []
+        else:
+            season_links = self.get_season_links(self.url, sess)
+            pages = [self.url]
 
-        if download_links:
-            #logger.debug("Creating sabishare object")
-            #sabishare = drivers.Sabishare()
+        with _crawler(self.crawler) as crawler:
+            seasons_episode_links = crawler.map(self.get_episode_links, season_links, sess)
 
-            sabishare_links = []
-            for link in download_links:
-                logger.debug("Creating sabishare object")
-                sabishare = drivers.Sabishare()
+        return Listing(_numbered(link for links in seasons_episode_links for link in links), pages + season_links)
 
-                logger.debug("Getting download link from sabishare object")
-                sabishare_link = sabishare.get_download_link(link)
-                if sabishare_link:
-                    sabishare_links.append(sabishare_link)
+    def iter_download_pages(self) -> Iterator[Link]:
+        """ Get the sabishare pages of the selected episodes, still to be resolved """
+        for link in self._get_download_links() or []:
+            yield Link(link, *season_episode(link))
 
-                logger.debug("Closing sabishare object driver")
-                sabishare.close_driver()
+    def iter_sabishare_links(self) -> Iterator[Link]:
+        """ Get download links from sabishare, yielding each as soon as it is resolved """
+        #netnaija stores the videos at sabishare
 
-            if sabishare_links:
-                return sabishare_links
+        download_links = self._get_download_links()
+
+        if download_links:
+            logger.debug("Getting download links from sabishare")
+            sabishare_links = _iter_resolved_links(
+                ( Link(link, *season_episode(link)) for link in download_links ),
+                self.transport,
+                resolvers.Sabishare,
+                _crawler(self.crawler),
+                _driver_pool(self.driver_pool, drivers.Sabishare),
+                self.journal
+            )
+
+            found = False
+            for sabishare_link in sabishare_links:
+                found = True
+                yield sabishare_link
+
+            if found:
+                return
 
             logger.warning("No Sabishare links found")
 
         logger.warning("%s - No download links available", self.__class__)
 
+    def get_sabishare_links(self) -> Optional[list[str]]:
+        """ Get download links from sabishare """
+        sabishare_links = [ link.url for link in self.iter_sabishare_links() ]
+        if sabishare_links:
+            return sabishare_links
+
 class LightDL:
     """ Class for scraping lightdl """
 
-    def __init__(self, parsed_url: ParseResult, seasons_regex: str, episodes_regex: str) -> None:
+    #link text the season and episode numbers are taken from
+    EPISODE_PATTERN = re.compile(r's0?(\d{1,6})e0?(\d{1,6})', re.I)
+
+    def __init__(self, parsed_url: ParseResult, seasons: Selection, episodes: Selection, crawler: Optional[Crawler] = None, transport: Optional[Transport] = None) -> None:
         self.parsed_url = parsed_url
         self.url: str = parsed_url.geturl()
-        self.seasons_regex = seasons_regex
-        self.episodes_regex = episodes_regex
+        self.seasons = seasons
+        self.episodes = episodes
+        self.transport = transport or get_transport()
+        self.crawler = crawler
+
+    @classmethod
+    def extract_links(cls, data: bytes, seasons: Selection, episodes: Selection) -> list[tuple[str, str]]:
+        """ Get the link and link text of the selected episodes on a post """
+        soup = parsing.parse(data, only=LINK_TAGS)
+        with metrics.span('regex'):
+            return [
+                (element.get('href'), element.text()) for element in soup.find_all("a", text=cls.EPISODE_PATTERN)
+                if seasons.select(element.text(), cls.EPISODE_PATTERN, 1)
+                and episodes.select(element.text(), cls.EPISODE_PATTERN, 2)
+            ]
+
+    def get_links(self) -> list[Link]:
+        """ Get the links of the selected episodes on the post, without verifying them """
+
+        #get the page code
+        sess = self.transport.session(self.parsed_url.netloc)
+        with sess.get(self.url) as resp:
+            logger.debug("Getting url content")
+            data = resp.content
+
+        logger.debug("Extracting episode links")
+        elements = parsing.extract(self.extract_links, data, self.seasons, self.episodes)
+        if not elements:
+            logger.warning("No elements match regex")
+        return [ Link(href, *season_episode(text), source=self.url) for href, text in elements ]
+
+    def iter_download_links(self) -> Iterator[Link]:
+        """ Get download links from lightdl, yielding each as it is found """
+        links = self.get_links()
+        verifier = verify.get_verifier()
+        if verifier is None:
+            yield from links
+            return
+
+        #the links are direct, so dead ones cannot be resolved again
+        with _crawler(self.crawler) as crawler:
+            yield from verifier.verify(links, crawler)
+
+    def list_episodes(self) -> Listing:
+        """ List the selected episodes on the post without checking their links """
+        sess = self.transport.session(self.parsed_url.netloc)
+        with sess.get(self.url) as resp:
+            data = resp.content
+
+        elements = parsing.extract(self.extract_links, data, self.seasons, self.episodes)
+        return Listing(_numbered(text for _, text in elements), [self.url])
 
     def get_download_links(self) -> Optional[list[str]]:
         """ Get download links from lightdl """
-
-        #get the page code
-        logger.debug("Creating requests session")
-        with requests.Session() as sess:
-            logger.debug("Updating session headers")
-            sess.headers.update(get_headers(self.parsed_url.netloc))
-
-            with sess.get(self.url) as resp:
-                logger.debug("Getting url content")
-                data = resp.content
-
-        # find all links matching the text_pattern regex
-        logger.debug("Creating beautiful soup parser")
-        soup = BeautifulSoup(data, "html.parser")
-        logger.debug("Using beautiful soup object to find elements matching regex")
-        text_pattern = re.compile(fr's0?({self.seasons_regex})e0?({self.episodes_regex})', re.I)
-        elements = soup.find_all("a", text=text_pattern)
-
-        if elements:
-            # for each element in the ResultSet element, get the href
-            links = []
-            for link in elements:
-                logger.debug("Getting href from beautiful soup element")
-                links.append(link.get('href'))
-
-            if links:
-                return links
-
-        logger.warning("No elements match regex")
+        links = [ link.url for link in self.iter_download_links() ]
+        if links:
+            return links
 
 class O2tvSeries:
     """ Class for scraping o2tvseries """
 
-    def __init__(self, parsed_url: ParseResult, seasons_regex: str, episodes_regex: str) -> None:
+    #link texts the season and episode numbers are taken from
+    SEASON_PATTERN = re.compile(r'^Season (\d{1,6})$')
+    EPISODE_PATTERN = re.compile(r'^Episode (\d{1,6})')
+    HD_QUALITY_PATTERN = re.compile(r'^Click to Download Episode \d{1,6}(.+)? in HD Mp4 Format$', re.IGNORECASE)
+    QUALITY_PATTERN = re.compile(r'^Click to Download Episode \d{1,6}(.+)? in Mp4 Format$', re.IGNORECASE)
+    PAGE_NUMBER_PATTERN = re.compile(r'page-?(\d{1,6})', re.IGNORECASE) #pagination links, e.g. page2.html
+
+    def __init__(self, parsed_url: ParseResult, seasons: Selection, episodes: Selection, crawler: Optional[Crawler] = None, driver_pool: Optional[DriverPool] = None, journal: Optional[Journal] = None, transport: Optional[Transport] = None) -> None:
         self.parsed_url = parsed_url
         self.url = parsed_url.geturl()
-        self.seasons_regex = seasons_regex
-        self.episodes_regex = episodes_regex
+        self.seasons = seasons
+        self.episodes = episodes
+        self.transport = transport or get_transport()
+        self.crawler = crawler
+        self.driver_pool = driver_pool
+        self.journal = journal
 
     def get_seasons(self, url: str, sess: requests.sessions.Session) -> Optional[list[str]]:
         """ Get season links """
         logger.debug("Getting seasons")
 
-        with sess.get(url) as resp:
-            logger.debug("Getting url content")
-            data = resp.content
-
-        logger.debug("Creating beautiful soup parser")
-        soup = BeautifulSoup(data, "html.parser")
-
-        text_pattern = re.compile(fr'^Season 0?({self.seasons_regex})$')
-
-        logger.debug("Using beautiful soup object to find pages elements")
-        elements = soup.find_all("a", text=text_pattern)
         season_links = []
-        if elements:
-            for element in elements:
+        seen = set()
+        #the season list is near the top, so stop reading once every selected season is found
+        wanted = None if self.seasons.is_everything() else len(self.seasons)
+        with sess.get(url, stream=True) as resp:
+            logger.debug("Parsing page as it streams in")
+            for element in parsing.iter_stream(resp.iter_content(STREAM_CHUNK_SIZE), "a", text=self.SEASON_PATTERN, encoding=_stream_encoding(resp)):
+                number = int(self.SEASON_PATTERN.search(element.text()).group(1))
+                if number not in self.seasons:
+                    continue
                 season_links.append(element.get('href'))
+                seen.add(number)
+                if len(seen) == wanted:
+                    logger.debug("Found every selected season, not reading the rest of the page")
+                    break
 
         if season_links:
             return season_links
 
         logger.warning("No season links found")
 
-    def get_episodes(self, url: str, sess: requests.sessions.Session) -> Optional[list[str]]:
-        """ Get season's episodes """
-        logger.debug("Getting season's episodes")
+    def get_episodes_page(self, url: str, sess: requests.sessions.Session) -> tuple[list[tuple[int, str]], list[str]]:
+        """ Get the number and link of every episode, and the pagination links, on one page of a season """
 
         with sess.get(url) as resp:
             logger.debug("Getting url content")
             data = resp.content
 
-        logger.debug("Creating beautiful soup parser")
-        soup = BeautifulSoup(data, "html.parser")
+        return parsing.extract(self.extract_episodes_page, data)
 
-        logger.debug("Using beautiful soup object to find pages elements")
+    @classmethod
+    def extract_episodes_page(cls, data: bytes) -> tuple[list[tuple[int, str]], list[str]]:
+        """ Get the number and link of every episode, and the pagination links, on a season page """
+        logger.debug("Parsing page")
+        soup = parsing.parse(data, only=EPISODES_PAGE_TAGS)
+
+        logger.debug("Using parsed page to find pages elements")
         pages_element = soup.find("div", {"class": "pagination"})
         pages = []
         if pages_element:
-            for child in pages_element.findChildren("a"):
+            for child in pages_element.find_all("a"):
                 child = child.get('href')
                 pages.append(child)
-        else:
-            logger.warning("Could not find pages element")
-
-        episode_links = []
-
-        logger.debug("Using beautiful soup object to find elements matching regex")
-        text_pattern = re.compile(fr'^Episode 0?({self.episodes_regex})')
-        elements = soup.find_all("a", text=text_pattern)
-        if elements:
-            for element in elements:
-                logger.debug("Getting href from beautiful soup element")
-                episode_links.append(element.get('href'))
-
-        if pages:
-            logger.debug("Getting links from the other pages")
-            for page in pages:
-                with sess.get(page) as resp:
-                    logger.debug("Getting url content")
-                    data = resp.content
-
-                logger.debug("Creating beautiful soup parser")
-                soup = BeautifulSoup(data, "html.parser")
-                logger.debug("Using beautiful soup object to find elements matching regex")
-                text_pattern = re.compile(fr'^Episode 0?({self.episodes_regex})')
-                elements = soup.find_all("a", text=text_pattern)
-
-                if elements:
-                    for element in elements:
-                        logger.debug("Getting href from beautiful soup element")
-                        episode_links.append(element.get('href'))
+
+        episodes = []
+
+        logger.debug("Using parsed page to find elements matching regex")
+        with metrics.span('regex'):
+            for element in soup.find_all("a", text=cls.EPISODE_PATTERN):
+                logger.debug("Getting number and href from element")
+                number = cls.EPISODE_PATTERN.search(element.text())
+                episodes.append((int(number.group(1)), element.get('href')))
+
+        return episodes, pages
+
+    def _plan_pages(self, episodes: list[tuple[int, str]], pages: list[str]) -> tuple[list[str], list[str]]:
+        """ Split the other pages of a season into those expected to hold selected episodes, going by the first page's size and order, and the rest """
+        numbered: dict[int, str] = {}
+        for page in pages:
+            page_number = self.PAGE_NUMBER_PATTERN.search(page)
+            if not page_number:
+                return pages, []
+            #the first page is already read
+            if int(page_number.group(1)) != 1:
+                numbered.setdefault(int(page_number.group(1)), page)
+
+        if not episodes or not numbered or self.episodes.is_everything():
+            return list(numbered.values()), []
+
+        page_size = len(episodes)
+        first = episodes[0][0]
+        ascending = first <= episodes[-1][0]
+        last_page = max(numbered)
+
+        def page_of(number: int) -> int:
+            return (number - first if ascending else first - number) // page_size + 1
+
+        #the episode numbers the season's pages would hold if every page was as full as the first
+        lowest, highest = (first, first + last_page * page_size - 1) if ascending else (first - last_page * page_size + 1, first)
+        wanted_pages: set[int] = set()
+        for start, end in self.episodes.intervals:
+            start, end = max(start, lowest), min(end, highest)
+            if start <= end:
+                wanted_pages.update(range(min(page_of(start), page_of(end)), max(page_of(start), page_of(end)) + 1))
+
+        targeted = [ page for page_number, page in sorted(numbered.items()) if page_number in wanted_pages ]
+        rest = [ page for page_number, page in sorted(numbered.items()) if page_number not in wanted_pages ]
+        return targeted, rest
+
+    def _missing_episodes(self, numbers: list[int]) -> bool:
+        """ Check whether a selected episode numbered between the lowest and highest episodes found is missing, meaning the pages were not where expected """
+        if not numbers:
+            return False
+
+        found = set(numbers)
+        lowest, highest = min(found), max(found)
+        for start, end in self.episodes.intervals:
+            for number in range(max(start, lowest), min(end, highest) + 1):
+                if number not in found:
+                    return True
+        return False
+
+    def _crawl_episodes(self, season_links: list[str], sess: requests.sessions.Session, crawler: Crawler) -> list[list[str]]:
+        """ Get the selected episode links of every season, reading other pages than the expected ones only while selected episodes are missing """
+
+        get_episodes_page = _journaled(self.journal, Journal.PAGE, self.get_episodes_page)
+        first_pages = crawler.map(get_episodes_page, season_links, sess)
+
+        plans = []
+        for season_link, (episodes, season_pages) in zip(season_links, first_pages):
+            if not season_pages:
+                logger.warning("Could not find pages element for %s", season_link)
+            plans.append(self._plan_pages(episodes, season_pages))
+
+        targeted_pages = [ page for targeted, _ in plans for page in targeted ]
+        logger.debug("Getting links from %s other pages expected to hold selected episodes", len(targeted_pages))
+        targeted_iter = iter(crawler.map(get_episodes_page, targeted_pages, sess))
+
+        seasons_episodes = []
+        for (episodes, _), (targeted, rest) in zip(first_pages, plans):
+            episodes = list(episodes)
+            for _ in targeted:
+                episodes.extend(next(targeted_iter)[0])
+
+            rest_iter = iter(rest)
+            while self._missing_episodes([ number for number, _ in episodes ]):
+                page = next(rest_iter, None)
+                if page is None:
+                    break
+                logger.debug("Selected episodes not where expected, getting links from %s", page)
+                episodes.extend(get_episodes_page(page, sess)[0])
+
+            seasons_episodes.append([ link for number, link in episodes if number in self.episodes ])
+
+        return seasons_episodes
+
+    def get_episodes(self, url: str, sess: requests.sessions.Session) -> Optional[list[str]]:
+        """ Get season's episodes """
+        logger.debug("Getting season's episodes")
+
+        with _crawler(self.crawler) as crawler:
+            episode_links = self._crawl_episodes([url], sess, crawler)[0]
 
         if episode_links:
             return episode_links
@@ -293,107 +531,107 @@ class O2tvSeries:
         """ Get episode's quality download link """
         logger.debug("Getting episode's quality download link")
 
-        with sess.get(url) as resp:
-            logger.debug("Getting url content")
-            data = resp.content
-
-        logger.debug("Creating beautiful soup parser")
-        soup = BeautifulSoup(data, "html.parser")
-
-        dl_pattern = re.compile(
-                r'^Click to Download Episode \d{1,6}(.+)? in HD Mp4 Format$',
-                re.IGNORECASE
-        )
-        dl_pattern2 = re.compile(
-                r'^Click to Download Episode \d{1,6}(.+)? in Mp4 Format$',
-                re.IGNORECASE
-        )
-
-        logger.debug("Using beautiful soup object to find elements matching dl_pattern regex")
-        element = soup.find("a", text=dl_pattern)
-        if not element:
-                element = soup.find("a", text=dl_pattern2)
+        element = None
+        with sess.get(url, stream=True) as resp:
+            logger.debug("Parsing page as it streams in")
+            for anchor in parsing.iter_stream(resp.iter_content(STREAM_CHUNK_SIZE), "a", encoding=_stream_encoding(resp)):
+                if anchor.has_children:
+                    continue
+                #the first hd link is all that is needed, an mp4 one is only kept in case there is none
+                if self.HD_QUALITY_PATTERN.search(anchor.text()):
+                    element = anchor
+                    logger.debug("Found hd link, not reading the rest of the page")
+                    break
+                if element is None and self.QUALITY_PATTERN.search(anchor.text()):
+                    element = anchor
 
         if element:
-            logger.debug("Getting href from beautiful soup element")
+            logger.debug("Getting href from element")
             return element.get('href')
 
         logger.warning("No episode quality links found")
 
-    def get_download_links(self) -> Optional[list[str]]:
-        """ Get download links from o2tvseries """
-        logger.debug("Creating requests session")
-        with requests.Session() as sess:
-            logger.debug("Updating session headers")
-            sess.headers.update(get_headers(self.parsed_url.netloc))
-
-            #if no seasons are specified in url
-            if not re.search(r'/season-\d', self.url, re.I):
-                season_links = self.get_seasons(self.url, sess)
-                if not season_links:
-                    return
-
-                combined_episode_links = []
-                for se_link in season_links:
-                    episode_links = self.get_episodes(se_link, sess)
-                    if episode_links:
-                        [ combined_episode_links.append(e_link) for e_link in episode_links ]
-                if not combined_episode_links:
-                    return
-
-                download_links = []
-                for ep_link in combined_episode_links:
-                    episode_quality_link = self.get_episode_quality_link(ep_link, sess)
-                    if episode_quality_link:
-                        download_links.append(episode_quality_link)
-
-                if download_links:
-                    return download_links
-
-            #if season is specified in url
-            else:
-                #if episode is not specified in url
-                if not re.search(r'episode-\d', self.url, re.I):
-                    episode_links = self.get_episodes(self.url, sess)
-                    if not episode_links:
-                        return
-
-                    download_links = []
-                    for ep_link in episode_links:
-                        episode_quality_link = self.get_episode_quality_link(ep_link, sess)
-                        if episode_quality_link:
-                            download_links.append(episode_quality_link)
-
-                    if download_links:
-                        return download_links
-
-                #if episode is specified in url
-                elif re.search(r'episode-\d{1,6}', self.url, re.I):
-                    return [self.get_episode_quality_link(self.url, sess)]
+    def _find_episode_links(self, sess: requests.sessions.Session, crawler: Crawler) -> tuple[list[str], list[str]]:
+        """ Get the selected episode links at the url, and the season pages they are listed on """
+        #if no seasons are specified in url
+        if not re.search(r'/season-\d', self.url, re.I):
+            season_links = _journaled(self.journal, Journal.PAGE, self.get_seasons)(self.url, sess)
+            if not season_links:
+                return [], []
+
+            episode_links = []
+            for season_episode_links in self._crawl_episodes(season_links, sess, crawler):
+                episode_links.extend(season_episode_links)
+            return episode_links, season_links
+
+        #if episode is not specified in url
+        if not re.search(r'episode-\d', self.url, re.I):
+            return self._crawl_episodes([self.url], sess, crawler)[0], [self.url]
+
+        #if episode is specified in url
+        return [self.url], []
+
+    def list_episodes(self) -> Listing:
+        """ List the selected episodes at the url, and the pages they are listed on, without resolving them """
+        sess = self.transport.session(self.parsed_url.netloc)
+        with _crawler(self.crawler) as crawler:
+            episode_links, season_links = self._find_episode_links(sess, crawler)
+
+        pages = season_links if re.search(r'/season-\d', self.url, re.I) else [self.url, *season_links]
+        return Listing(_numbered(episode_links), pages)
+
+    def iter_download_links(self) -> Iterator[Link]:
+        """ Get download links from o2tvseries, yielding each as soon as its episode page is read """
+        get_episode_quality_link = _journaled(self.journal, Journal.PAGE, self.get_episode_quality_link)
+
+        sess = self.transport.session(self.parsed_url.netloc)
+        with _crawler(self.crawler) as crawler:
+            episode_links, _ = self._find_episode_links(sess, crawler)
+            if not episode_links:
+                logger.warning("No episode links found")
+                return
+
+            found = False
+            for episode_link, episode_quality_link in zip(episode_links, crawler.imap(get_episode_quality_link, episode_links, sess)):
+                if episode_quality_link:
+                    found = True
+                    yield Link(episode_quality_link, *season_episode(episode_link), source=episode_link)
+
+            if found:
+                return
 
         logger.warning("%s - No download links found", self.__class__)
 
-    def solve_captcha_and_get_dl_links(self) -> Optional[list[str]]:
-        """ Solve solve captcha and get final download links """
-        links = self.get_download_links()
-
-        if links:
-            logger.debug("Creating drivers.O2tvSeries object")
-            o2tv = drivers.O2tvSeries()
-
-            final_download_links = []
-            for link in links:
-                logger.debug("Getting download link from o2tv object")
-                fdl = o2tv.get_download_link(link)
-                if fdl:
-                    final_download_links.append(fdl)
-
-            logger.debug("Closing o2tv object driver")
-            o2tv.close_driver()
+    def get_download_links(self) -> Optional[list[str]]:
+        """ Get download links from o2tvseries """
+        download_links = [ link.url for link in self.iter_download_links() ]
+        if download_links:
+            return download_links
+
+    def iter_final_links(self) -> Iterator[Link]:
+        """ Solve captcha and get final download links, yielding each as soon as it is resolved """
+        links = self.iter_download_links()
+
+        logger.debug("Following redirects to final download links")
+        final_download_links = _iter_resolved_links(
+            links,
+            self.transport,
+            resolvers.O2tvSeries,
+            _crawler(self.crawler),
+            _driver_pool(self.driver_pool, drivers.O2tvSeries),
+            self.journal
+        )
 
-            if final_download_links:
-                return final_download_links
+        found = False
+        for final_download_link in final_download_links:
+            found = True
+            yield final_download_link
 
+        if not found:
             logger.warning("No final download links found after captcha")
 
-        logger.warning("No links to follow to captcha")
+    def solve_captcha_and_get_dl_links(self) -> Optional[list[str]]:
+        """ Solve solve captcha and get final download links """
+        final_download_links = [ link.url for link in self.iter_final_links() ]
+        if final_download_links:
+            return final_download_links
@@ -1,13 +1,21 @@
 ##Written by kelseykm
 
 import requests
-from bs4 import BeautifulSoup
+from . import index, metrics, parsing
+from .crawler import Crawler
+from .index import IndexEntry
+from .transport import Transport, get_transport
 import logging
 import re
+import posixpath
 from urllib.parse import urlparse, ParseResult
-from typing import Optional
+from typing import Callable, NamedTuple, Optional
 
 
+#tags each extractor needs parsed
+RESULT_TAGS: parsing.Only = {'div': {'class': 'info'}}
+POST_TAGS: parsing.Only = {'h3': {}}
+
 #Set up logger
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
@@ -18,67 +26,94 @@ formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(messag
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
-def get_headers(url_netloc: str) -> dict[str, str]:
-    """ Generate headers to be used when making requests """
-    logger.debug("Passing header to %s", url_netloc)
-    return {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "Accept-Encoding": "gzip",
-                "Accept-Language": "en",
-                "Dnt": "1",
-                "Host": f"{url_netloc}",
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-Site": "none",
-                "Sec-Fetch-User": "?1",
-                "Upgrade-Insecure-Requests": "1",
-                "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.82 Safari/537.36"
-            }
+class IndexMatch(NamedTuple):
+    """ Links the title index has for a search, and whether it has the title searched for rather than only titles like it """
+    links: set[str]
+    exact: bool = False
+
+def search_indexed(match: IndexMatch, search_live: Callable[[], Optional[set[str]]]) -> Optional[set[str]]:
+    """ Answer from the title index if it has the title, otherwise search live, adding the index's near matches """
+    if match.exact:
+        return match.links
+
+    links = match.links | (search_live() or set())
+    return links or None
 
 class NetNaija:
     """ Class for searching netnaija """
 
     # search url
     url = "https://www.thenetnaija.com/search"
+    # series listing url, newest first
+    listing_url = "https://www.thenetnaija.com/videos/series"
+
+    SITE = 'netnaija' #name the site's titles are indexed under
+    TIMEOUT = 15 #timeout for each search request
+    RESULTS_PER_PAGE = 20 #results on a full search page
+    MAX_PAGES = 5 #search pages read when the first page is full
+    MAX_LISTING_PAGES = 1000 #listing pages read when building the index
+
+    #links to a series, or to a season or episode of it
+    SERIES_URL_PATTERN = re.compile(r'^(?P<series>.+/videos/series/\d+-(?P<slug>[^/?#]+))(?:/season-(?P<season>\d{1,6})(?:/episode-\d{1,6})?)?/?$', re.I)
+    SEASON_SUFFIX_PATTERN = re.compile(r'\W*\bseason\s*\d+.*$', re.I)
 
-    def __init__(self, search_string: str) -> None:
+    def __init__(self, search_string: str = '', transport: Optional[Transport] = None) -> None:
         self.search_string = search_string
         self.parsed_url: ParseResult = urlparse(self.url)
+        self.transport = transport or get_transport()
 
-    def create_search_parameters(self) -> dict[str, str]:
+    def create_search_parameters(self, page: int = 1) -> dict[str, str]:
         """ Create parameters to be passed with search url """
         logger.debug('Creating search parameters')
-        return {
+        parameters = {
             't': f'{self.search_string}',
             'folder': 'videos',
         }
+        if page > 1:
+            parameters['page'] = str(page)
+        return parameters
 
-    def search(self) -> Optional[list[str]]:
-        """ Send search request to netnaija and return results """
-
-        logger.debug("Creating requests session")
-        with requests.session() as sess:
-            logger.debug("Updating session headers")
-            sess.headers.update(get_headers(self.parsed_url.netloc))
+    def search_page(self, url: str, sess: requests.sessions.Session) -> tuple[int, list[str]]:
+        """ Get the number of results on a search page and their links """
 
-            logger.debug('Starting search')
-            with sess.get(url=self.url, params=self.create_search_parameters()) as resp:
-                logger.debug("Search url: %s", resp.url)
-                data = resp.content
+        with sess.get(url=url, timeout=self.TIMEOUT) as resp:
+            logger.debug("Search url: %s", resp.url)
+            data = resp.content
 
-        logger.debug("Creating beautiful soup object")
-        soup = BeautifulSoup(data, "html.parser")
+        logger.debug("Parsing page")
+        soup = parsing.parse(data, only=RESULT_TAGS)
 
-        logger.debug("Using beautiful soup object to find results")
+        logger.debug("Using parsed page to find results")
         results = soup.find_all("div", {'class': 'info'})
 
-        if results:
-            results_links = []
+        results_links = []
+        for result in results:
+            for res_link in result.find_all("a"):
+                results_links.append(res_link.get('href'))
 
-            for result in results:
-                for res_link in result.findChildren("a"):
-                    results_links.append(res_link.get('href'))
+        return len(results), results_links
 
+    def search(self) -> Optional[list[str]]:
+        """ Send search request to netnaija and return results """
+
+        page_urls = [
+            requests.Request('GET', self.url, params=self.create_search_parameters(page)).prepare().url
+            for page in range(1, self.MAX_PAGES + 1)
+        ]
+
+        sess = self.transport.session(self.parsed_url.netloc)
+
+        logger.debug('Starting search')
+        results_count, results_links = self.search_page(page_urls[0], sess)
+
+        #a full first page means there are more results on the next pages
+        if results_count >= self.RESULTS_PER_PAGE:
+            logger.debug("Getting the next search pages")
+            with Crawler() as crawler:
+                for _, page_links in crawler.map(self.search_page, page_urls[1:], sess):
+                    results_links.extend(page_links)
+
+        if results_links:
             return results_links
 
         logger.warning("No results found for %s", self.search_string)
@@ -130,6 +165,69 @@ class NetNaija:
 
         return fields
 
+    def listing_page(self, page: int, sess: requests.sessions.Session) -> list[IndexEntry]:
+        """ Get the series, and seasons of them, on a page of netnaija's series listing """
+
+        params = {'page': str(page)} if page > 1 else None
+        with sess.get(url=self.listing_url, params=params, timeout=self.TIMEOUT) as resp:
+            logger.debug("Listing url: %s", resp.url)
+            data = resp.content
+
+        logger.debug("Parsing page")
+        soup = parsing.parse(data, only=RESULT_TAGS)
+
+        entries = []
+        for result in soup.find_all("div", {'class': 'info'}):
+            for element in result.find_all("a"):
+                link = self.SERIES_URL_PATTERN.match(element.get('href') or '')
+                if not link:
+                    continue
+                season = link.group('season')
+                title = self.SEASON_SUFFIX_PATTERN.sub('', element.text()).strip() or link.group('slug').replace('-', ' ')
+                entries.append(IndexEntry(
+                    self.SITE,
+                    title,
+                    link.group('slug'),
+                    link.group('series') + (f'/season-{season}' if season else ''),
+                    link.group('series'),
+                    int(season) if season else None
+                ))
+
+        return entries
+
+    def refresh_index(self, full: bool = False, max_pages: int = MAX_LISTING_PAGES) -> int:
+        """ Crawl netnaija's series listing into the title index, returning how many titles were new """
+        title_index = index.get_index()
+        if title_index is None:
+            return 0
+
+        sess = self.transport.session(self.parsed_url.netloc)
+        return title_index.refresh(self.SITE, lambda page: self.listing_page(page, sess), max_pages, full)
+
+    def lookup(self) -> IndexMatch:
+        """ Get links from the title index, exact if it has the title searched for """
+        title_index = index.get_index()
+        fields = self.generate_search_regex_fields()
+        #episodes are not indexed
+        if title_index is None or 'episode' in fields or 'series' not in fields:
+            return IndexMatch(set())
+
+        matches = title_index.match(self.SITE, fields['series'].replace('-', ' '))
+        if 'season' in fields:
+            season = int(fields['season'].split('-')[-1])
+            matches = [ (entry, prefixed) for entry, prefixed in matches if entry.season == season ]
+            links = { entry.url for entry, _ in matches }
+        else:
+            links = { entry.series_url for entry, _ in matches }
+
+        if any(prefixed for _, prefixed in matches):
+            metrics.count('index_hits', site=self.SITE)
+            return IndexMatch(links, exact=True)
+
+        logger.debug("%s not in the title index", self.search_string)
+        metrics.count('index_misses', site=self.SITE)
+        return IndexMatch(links)
+
     def get_links_from_results(self) -> Optional[set[str]]:
         """ Get links from search results """
         results = self.search()
@@ -137,21 +235,22 @@ class NetNaija:
             fields = self.generate_search_regex_fields()
             links = set()
             logger.debug("Getting links from results")
-            for result in results:
-                if 'season' in fields and 'episode' in fields:
-                    link = re.search(fr"(.+{fields['series']}/{fields['season']}/{fields['episode']})", result, re.I)
-                    if link:
-                        links.add(link.group(0))
-
-                elif 'season' in fields:
-                    link = re.search(fr"(.+{fields['series']}/{fields['season']})(.+)?", result, re.I)
-                    if link:
-                        links.add(link.group(1))
-
-                else:
-                    link = re.search(fr"(.+{fields['series']})/(.+)", result, re.I)
-                    if link:
-                        links.add(link.group(1))
+            with metrics.span('regex'):
+                for result in results:
+                    if 'season' in fields and 'episode' in fields:
+                        link = re.search(fr"(.+{fields['series']}/{fields['season']}/{fields['episode']})", result, re.I)
+                        if link:
+                            links.add(link.group(0))
+
+                    elif 'season' in fields:
+                        link = re.search(fr"(.+{fields['series']}/{fields['season']})(.+)?", result, re.I)
+                        if link:
+                            links.add(link.group(1))
+
+                    else:
+                        link = re.search(fr"(.+{fields['series']})/(.+)", result, re.I)
+                        if link:
+                            links.add(link.group(1))
 
             if links:
                 return links
@@ -164,19 +263,30 @@ class NetNaija:
 class LightDl:
     """ Class for searching lightdl """
 
-    # search url
+    # search url, which lists every post, newest first, without a query
     url = "https://www.lightdl.xyz/search"
 
-    def __init__(self, search_string: str) -> None:
+    SITE = 'lightdl' #name the site's titles are indexed under
+    TIMEOUT = 15 #timeout for each search request
+    RESULTS_PER_PAGE = 20 #results on a full search page
+    MAX_PAGES = 5 #search pages read when the first page is full
+    MAX_LISTING_PAGES = 1000 #listing pages read when building the index
+
+    def __init__(self, search_string: str = '', transport: Optional[Transport] = None) -> None:
         self.search_string = search_string
         self.parsed_url: ParseResult = urlparse(self.url)
+        self.transport = transport or get_transport()
 
-    def create_search_parameters(self, search_string: str) -> dict[str, str]:
+    def create_search_parameters(self, search_string: str, page: int = 1) -> dict[str, str]:
         """ Create parameters to be passed with search url """
         logger.debug('Creating search parameters')
-        return {
+        parameters = {
             'q': search_string,
+            'max-results': str(self.RESULTS_PER_PAGE),
         }
+        if page > 1:
+            parameters['start'] = str((page - 1) * self.RESULTS_PER_PAGE)
+        return parameters
 
     def safe_search_string(self, search_string: str = None) -> str:
         """ Escape regex special characters in string """
@@ -231,42 +341,100 @@ class LightDl:
 
         return fields
 
-    def search(self) -> Optional[set[str]]:
-        """ Send search request to lightdl and return parsed results """
-        fields = self.generate_search_regex_fields()
+    def search_page(self, url: str, sess: requests.sessions.Session, text_pattern: re.Pattern) -> tuple[int, set[str]]:
+        """ Get the number of posts on a search page and the links of those matching text_pattern """
+
+        with sess.get(url=url, timeout=self.TIMEOUT) as resp:
+            logger.debug("Search url: %s", resp.url)
+            data = resp.content
 
-        logger.debug("Creating requests session")
-        with requests.session() as sess:
-            logger.debug("Updating session headers")
-            sess.headers.update(get_headers(self.parsed_url.netloc))
+        logger.debug("Parsing page")
+        soup = parsing.parse(data, only=POST_TAGS)
 
-            logger.debug('Starting search')
-            with sess.get(url=self.url, params=self.create_search_parameters(fields['series'])) as resp:
-                logger.debug("Search url: %s", resp.url)
-                data = resp.content
+        logger.debug("Using parsed page to find results")
+        post_bodies = soup.find_all("h3")
 
-        logger.debug("Creating beautiful soup object")
-        soup = BeautifulSoup(data, "html.parser")
+        links = set()
+        with metrics.span('regex'):
+            for element in post_bodies:
+                result = element.find("a", { 'title': text_pattern })
+                if result:
+                    links.add(result.get('href'))
+
+        return len(post_bodies), links
+
+    def listing_page(self, page: int, sess: requests.sessions.Session) -> list[IndexEntry]:
+        """ Get the posts on a page of lightdl's post listing """
+
+        params = {'max-results': str(self.RESULTS_PER_PAGE)}
+        if page > 1:
+            params['start'] = str((page - 1) * self.RESULTS_PER_PAGE)
+        with sess.get(url=self.url, params=params, timeout=self.TIMEOUT) as resp:
+            logger.debug("Listing url: %s", resp.url)
+            data = resp.content
+
+        logger.debug("Parsing page")
+        soup = parsing.parse(data, only=POST_TAGS)
+
+        entries = []
+        for element in soup.find_all("h3"):
+            result = element.find("a")
+            if not result or not result.get('href'):
+                continue
+            url = result.get('href')
+            slug = posixpath.splitext(posixpath.basename(urlparse(url).path))[0]
+            entries.append(IndexEntry(self.SITE, result.get('title') or result.text(), slug, url, url))
+
+        return entries
+
+    def refresh_index(self, full: bool = False, max_pages: int = MAX_LISTING_PAGES) -> int:
+        """ Crawl lightdl's post listing into the title index, returning how many titles were new """
+        title_index = index.get_index()
+        if title_index is None:
+            return 0
+
+        sess = self.transport.session(self.parsed_url.netloc)
+        return title_index.refresh(self.SITE, lambda page: self.listing_page(page, sess), max_pages, full)
+
+    def lookup(self) -> IndexMatch:
+        """ Get links from the title index, exact if it has the title searched for """
+        title_index = index.get_index()
+        if title_index is None:
+            return IndexMatch(set())
+
+        matches = title_index.match(self.SITE, self.generate_search_regex_fields()['series'])
+        links = { entry.url for entry, _ in matches }
+        if any(prefixed for _, prefixed in matches):
+            metrics.count('index_hits', site=self.SITE)
+            return IndexMatch(links, exact=True)
+
+        logger.debug("%s not in the title index", self.search_string)
+        metrics.count('index_misses', site=self.SITE)
+        return IndexMatch(links)
 
-        logger.debug("Using beautiful soup object to find results")
+    def search(self) -> Optional[set[str]]:
+        """ Send search request to lightdl and return parsed results """
+        fields = self.generate_search_regex_fields()
 
         text_pattern = re.compile(fr"^(\s)?({self.safe_search_string(fields['series'])})(\s)?$", re.I)
+        page_urls = [
+            requests.Request('GET', self.url, params=self.create_search_parameters(fields['series'], page)).prepare().url
+            for page in range(1, self.MAX_PAGES + 1)
+        ]
 
-        post_bodies = soup.find_all("h3")
-        if post_bodies:
-            results = set()
-            for element in post_bodies:
-                result = element.findChild("a", { 'title': text_pattern })
-                if result:
-                    results.add(result)
+        sess = self.transport.session(self.parsed_url.netloc)
 
-            links = set()
-            if results:
-                for result in results:
-                    link = result.get('href')
-                    links.add(link)
+        logger.debug('Starting search')
+        posts_count, links = self.search_page(page_urls[0], sess, text_pattern)
 
-            if links:
-                return links
+        #a full first page means there are more posts on the next pages
+        if posts_count >= self.RESULTS_PER_PAGE:
+            logger.debug("Getting the next search pages")
+            with Crawler() as crawler:
+                for _, page_links in crawler.map(self.search_page, page_urls[1:], sess, text_pattern):
+                    links.update(page_links)
+
+        if links:
+            return links
 
         logger.warning("%s - No results found for %s", self.__class__, fields['series'])
@@ -0,0 +1,115 @@
+##Written by kelseykm
+
+import bisect
+import re
+from typing import Iterable, Iterator, Optional
+
+#seasons and episodes are numbered with up to 6 digits
+MAX_NUMBER = 999999
+
+class Selection:
+    """ Season or episode numbers to scrape, kept as sorted, merged intervals so membership takes O(log n) however many numbers there are """
+
+    #'5', '[3-7]', '[1,4,9]' or '[4,9-11]'
+    PART_PATTERN = re.compile(r'^\s*(\d{1,6})\s*(?:-\s*(\d{1,6})\s*)?$')
+
+    def __init__(self, intervals: Iterable[tuple[int, int]] = ()) -> None:
+        merged: list[tuple[int, int]] = []
+        for start, end in sorted(intervals):
+            if start > end:
+                raise ValueError(f"Interval {start}-{end} ends before it starts")
+            #merge overlapping and touching intervals, so each number is in at most one
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+
+        self.intervals = merged
+        self._starts = [ start for start, _ in merged ]
+
+    @classmethod
+    def everything(cls) -> 'Selection':
+        """ Select every number """
+        return cls([(0, MAX_NUMBER)])
+
+    @classmethod
+    def single(cls, number: int) -> 'Selection':
+        """ Select one number """
+        return cls([(number, number)])
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Selection':
+        """ Parse a selection written as on the command line, e.g. '5', '[3-7]' or '[4,9-11]' """
+        spec = spec.strip()
+        if spec.startswith('['):
+            if not spec.endswith(']'):
+                raise ValueError(f"Unclosed bracket in {spec}")
+            spec = spec[1:-1]
+        elif not spec.isdigit():
+            raise ValueError(f"Ranges and lists must be in square brackets: {spec}")
+
+        intervals = []
+        for part in spec.split(','):
+            if not part.strip():
+                continue
+            interval = cls.PART_PATTERN.match(part)
+            if not interval:
+                raise ValueError(f"Invalid season or episode number {part.strip()}")
+            start = int(interval.group(1))
+            end = int(interval.group(2)) if interval.group(2) else start
+            intervals.append((start, end))
+
+        if not intervals:
+            raise ValueError("No season or episode numbers")
+        return cls(intervals)
+
+    @classmethod
+    def load(cls, text: str) -> 'Selection':
+        """ Read back a selection written with str(), e.g. 'all' or '1-5,9' """
+        return cls.everything() if text == 'all' else cls.parse(f'[{text}]')
+
+    def __contains__(self, number: object) -> bool:
+        if not isinstance(number, int):
+            return False
+        index = bisect.bisect_right(self._starts, number) - 1
+        return index >= 0 and number <= self.intervals[index][1]
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in self.intervals:
+            yield from range(start, end + 1)
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in self.intervals)
+
+    def __bool__(self) -> bool:
+        return bool(self.intervals)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Selection) and self.intervals == other.intervals
+
+    def __str__(self) -> str:
+        if self.is_everything():
+            return 'all'
+        return ','.join(str(start) if start == end else f'{start}-{end}' for start, end in self.intervals)
+
+    def __repr__(self) -> str:
+        return f'Selection({self})'
+
+    def is_everything(self) -> bool:
+        """ Check whether every number is selected """
+        return self.intervals == [(0, MAX_NUMBER)]
+
+    def first(self) -> Optional[int]:
+        """ Get the lowest number selected """
+        if self.intervals:
+            return self.intervals[0][0]
+
+    def last(self) -> Optional[int]:
+        """ Get the highest number selected """
+        if self.intervals:
+            return self.intervals[-1][1]
+
+    def select(self, text: str, pattern: re.Pattern, group: int = 1) -> bool:
+        """ Check whether the number pattern finds in text is selected """
+        number = pattern.search(text)
+        return number is not None and int(number.group(group)) in self
@@ -0,0 +1,54 @@
+##Written by kelseykm
+
+import importlib
+import logging
+from types import ModuleType
+from typing import NamedTuple, Optional
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+class Site(NamedTuple):
+    """ A site that can be scraped, and maybe searched, whose plugin module is only imported once the site is used """
+
+    name: str
+    netloc: str
+    module: str #module with the site's scrape, list_episodes, crawl and resolve functions, and its search function if it is searchable
+    searchable: bool = False
+
+    def load(self) -> ModuleType:
+        """ Import the site's plugin module """
+        logger.debug("Loading %s plugin from %s", self.name, self.module)
+        return importlib.import_module(self.module)
+
+#every site, by the netloc of its urls
+_sites: dict[str, Site] = {}
+
+def register(site: Site) -> None:
+    """ Add a site to the registry """
+    if site.netloc in _sites:
+        raise ValueError(f"A site is already registered for {site.netloc}")
+    _sites[site.netloc] = site
+
+def get_site(netloc: str) -> Optional[Site]:
+    """ Get the site urls with netloc belong to, or None if it is not implemented """
+    return _sites.get(netloc)
+
+def get_sites() -> list[Site]:
+    """ Get every registered site """
+    return list(_sites.values())
+
+def searchable_sites() -> list[Site]:
+    """ Get every site that can be searched """
+    return [ site for site in _sites.values() if site.searchable ]
+
+register(Site('netnaija', 'www.thenetnaija.com', 'ketter_links.sites.netnaija', searchable=True))
+register(Site('lightdl', 'www.lightdl.xyz', 'ketter_links.sites.lightdl', searchable=True))
+register(Site('o2tvseries', 'o2tvseries.com', 'ketter_links.sites.o2tvseries'))
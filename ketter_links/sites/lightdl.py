@@ -0,0 +1,64 @@
+##Written by kelseykm
+
+import logging
+from urllib.parse import ParseResult
+from typing import Iterator, Optional
+
+from .. import scraper
+from .. import search as searcher
+from ..journal import Journal
+from ..output import Link
+from ..scheduler import Scheduler
+from ..selection import Selection
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+def scrape(parsed_url: ParseResult, seasons: Selection, episodes: Selection, sched: Scheduler, scrape_journal: Optional[Journal] = None) -> Iterator[Link]:
+    """ LightDL scraper """
+    logger.debug("Started lightdl scraper")
+
+    lightdl = scraper.LightDL(parsed_url, seasons, episodes, crawler=sched.crawler, transport=sched.transport)
+    yield from lightdl.iter_download_links()
+
+def list_episodes(parsed_url: ParseResult, seasons: Selection, episodes: Selection, sched: Scheduler) -> scraper.Listing:
+    """ LightDL episode lister """
+    logger.debug("Started lightdl episode lister")
+
+    return scraper.LightDL(parsed_url, seasons, episodes, crawler=sched.crawler, transport=sched.transport).list_episodes()
+
+def crawl(parsed_url: ParseResult, seasons: Selection, episodes: Selection, sched: Scheduler) -> Iterator[Link]:
+    """ LightDL crawler, yielding the links of the selected episodes still to be resolved """
+    logger.debug("Started lightdl crawler")
+
+    #the links are verified, if at all, when they are resolved
+    lightdl = scraper.LightDL(parsed_url, seasons, episodes, crawler=sched.crawler, transport=sched.transport)
+    yield from lightdl.get_links()
+
+def resolve(link: Link, sched: Scheduler) -> Optional[Link]:
+    """ LightDL link resolver """
+    logger.debug("Resolving %s", link.url)
+
+    #lightdl links are direct, there is nothing to resolve
+    return link
+
+def search(search_string: str) -> Optional[set[str]]:
+    """ LightDL searcher """
+    logger.debug("Started lightdl searcher")
+
+    lightdl = searcher.LightDl(search_string=search_string)
+    #answer from the title index if it has the title, searching live if it only has titles like it
+    return searcher.search_indexed(lightdl.lookup(), lightdl.search)
+
+def refresh_index(full: bool = False, max_pages: int = searcher.LightDl.MAX_LISTING_PAGES) -> int:
+    """ LightDL title indexer """
+    logger.debug("Started lightdl indexer")
+
+    return searcher.LightDl().refresh_index(full=full, max_pages=max_pages)
@@ -0,0 +1,70 @@
+##Written by kelseykm
+
+import logging
+from urllib.parse import ParseResult
+from typing import Iterator, Optional
+
+from .. import drivers, resolvers, scraper
+from .. import search as searcher
+from ..journal import Journal
+from ..output import Link
+from ..scheduler import Scheduler
+from ..selection import Selection
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+def scrape(parsed_url: ParseResult, seasons: Selection, episodes: Selection, sched: Scheduler, scrape_journal: Optional[Journal] = None) -> Iterator[Link]:
+    """ NetNaija scraper """
+    logger.debug("Started netnaija scraper")
+
+    net_naija = scraper.NetNaija(
+        parsed_url,
+        seasons,
+        episodes,
+        crawler=sched.crawler,
+        driver_pool=sched.driver_pool(drivers.Sabishare),
+        journal=scrape_journal,
+        transport=sched.transport
+    )
+    yield from net_naija.iter_sabishare_links()
+
+def list_episodes(parsed_url: ParseResult, seasons: Selection, episodes: Selection, sched: Scheduler) -> scraper.Listing:
+    """ NetNaija episode lister """
+    logger.debug("Started netnaija episode lister")
+
+    return scraper.NetNaija(parsed_url, seasons, episodes, crawler=sched.crawler, transport=sched.transport).list_episodes()
+
+def crawl(parsed_url: ParseResult, seasons: Selection, episodes: Selection, sched: Scheduler) -> Iterator[Link]:
+    """ NetNaija crawler, yielding the links of the selected episodes still to be resolved """
+    logger.debug("Started netnaija crawler")
+
+    net_naija = scraper.NetNaija(parsed_url, seasons, episodes, crawler=sched.crawler, transport=sched.transport)
+    yield from net_naija.iter_download_pages()
+
+def resolve(link: Link, sched: Scheduler) -> Optional[Link]:
+    """ NetNaija link resolver """
+    logger.debug("Resolving %s", link.url)
+
+    return scraper.resolve_link(link, sched.transport, resolvers.Sabishare, sched.driver_pool(drivers.Sabishare))
+
+def search(search_string: str) -> Optional[set[str]]:
+    """ NetNaija searcher """
+    logger.debug("Started netnaija searcher")
+
+    netnaija = searcher.NetNaija(search_string=search_string)
+    #answer from the title index if it has the title, searching live if it only has titles like it
+    return searcher.search_indexed(netnaija.lookup(), netnaija.get_links_from_results)
+
+def refresh_index(full: bool = False, max_pages: int = searcher.NetNaija.MAX_LISTING_PAGES) -> int:
+    """ NetNaija title indexer """
+    logger.debug("Started netnaija indexer")
+
+    return searcher.NetNaija().refresh_index(full=full, max_pages=max_pages)
@@ -0,0 +1,55 @@
+##Written by kelseykm
+
+import logging
+from urllib.parse import ParseResult
+from typing import Iterator, Optional
+
+from .. import drivers, resolvers, scraper
+from ..journal import Journal
+from ..output import Link
+from ..scheduler import Scheduler
+from ..selection import Selection
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+def scrape(parsed_url: ParseResult, seasons: Selection, episodes: Selection, sched: Scheduler, scrape_journal: Optional[Journal] = None) -> Iterator[Link]:
+    """ O2tvSeries scraper """
+    logger.debug("Started o2tvseries scraper")
+
+    o2tvseries = scraper.O2tvSeries(
+        parsed_url,
+        seasons,
+        episodes,
+        crawler=sched.crawler,
+        driver_pool=sched.driver_pool(drivers.O2tvSeries),
+        journal=scrape_journal,
+        transport=sched.transport
+    )
+    yield from o2tvseries.iter_final_links()
+
+def list_episodes(parsed_url: ParseResult, seasons: Selection, episodes: Selection, sched: Scheduler) -> scraper.Listing:
+    """ O2tvSeries episode lister """
+    logger.debug("Started o2tvseries episode lister")
+
+    return scraper.O2tvSeries(parsed_url, seasons, episodes, crawler=sched.crawler, transport=sched.transport).list_episodes()
+
+def crawl(parsed_url: ParseResult, seasons: Selection, episodes: Selection, sched: Scheduler) -> Iterator[Link]:
+    """ O2tvSeries crawler, yielding the links of the selected episodes still to be resolved """
+    logger.debug("Started o2tvseries crawler")
+
+    o2tvseries = scraper.O2tvSeries(parsed_url, seasons, episodes, crawler=sched.crawler, transport=sched.transport)
+    yield from o2tvseries.iter_download_links()
+
+def resolve(link: Link, sched: Scheduler) -> Optional[Link]:
+    """ O2tvSeries link resolver """
+    logger.debug("Resolving %s", link.url)
+
+    return scraper.resolve_link(link, sched.transport, resolvers.O2tvSeries, sched.driver_pool(drivers.O2tvSeries))
@@ -0,0 +1,319 @@
+##Written by kelseykm
+
+import requests
+import urllib3
+import urllib3.connection
+import urllib3.exceptions
+import functools
+import importlib.util
+import logging
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+from typing import Any, Callable, Optional
+
+from . import cache, metrics, ratelimit
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+#urllib3 decodes brotli bodies when either brotli module is installed
+BROTLI = any(importlib.util.find_spec(module) is not None for module in ('brotli', 'brotlicffi'))
+
+def get_headers(url_netloc: Optional[str] = None) -> dict[str, str]:
+    """ Generate headers to be used when making requests, pinning the host if given """
+    logger.debug("Passing header to %s", url_netloc)
+    headers = {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
+        "Accept-Encoding": "gzip, deflate, br" if BROTLI else "gzip, deflate",
+        "Accept-Language": "en",
+        "Connection": "keep-alive",
+        "Dnt": "1",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "none",
+        "Sec-Fetch-User": "?1",
+        "Upgrade-Insecure-Requests": "1",
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.82 Safari/537.36"
+    }
+    if url_netloc:
+        headers["Host"] = url_netloc
+    return headers
+
+class DnsCache:
+    """ Cache of resolved host addresses, so new connections to a host skip the lookup """
+
+    TTL = 5 * 60 #seconds an address is used before it is looked up again
+
+    def __init__(self, ttl: float = TTL) -> None:
+        self.ttl = ttl
+        self._addresses: dict[tuple[str, int], tuple[float, list[str]]] = {}
+        self._lock = threading.Lock()
+
+    def addresses(self, host: str, port: int) -> list[str]:
+        """ Look up a host's addresses, using the cached ones while they are fresh """
+        key = (host, port)
+        with self._lock:
+            cached = self._addresses.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+
+        logger.debug("Looking up %s", host)
+        addresses = list(dict.fromkeys(sockaddr[0] for _, _, _, _, sockaddr in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)))
+        with self._lock:
+            self._addresses[key] = (time.monotonic(), addresses)
+        return addresses
+
+class DnsCachedConnection:
+    """ Mixin connecting urllib3 connections to the cached addresses of their host """
+
+    def __init__(self, *args: Any, dns_cache: DnsCache, **kwargs: Any) -> None:
+        self.dns_cache = dns_cache
+        super().__init__(*args, **kwargs)
+
+    def _new_conn(self) -> socket.socket:
+        host = self._dns_host
+        try:
+            addresses = self.dns_cache.addresses(host, self.port)
+        except OSError:
+            #urllib3 looks it up again, reporting the failure its own way
+            return super()._new_conn()
+
+        error: Optional[Exception] = None
+        for address in addresses:
+            #tls still checks the certificate against the host name, not the address connected to
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError) as e:
+                error = e
+            finally:
+                self._dns_host = host
+        if error is None:
+            return super()._new_conn()
+        raise error
+
+class DnsCachedHTTPConnection(DnsCachedConnection, urllib3.connection.HTTPConnection):
+    pass
+
+class DnsCachedHTTPSConnection(DnsCachedConnection, urllib3.connection.HTTPSConnection):
+    pass
+
+class DnsCachedPoolManager(urllib3.PoolManager):
+    """ Pool manager whose connections look their hosts up in a dns cache """
+
+    def __init__(self, dns_cache: DnsCache, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.dns_cache = dns_cache
+
+    def _new_pool(self, scheme: str, host: str, port: int, request_context: Optional[dict[str, Any]] = None) -> Any:
+        pool = super()._new_pool(scheme, host, port, request_context)
+        pool.ConnectionCls = DnsCachedHTTPSConnection if scheme == 'https' else DnsCachedHTTPConnection
+        pool.conn_kw = {**pool.conn_kw, 'dns_cache': self.dns_cache}
+        return pool
+
+class HostStats:
+    """ Requests sent to a host, the bytes received from it and the seconds it took to answer """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.bytes = 0
+        self.latencies: list[float] = []
+
+class TransportAdapter(ratelimit.RateLimitedAdapter):
+    """ Rate limited adapter holding a pool of keep-alive connections per host, counting what goes through it """
+
+    def __init__(self, transport: 'Transport', dns_cache: Optional[DnsCache] = None, **kwargs: Any) -> None:
+        #the pool manager is made by the parent's constructor
+        self.dns_cache = dns_cache
+        super().__init__(**kwargs)
+        self.transport = transport
+        self._local = threading.local()
+
+    def init_poolmanager(self, connections: int, maxsize: int, block: bool = False, **pool_kwargs: Any) -> None:
+        if self.dns_cache is None:
+            super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+            return
+
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = DnsCachedPoolManager(self.dns_cache, num_pools=connections, maxsize=maxsize, block=block, **pool_kwargs)
+
+    def get_connection_with_tls_context(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> Any:
+        #called once the rate limiter let the request through, so waiting on it is not counted as latency
+        self._local.sent_at = time.perf_counter()
+        origin_url = self.transport.origin_url(request.url)
+        if origin_url != request.url:
+            #connect to the origin, but keep the url the request was made for
+            routed = request.copy()
+            routed.url = origin_url
+            return super().get_connection_with_tls_context(routed, *args, **kwargs)
+        return super().get_connection_with_tls_context(request, *args, **kwargs)
+
+    def get_connection(self, url: str, *args: Any, **kwargs: Any) -> Any:
+        #requests before 2.32 only passes the url
+        self._local.sent_at = time.perf_counter()
+        return super().get_connection(self.transport.origin_url(url), *args, **kwargs)
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.models.Response:
+        if self.transport.origin_url(request.url) != request.url and 'Host' not in request.headers:
+            #tell the origin which host the request is for, without the host following the request across redirects
+            request = request.copy()
+            request.headers['Host'] = urlparse(request.url).netloc
+        return super().send(request, *args, **kwargs)
+
+    def build_response(self, req: requests.PreparedRequest, resp: Any) -> requests.models.Response:
+        #the headers are in, the body may not be
+        self.transport.count(req.url, sent=1, latency=time.perf_counter() - self._local.sent_at)
+        return super().build_response(req, resp)
+
+class TransportSession(cache.CachedSession):
+    """ Cached session sending its requests through the transport's connection pools """
+
+    def __init__(self, transport: 'Transport', url_netloc: Optional[str] = None, cached: bool = True) -> None:
+        super().__init__()
+        if not cached:
+            self.cache = None
+        self.transport = transport
+        self.headers.update(get_headers(url_netloc))
+        self.mount('http://', transport.adapter)
+        self.mount('https://', transport.adapter)
+
+    def request(self, method: str, url: str, *args: Any, **kwargs: Any) -> requests.models.Response:
+        #cache hits are fetches too, the cache counters tell them apart
+        with metrics.span('fetch', host=urlparse(url).netloc):
+            return super().request(method, url, *args, **kwargs)
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.models.Response:
+        resp = super().send(request, **kwargs)
+        #redirects are sent, and counted, by nested calls, so only count the first response here
+        first = resp.history[0] if resp.history else resp
+        if kwargs.get('stream') and first is resp and hasattr(resp.raw, 'tell'):
+            #the body is read later, if at all, so count what was read off the wire once it is closed
+            resp.close = functools.partial(self._close_streamed, resp, request.url, resp.close)
+            return resp
+        if kwargs.get('stream'):
+            received = int(first.headers.get('Content-Length') or 0)
+        else:
+            #bytes read off the wire, before decoding
+            received = first.raw.tell() if hasattr(first.raw, 'tell') else len(first.content)
+        self.transport.count(request.url, received=received)
+        return resp
+
+    def _close_streamed(self, resp: requests.models.Response, url: str, close: Callable[[], None]) -> None:
+        """ Close a streamed response, counting the bytes of its body that were read """
+        self.transport.count(url, received=resp.raw.tell())
+        close()
+
+    def close(self) -> None:
+        #the connection pools belong to the transport, which closes them
+        pass
+
+class Transport:
+    """ Long-lived connection pools shared by every site class, with a session per host """
+
+    POOL_CONNECTIONS = 10 #hosts whose connections are kept open
+    POOL_MAXSIZE = 16 #connections kept open to each host
+
+    def __init__(
+            self,
+            pool_connections: int = POOL_CONNECTIONS,
+            pool_maxsize: int = POOL_MAXSIZE,
+            dns_ttl: float = DnsCache.TTL,
+            origins: Optional[dict[str, str]] = None
+            ) -> None:
+        logger.debug("Creating transport with %s connections per host", pool_maxsize)
+        #hosts served from another origin, e.g. a local stand-in server, as {netloc: 'http://host:port'}
+        self.origins = origins or {}
+        self.dns_cache = DnsCache(dns_ttl) if dns_ttl > 0 else None
+        self.adapter = TransportAdapter(self, dns_cache=self.dns_cache, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+        self._sessions: dict[tuple[Optional[str], bool], TransportSession] = {}
+        self._stats: dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    def session(self, url_netloc: Optional[str] = None, cached: bool = True) -> TransportSession:
+        """ Get the session for a host, or one that pins no host for links that redirect across hosts, uncached for requests that must reach the site """
+        with self._lock:
+            if (url_netloc, cached) not in self._sessions:
+                logger.debug("Creating %s session for %s", 'cached' if cached else 'uncached', url_netloc or 'any host')
+                self._sessions[(url_netloc, cached)] = TransportSession(self, url_netloc, cached)
+            return self._sessions[(url_netloc, cached)]
+
+    def origin_url(self, url: str) -> str:
+        """ Get the url a request for url is actually sent to """
+        parsed_url = urlparse(url)
+        origin = self.origins.get(parsed_url.netloc)
+        if origin is None:
+            return url
+        origin = urlparse(origin)
+        return parsed_url._replace(scheme=origin.scheme, netloc=origin.netloc).geturl()
+
+    def count(self, url: str, sent: int = 0, received: int = 0, latency: Optional[float] = None) -> None:
+        """ Count requests sent to, and bytes received from, a url's host """
+        netloc = urlparse(url).netloc
+        if sent:
+            metrics.count('requests', sent, host=netloc)
+        if received:
+            metrics.count('bytes', received, host=netloc)
+
+        with self._lock:
+            stats = self._stats.setdefault(netloc, HostStats())
+            stats.requests += sent
+            stats.bytes += received
+            if latency is not None:
+                stats.latencies.append(latency)
+
+    def latencies(self) -> dict[str, list[float]]:
+        """ Get the seconds each request to each host took to answer """
+        with self._lock:
+            return { netloc: list(stats.latencies) for netloc, stats in self._stats.items() }
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """ Get the requests sent to, and bytes received from, each host """
+        with self._lock:
+            return { netloc: {'requests': stats.requests, 'bytes': stats.bytes} for netloc, stats in self._stats.items() }
+
+    def close(self) -> None:
+        """ Close every connection pool """
+        for netloc, stats in self.stats().items():
+            logger.debug("%s: %s requests, %s bytes", netloc, stats['requests'], stats['bytes'])
+        with self._lock:
+            self._sessions.clear()
+        self.adapter.close()
+
+    def __enter__(self) -> 'Transport':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+_transport: Optional[Transport] = None
+_transport_options: dict[str, Any] = {}
+_transport_lock = threading.Lock()
+
+def configure(**options: Any) -> None:
+    """ Configure the transport shared by all site classes, with the options Transport takes """
+    global _transport, _transport_options
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+            _transport = None
+        _transport_options = options
+
+def get_transport() -> Transport:
+    """ Get the transport shared by all site classes """
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = Transport(**_transport_options)
+        return _transport
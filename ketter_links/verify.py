@@ -0,0 +1,136 @@
+##Written by kelseykm
+
+import requests
+import collections
+import logging
+import re
+import threading
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+from . import metrics
+from .crawler import Crawler
+from .output import Link
+from .transport import Transport, get_transport
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+#the total size in a Content-Range header, e.g. bytes 0-0/1048576
+CONTENT_RANGE_PATTERN = re.compile(r'^bytes \d+-\d+/(\d+)$', re.IGNORECASE)
+
+class Probe(NamedTuple):
+    """ What probing a link found out about it """
+    alive: bool
+    status: Optional[int] = None
+    size: Optional[int] = None
+    accept_ranges: Optional[bool] = None
+
+class Verifier:
+    """ Probes final links with HEAD and one byte ranged GET requests, so dead links are not written and downloads can be planned without probing again """
+
+    TIMEOUT = 10 #timeout for each probe
+    #statuses of servers that refuse HEAD requests but may still serve the file
+    HEAD_REFUSED = (403, 405, 501)
+
+    def __init__(self, transport: Optional[Transport] = None) -> None:
+        self.transport = transport or get_transport()
+        #the links are on many hosts, so the host header must not be pinned, and whether they are alive must come from their servers
+        self.sess = self.transport.session(cached=False)
+
+    def _ranged_get(self, url: str) -> Probe:
+        """ Probe a link by asking for its first byte """
+        with self.sess.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=self.TIMEOUT) as resp:
+            if resp.status_code >= 400:
+                return Probe(False, resp.status_code)
+            if resp.status_code != 206:
+                #the server ignored the range and is sending the whole file, which is closed unread
+                return Probe(True, resp.status_code, _content_length(resp), False)
+            total = CONTENT_RANGE_PATTERN.match(resp.headers.get('Content-Range', ''))
+            return Probe(True, resp.status_code, int(total.group(1)) if total else None, True)
+
+    def probe(self, url: str) -> Probe:
+        """ Check whether a link is alive, and get its size and whether it takes range requests """
+        try:
+            with metrics.span('probe'):
+                resp = self.sess.head(url, allow_redirects=True, timeout=self.TIMEOUT)
+                resp.close()
+                if resp.status_code in self.HEAD_REFUSED or (resp.status_code < 400 and 'Accept-Ranges' not in resp.headers):
+                    #only a ranged request shows whether ranges work when HEAD does not say
+                    return self._ranged_get(url)
+                if resp.status_code >= 400:
+                    return Probe(False, resp.status_code)
+                accept_ranges = resp.headers['Accept-Ranges'].strip().lower() == 'bytes'
+                return Probe(True, resp.status_code, _content_length(resp), accept_ranges)
+        except requests.exceptions.RequestException as e:
+            logger.info("Probing %s failed: %s", url, e)
+            return Probe(False)
+
+    def _check(self, url: str, sources: dict[str, Optional[str]], resolve: Optional[Callable[[str], Optional[str]]]) -> tuple[Optional[str], Probe]:
+        """ Probe a link, resolving it again from its source once if it is dead """
+        probe = self.probe(url)
+        source = sources.get(url)
+        if not probe.alive and resolve is not None and source:
+            logger.info("%s is dead, resolving %s again", url, source)
+            metrics.count('links_reresolved')
+            url = resolve(source)
+            if url:
+                probe = self.probe(url)
+        return url, probe
+
+    def verify(self, links: Iterable[Link], crawler: Crawler, resolve: Optional[Callable[[str], Optional[str]]] = None) -> Iterator[Link]:
+        """ Probe links concurrently, yielding the live ones in order with their size and whether they take range requests
+
+        Dead links are resolved again from their source with resolve, if given, and dropped if they are still dead
+        """
+        #links are produced lazily, so keep them in step with the urls handed to the crawler
+        pending: collections.deque[Link] = collections.deque()
+        sources: dict[str, Optional[str]] = {}
+        def urls() -> Iterator[str]:
+            for link in links:
+                pending.append(link)
+                sources[link.url] = link.source
+                yield link.url
+
+        logger.debug("Verifying links")
+        for url, probe in crawler.imap(self._check, urls(), sources, resolve):
+            link = pending.popleft()
+            if not probe.alive:
+                logger.warning("Dropping dead link %s", link.url)
+                metrics.count('links_dead')
+                continue
+
+            metrics.count('links_verified')
+            yield link._replace(url=url, size=probe.size, accept_ranges=probe.accept_ranges)
+
+def _content_length(resp: requests.models.Response) -> Optional[int]:
+    """ Get the size of a response's body, if the server says """
+    length = resp.headers.get('Content-Length')
+    #the length of a compressed body is not the size of the file
+    if length and length.isdigit() and 'Content-Encoding' not in resp.headers:
+        return int(length)
+
+_verifier: Optional[Verifier] = None
+_verify_enabled = False
+_verifier_lock = threading.Lock()
+
+def configure(enabled: bool = False) -> None:
+    """ Configure whether final links are verified before they are written """
+    global _verifier, _verify_enabled
+    with _verifier_lock:
+        _verifier = None
+        _verify_enabled = enabled
+
+def get_verifier() -> Optional[Verifier]:
+    """ Get the verifier shared by all scrapes, or None if links are not verified """
+    global _verifier
+    with _verifier_lock:
+        if _verify_enabled and _verifier is None:
+            _verifier = Verifier()
+        return _verifier
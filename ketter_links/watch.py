@@ -0,0 +1,288 @@
+##Written by kelseykm
+
+import requests
+import collections
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from . import metrics, sites
+from .cache import DEFAULT_CACHE_DIR
+from .output import Link
+from .scheduler import Scheduler
+from .selection import Selection
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+DEFAULT_WATCHLIST = os.path.join(DEFAULT_CACHE_DIR, 'watchlist.sqlite3')
+
+class WatchedSeries(NamedTuple):
+    """ A followed series and the seasons and episodes of it that are followed """
+    url: str
+    seasons: Selection
+    episodes: Selection
+
+class PageState(NamedTuple):
+    """ What a page listing episodes looked like when it was last read """
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    digest: Optional[str] = None #sha256 of the page, for sites that send no validators
+
+class Watchlist:
+    """ SQLite-backed list of followed series, with the episodes each lists and the state of the pages they are listed on """
+
+    def __init__(self, path: str = DEFAULT_WATCHLIST) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+
+        logger.debug("Opening watchlist at %s", self.path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS series (
+                url TEXT PRIMARY KEY,
+                seasons TEXT NOT NULL,
+                episodes TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                checked_at REAL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                series TEXT NOT NULL,
+                url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                digest TEXT,
+                PRIMARY KEY (series, url)
+            ) WITHOUT ROWID
+        """)
+        #episodes are listed unseen and only seen once a link to them is emitted, so failed ones are tried again
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS episodes (
+                series TEXT NOT NULL,
+                season INTEGER NOT NULL,
+                episode INTEGER NOT NULL,
+                seen INTEGER NOT NULL,
+                PRIMARY KEY (series, season, episode)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def add(self, series: WatchedSeries) -> None:
+        """ Follow a series, or change the seasons and episodes followed of one already followed """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO series (url, seasons, episodes, added_at) VALUES (?, ?, ?, ?) ON CONFLICT (url) DO UPDATE SET seasons = excluded.seasons, episodes = excluded.episodes",
+                (series.url, str(series.seasons), str(series.episodes), time.time())
+            )
+            self._conn.commit()
+
+    def remove(self, url: str) -> bool:
+        """ Stop following a series, returning whether it was followed """
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM series WHERE url = ?", (url,)).rowcount
+            self._conn.execute("DELETE FROM pages WHERE series = ?", (url,))
+            self._conn.execute("DELETE FROM episodes WHERE series = ?", (url,))
+            self._conn.commit()
+        return bool(removed)
+
+    def series(self) -> list[WatchedSeries]:
+        """ Get every followed series, in the order they were followed """
+        with self._lock:
+            rows = self._conn.execute("SELECT url, seasons, episodes FROM series ORDER BY added_at").fetchall()
+        return [ WatchedSeries(url, Selection.load(seasons), Selection.load(episodes)) for url, seasons, episodes in rows ]
+
+    def checked_at(self, url: str) -> Optional[float]:
+        """ Get when a series was last checked for new episodes, None if it never was """
+        with self._lock:
+            row = self._conn.execute("SELECT checked_at FROM series WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def mark_checked(self, url: str) -> None:
+        """ Record that a series was just checked for new episodes """
+        with self._lock:
+            self._conn.execute("UPDATE series SET checked_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def pages(self, url: str) -> dict[str, PageState]:
+        """ Get the state of every page a series' episodes are listed on """
+        with self._lock:
+            rows = self._conn.execute("SELECT url, etag, last_modified, digest FROM pages WHERE series = ?", (url,)).fetchall()
+        return { page: PageState(etag, last_modified, digest) for page, etag, last_modified, digest in rows }
+
+    def set_pages(self, url: str, pages: dict[str, PageState]) -> None:
+        """ Replace the pages a series' episodes are listed on """
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE series = ?", (url,))
+            self._conn.executemany(
+                "INSERT INTO pages VALUES (?, ?, ?, ?, ?)",
+                ((url, page, *state) for page, state in pages.items())
+            )
+            self._conn.commit()
+
+    def list_episodes(self, url: str, episodes: Iterable[tuple[int, int]], seen: bool = False) -> int:
+        """ Add episodes not yet listed for a series, returning how many were new """
+        with self._lock:
+            added = 0
+            for season, episode in episodes:
+                added += self._conn.execute(
+                    "INSERT OR IGNORE INTO episodes VALUES (?, ?, ?, ?)",
+                    (url, season, episode, int(seen))
+                ).rowcount
+            self._conn.commit()
+        return added
+
+    def unseen(self, url: str) -> list[tuple[int, int]]:
+        """ Get the listed episodes of a series no link was emitted for yet """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT season, episode FROM episodes WHERE series = ? AND NOT seen ORDER BY season, episode", (url,)
+            ).fetchall()
+
+    def mark_seen(self, url: str, season: int, episode: int) -> None:
+        """ Record that a link to an episode was emitted """
+        with self._lock:
+            self._conn.execute("UPDATE episodes SET seen = 1 WHERE series = ? AND season = ? AND episode = ?", (url, season, episode))
+            self._conn.commit()
+
+    def close(self) -> None:
+        """ Close the watchlist database """
+        with self._lock:
+            self._conn.close()
+
+class Watcher:
+    """ Polls followed series for new episodes, resolving only those through the sites' scrapers """
+
+    INTERVAL = 6 * 60 * 60 #seconds between polls of each series
+    TIMEOUT = 30 #timeout for each page check
+
+    def __init__(self, watchlist: Watchlist, sched: Scheduler) -> None:
+        self.watchlist = watchlist
+        self.sched = sched
+
+    def check_page(self, url: str, state: Optional[PageState]) -> tuple[bool, PageState]:
+        """ Check whether a page changed since it was last read, with a conditional request and the page's hash, returning its new state """
+        #the answer must come from the site, not the response cache
+        headers = {'Cache-Control': 'no-cache'}
+        if state and state.etag:
+            headers['If-None-Match'] = state.etag
+        if state and state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+
+        sess = self.sched.transport.session(urlparse(url).netloc)
+        with sess.get(url, headers=headers, timeout=self.TIMEOUT) as resp:
+            if resp.status_code == 304 and state:
+                metrics.count('watch_pages_not_modified')
+                return False, state
+            resp.raise_for_status()
+            data = resp.content
+
+        new_state = PageState(resp.headers.get('ETag'), resp.headers.get('Last-Modified'), hashlib.sha256(data).hexdigest())
+        if state and state.digest == new_state.digest:
+            metrics.count('watch_pages_unchanged')
+            return False, new_state
+
+        metrics.count('watch_pages_changed')
+        #the page is read again to list its episodes, so let the response cache answer with what was just fetched
+        if sess.cache is not None:
+            sess.cache.store(requests.Request('GET', url).prepare().url, resp)
+        return True, new_state
+
+    def _check_pages(self, pages: dict[str, Optional[PageState]]) -> tuple[bool, dict[str, PageState]]:
+        """ Check pages concurrently, returning whether any changed and their new states """
+        urls = list(pages)
+        checks = self.sched.crawler.map(lambda url: self.check_page(url, pages[url]), urls)
+        return any(changed for changed, _ in checks), { url: state for url, (_, state) in zip(urls, checks) }
+
+    def _list(self, series: WatchedSeries, states: dict[str, PageState]) -> None:
+        """ List a series' episodes, recording new ones as unseen, and the state of every page they are listed on """
+        site = sites.get_site(urlparse(series.url).netloc)
+        listing = site.load().list_episodes(urlparse(series.url), series.seasons, series.episodes, self.sched)
+        new = self.watchlist.list_episodes(series.url, listing.episodes)
+        logger.debug("%s lists %s episodes, %s of them new", series.url, len(listing.episodes), new)
+
+        #pages listed for the first time, e.g. of a new season, are read once to know their state
+        unchecked = { page: None for page in listing.pages if page not in states }
+        if unchecked:
+            states = { **states, **self._check_pages(unchecked)[1] }
+        self.watchlist.set_pages(series.url, { page: states[page] for page in listing.pages })
+
+    def follow(self, series: WatchedSeries) -> int:
+        """ Follow a series, taking every episode it lists now as seen, returning how many there are """
+        self.watchlist.add(series)
+        site = sites.get_site(urlparse(series.url).netloc)
+        listing = site.load().list_episodes(urlparse(series.url), series.seasons, series.episodes, self.sched)
+        self.watchlist.list_episodes(series.url, listing.episodes, seen=True)
+        _, states = self._check_pages(dict.fromkeys(listing.pages))
+        self.watchlist.set_pages(series.url, states)
+        self.watchlist.mark_checked(series.url)
+        return len(listing.episodes)
+
+    def poll(self, series: WatchedSeries) -> Iterator[Link]:
+        """ Check a series for new episodes, yielding links to those only
+
+        Episodes are only listed again if a page they are listed on changed, and only resolved if no link to them was emitted yet
+        """
+        #marked first, so a poll that fails waits for the next interval too
+        self.watchlist.mark_checked(series.url)
+        with metrics.span('watch_poll'):
+            pages = self.watchlist.pages(series.url)
+            changed, states = self._check_pages(dict(pages)) if pages else (True, {})
+            if changed:
+                self._list(series, states)
+            elif states:
+                self.watchlist.set_pages(series.url, states)
+
+        unseen = self.watchlist.unseen(series.url)
+        if not unseen:
+            logger.debug("No new episodes of %s", series.url)
+            return
+
+        logger.info("%s new episodes of %s", len(unseen), series.url)
+        metrics.count('watch_new_episodes', len(unseen))
+        seasons: dict[int, list[int]] = collections.defaultdict(list)
+        for season, episode in unseen:
+            seasons[season].append(episode)
+
+        site = sites.get_site(urlparse(series.url).netloc)
+        for season, episodes in seasons.items():
+            links = site.load().scrape(
+                urlparse(series.url),
+                Selection.single(season),
+                Selection([ (episode, episode) for episode in episodes ]),
+                self.sched
+            )
+            for link in links:
+                yield link
+                if link.season is not None and link.episode is not None:
+                    self.watchlist.mark_seen(series.url, link.season, link.episode)
+
+    def due(self, interval: float = INTERVAL) -> list[WatchedSeries]:
+        """ Get the followed series not checked in the last interval seconds """
+        now = time.time()
+        return [
+            series for series in self.watchlist.series()
+            if (self.watchlist.checked_at(series.url) or 0) + interval <= now
+        ]
+
+    def next_due(self, interval: float = INTERVAL) -> Optional[float]:
+        """ Get the seconds until the next followed series is due, None if none are followed """
+        checks = [ self.watchlist.checked_at(series.url) or 0 for series in self.watchlist.series() ]
+        if checks:
+            return max(0.0, min(checks) + interval - time.time())
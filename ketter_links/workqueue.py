@@ -0,0 +1,336 @@
+##Written by kelseykm
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+
+from . import metrics, sites, verify
+from .cache import DEFAULT_CACHE_DIR
+from .exceptions import TaskFailed, UnimplementedSite
+from .output import Link
+from .scheduler import Scheduler
+from .selection import Selection
+
+#create logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.propagate = False
+handler = logging.StreamHandler()
+handler.setLevel(logging.WARNING)
+formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+handler.setFormatter(formatter)
+logger.addHandler(handler)
+
+DEFAULT_QUEUE = os.path.join(DEFAULT_CACHE_DIR, 'queue.sqlite3')
+
+class Task(NamedTuple):
+    """ A claimed task, and how many times it has been claimed """
+    id: int
+    job: str
+    kind: str
+    payload: dict[str, Any]
+    attempts: int
+
+class WorkQueue:
+    """ SQLite-backed queue of crawl and resolve tasks, claimed by workers under leases they keep alive with heartbeats
+
+    Every process opening the same file shares the queue, so it must be on a filesystem with working locks
+    """
+
+    CRAWL = 'crawl' #list the links of a series still to be resolved
+    RESOLVE = 'resolve' #resolve one link
+    KINDS = (CRAWL, RESOLVE)
+
+    LEASE = 60 #seconds a claimed task is held without a heartbeat before another worker may claim it
+    MAX_ATTEMPTS = 3 #claims of a task before it is failed for good
+    RETRY_DELAY = 30 #seconds before a failed task is tried again, times the claims it had
+    BUSY_TIMEOUT = 30 #seconds to wait for another process to release the database
+
+    def __init__(self, path: str = DEFAULT_QUEUE, max_attempts: int = MAX_ATTEMPTS) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_attempts = max_attempts
+
+        logger.debug("Opening work queue at %s", self.path)
+        self._lock = threading.Lock()
+        #transactions are begun by hand, so claims can take the write lock before reading
+        self._conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        #wal needs memory shared between the processes, which workers on other hosts do not have
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                job TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                collected INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (job, kind, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, available_at)")
+
+    def enqueue(self, job: str, kind: str, key: str, payload: dict[str, Any]) -> bool:
+        """ Add a task, unless the job already has one of the same kind for key, returning whether it was added """
+        now = time.time()
+        with self._lock:
+            added = self._conn.execute(
+                "INSERT OR IGNORE INTO tasks (job, kind, key, payload, state, attempts, available_at, collected, updated_at) VALUES (?, ?, ?, ?, 'pending', 0, ?, 0, ?)",
+                (job, kind, key, json.dumps(payload), now, now)
+            ).rowcount
+        if added:
+            metrics.count('tasks_enqueued', kind=kind)
+        return bool(added)
+
+    def claim(self, owner: str, kinds: Iterable[str] = KINDS, lease: float = LEASE) -> Optional[Task]:
+        """ Lease the oldest task of kinds that is due, or whose last lease ran out, None if there is none """
+        kinds = tuple(kinds)
+        placeholders = ', '.join('?' * len(kinds))
+        now = time.time()
+        with self._lock:
+            #taking the write lock first, so no other process claims the same task
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                #tasks whose workers died on their last attempt are not claimed again
+                self._conn.execute(
+                    "UPDATE tasks SET state = 'failed', error = 'lease expired', owner = NULL, updated_at = ? WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, now, self.max_attempts)
+                )
+                row = self._conn.execute(
+                    f"""SELECT id, job, kind, payload, attempts FROM tasks
+                    WHERE kind IN ({placeholders}) AND ((state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_expires < ?))
+                    ORDER BY id LIMIT 1""",
+                    (*kinds, now, now)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE tasks SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (owner, now + lease, now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        task_id, job, kind, payload, attempts = row
+        metrics.count('tasks_claimed', kind=kind)
+        return Task(task_id, job, kind, json.loads(payload), attempts + 1)
+
+    def heartbeat(self, task: Task, owner: str, lease: float = LEASE) -> bool:
+        """ Extend the lease of a task, returning False if the worker lost it """
+        with self._lock:
+            return bool(self._conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                (time.time() + lease, task.id, owner)
+            ).rowcount)
+
+    def complete(self, task: Task, owner: str, result: Any) -> bool:
+        """ Record a task's result, returning False if the worker lost its lease and the result was dropped """
+        with self._lock:
+            done = self._conn.execute(
+                "UPDATE tasks SET state = 'done', result = ?, owner = NULL, error = NULL, updated_at = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                (json.dumps(result), time.time(), task.id, owner)
+            ).rowcount
+        if done:
+            metrics.count('tasks_done', kind=task.kind)
+        return bool(done)
+
+    def fail(self, task: Task, owner: str, error: str) -> bool:
+        """ Release a task to be tried again later, or fail it for good once it used up its attempts """
+        now = time.time()
+        with self._lock:
+            failed = self._conn.execute(
+                """UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                available_at = ?, owner = NULL, error = ?, updated_at = ? WHERE id = ? AND owner = ? AND state = 'leased'""",
+                (self.max_attempts, now + self.RETRY_DELAY * task.attempts, error, now, task.id, owner)
+            ).rowcount
+        if failed:
+            metrics.count('tasks_failed', kind=task.kind)
+        return bool(failed)
+
+    def collect(self, job: str, kind: str = RESOLVE) -> list[Any]:
+        """ Get the results of a job's finished tasks of kind not collected yet """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, result FROM tasks WHERE job = ? AND kind = ? AND state = 'done' AND NOT collected ORDER BY id",
+                    (job, kind)
+                ).fetchall()
+                self._conn.executemany("UPDATE tasks SET collected = 1 WHERE id = ?", ((task_id,) for task_id, _ in rows))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [ json.loads(result) for _, result in rows ]
+
+    def counts(self, job: Optional[str] = None) -> dict[str, int]:
+        """ Get how many of a job's tasks, or of every task if job is None, are in each state """
+        with self._lock:
+            if job is None:
+                return dict(self._conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+            return dict(self._conn.execute("SELECT state, COUNT(*) FROM tasks WHERE job = ? GROUP BY state", (job,)).fetchall())
+
+    def close(self) -> None:
+        """ Close the queue database """
+        with self._lock:
+            self._conn.close()
+
+def crawl_payload(url: str, seasons: Selection, episodes: Selection) -> dict[str, Any]:
+    """ Describe a series to crawl, as a crawl task's payload """
+    return {'url': url, 'seasons': str(seasons), 'episodes': str(episodes)}
+
+class Worker:
+    """ Claims tasks from the queue and runs them on a scheduler's crawler, transport and driver pools, keeping their leases alive while they run """
+
+    CONCURRENCY = 4 #tasks run at once
+    IDLE_INTERVAL = 2 #seconds between claims while the queue has nothing due
+
+    def __init__(self, work_queue: WorkQueue, sched: Scheduler, kinds: Iterable[str] = WorkQueue.KINDS, concurrency: int = CONCURRENCY) -> None:
+        if concurrency < 1:
+            raise ValueError("Worker must run at least 1 task at once")
+        self.work_queue = work_queue
+        self.sched = sched
+        self.kinds = tuple(kinds)
+        self.concurrency = concurrency
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+
+        self._running: dict[int, tuple[Task, str]] = {}
+        self._lock = threading.Lock()
+
+    def _site(self, url: str) -> Any:
+        """ Load the plugin of the site url belongs to """
+        site = sites.get_site(urlparse(url).netloc)
+        if site is None:
+            raise UnimplementedSite(f'Getting download links from {urlparse(url).netloc} is not yet implimented')
+        return site.load()
+
+    def run_task(self, task: Task) -> Any:
+        """ Run a task, returning its result """
+        if task.kind == WorkQueue.CRAWL:
+            url = task.payload['url']
+            links = self._site(url).crawl(
+                urlparse(url),
+                Selection.load(task.payload['seasons']),
+                Selection.load(task.payload['episodes']),
+                self.sched
+            )
+            count = 0
+            for link in links:
+                #a crawl tried again enqueues only the links it did not get to before
+                self.work_queue.enqueue(task.job, WorkQueue.RESOLVE, link.url, {'series': url, 'link': link._asdict()})
+                count += 1
+            return {'links': count}
+
+        if task.kind == WorkQueue.RESOLVE:
+            link = self._site(task.payload['series']).resolve(Link(**task.payload['link']), self.sched)
+            verifier = verify.get_verifier()
+            if link is not None and verifier is not None:
+                #dead links fail the task, which resolves them again when it is tried again
+                link = next(iter(verifier.verify([link], self.sched.crawler)), None)
+            if link is None:
+                raise TaskFailed(f"Could not resolve {task.payload['link']['url']}")
+            return {'series': task.payload['series'], **link._asdict()}
+
+        raise ValueError(f"Unknown task kind {task.kind}")
+
+    def _heartbeat(self, stop: threading.Event) -> None:
+        """ Extend the leases of the running tasks until stopped """
+        while not stop.wait(WorkQueue.LEASE / 3):
+            with self._lock:
+                running = list(self._running.values())
+            for task, owner in running:
+                try:
+                    kept = self.work_queue.heartbeat(task, owner)
+                except sqlite3.Error as e:
+                    #the lease is still good for a while, the next heartbeat tries again
+                    logger.warning("Could not extend the lease of task %s: %s", task.id, e)
+                    continue
+                if not kept:
+                    logger.warning("Lost the lease of task %s, its result will be dropped", task.id)
+
+    def _work(self, number: int, stop: threading.Event, exit_when_idle: bool) -> None:
+        """ Claim and run tasks until stopped, or until the queue has no tasks pending or running if exit_when_idle """
+        owner = f'{self.name}:{number}'
+        while not stop.is_set():
+            try:
+                task = self.work_queue.claim(owner, self.kinds)
+                if task is None:
+                    #tasks waiting to be tried again, or running crawls about to enqueue more, are still to come
+                    counts = self.work_queue.counts()
+                    if exit_when_idle and not counts.get('pending') and not counts.get('leased'):
+                        return
+            except sqlite3.Error as e:
+                #another process holding the database too long, or a flaky shared filesystem, should not stop the worker
+                logger.error("Could not read the queue: %s", e)
+                task = None
+
+            if task is None:
+                stop.wait(self.IDLE_INTERVAL)
+                continue
+
+            logger.debug("Running %s task %s of job %s, attempt %s", task.kind, task.id, task.job, task.attempts)
+            with self._lock:
+                self._running[task.id] = (task, owner)
+            try:
+                with metrics.span('task', kind=task.kind):
+                    result = self.run_task(task)
+            except Exception as e:
+                logger.error("%s task %s failed: %s", task.kind.capitalize(), task.id, e)
+                self._finish(task, owner, self.work_queue.fail, str(e))
+            else:
+                self._finish(task, owner, self.work_queue.complete, result)
+            finally:
+                with self._lock:
+                    del self._running[task.id]
+
+    def _finish(self, task: Task, owner: str, finish: Callable[[Task, str, Any], bool], outcome: Any) -> None:
+        """ Record how a task ended, leaving its lease to run out if the queue cannot be written """
+        try:
+            finish(task, owner, outcome)
+        except sqlite3.Error as e:
+            #the task goes to a worker again once its lease runs out
+            logger.error("Could not record the end of task %s: %s", task.id, e)
+
+    def run(self, stop: Optional[threading.Event] = None, exit_when_idle: bool = False) -> None:
+        """ Run tasks until stop is set, or until the queue has no tasks pending or running if exit_when_idle """
+        stop = stop or threading.Event()
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(heartbeat_stop,), name='heartbeat', daemon=True)
+        heartbeat.start()
+
+        workers = [
+            threading.Thread(target=self._work, args=(number, stop, exit_when_idle), name=f'worker-{number}', daemon=True)
+            for number in range(self.concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                #joined with a timeout, so the main thread still gets KeyboardInterrupt
+                while worker.is_alive():
+                    worker.join(timeout=1)
+        finally:
+            #running tasks are finished, and their leases kept alive, before the queue is let go of
+            stop.set()
+            for worker in workers:
+                worker.join()
+            heartbeat_stop.set()
@@ -2,14 +2,29 @@
 
 ##Written by kelseykm
 
-from ketter_links import scraper, drivers, search, exceptions
+from ketter_links.selection import Selection
+#the subsystems import requests, the parsers and more, so each subcommand imports the ones it needs, and --help imports none
+from ketter_links import sites, exceptions, journal, output, metrics
 import re
 from urllib.parse import urlparse, ParseResult
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import logging
 import argparse
+import contextlib
+import functools
+import os
+import queue
+import shlex
+import signal
 import sys
 import string
-from typing import Callable, Union, Optional
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Union, Optional
+
+if TYPE_CHECKING:
+    from ketter_links import scheduler, watch
 
 #set up logging
 logger = logging.getLogger()
@@ -20,65 +35,25 @@ formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(messag
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
-
-class scrapeSites:
-    """ Class with methods for scraping all implemented sites """
-
-    @staticmethod
-    def o2tvseries(parsed_url: ParseResult, seasons_regex: str, episodes_regex: str) -> Optional[list[str]]:
-        """ O2tvSeries scraper """
-        logger.debug("Started o2tvseries scraper")
-
-        o2tvseries = scraper.O2tvSeries(parsed_url, seasons_regex, episodes_regex)
-        return o2tvseries.solve_captcha_and_get_dl_links()
-
-    @staticmethod
-    def lightdl(parsed_url: ParseResult, seasons_regex: str, episodes_regex: str) -> Optional[list[str]]:
-        """ LightDL scraper """
-        logger.debug("Started lightdl scraper")
-
-        lightdl = scraper.LightDL(parsed_url, seasons_regex, episodes_regex)
-        return lightdl.get_download_links()
-
-    @staticmethod
-    def netnaija(parsed_url: ParseResult, seasons_regex: str, episodes_regex: str) -> Optional[list[str]]:
-        """ NetNaija scraper """
-        logger.debug("Started netnaija scraper")
-
-        net_naija = scraper.NetNaija(parsed_url, seasons_regex, episodes_regex)
-        return net_naija.get_sabishare_links()
-
-class searchSites:
-    """ Class with methods for searching all implemented sites """
-
-    @staticmethod
-    def netnaija(search_string: str) -> Optional[set[str]]:
-        """ NetNaija searcher """
-        logger.debug("Started netnaija searcher")
-
-        netnaija = search.NetNaija(search_string=search_string)
-        return netnaija.get_links_from_results()
-
-    @staticmethod
-    def lightdl(search_string: str) -> Optional[set[str]]:
-        """ LightDL searcher """
-        logger.debug("Started netnaija searcher")
-
-        lightdl = search.LightDl(search_string=search_string)
-        return lightdl.search()
+#defaults of the subsystems, written out so the argument parser does not import them
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')), 'ketter_links')
+DEFAULT_QUEUE = os.path.join(CACHE_DIR, 'queue.sqlite3')
+DEFAULT_ADDRESS = os.path.join(CACHE_DIR, 'daemon.sock')
+DEFAULT_INDEX = os.path.join(CACHE_DIR, 'titles.sqlite3')
+DEFAULT_WATCHLIST = os.path.join(CACHE_DIR, 'watchlist.sqlite3')
+TASK_KINDS = ('crawl', 'resolve')
 
 # Scraping functions
-def grab_scrape_info() -> dict[str, Union[ParseResult, str]]:
-    """ Grab information passed through command-line arguments """
+def check_scrape_info(url: str, seasons: Optional[str], episodes: Optional[str]) -> dict[str, Union[ParseResult, str]]:
+    """ Check the url, seasons and episodes of a series to scrape """
 
-    logger.debug("Grabbing scrape info from arguments")
-    url: ParseResult = urlparse(args.url)
-    if not url.scheme:
+    parsed_url: ParseResult = urlparse(url)
+    if not parsed_url.scheme:
         logger.error("URL has no scheme")
         raise exceptions.InvalidInput('URL is incomplete. It has no scheme.')
 
     argument: Optional[str]
-    for argument in args.seasons, args.episodes:
+    for argument in seasons, episodes:
         if argument is not None:
             if len(argument) > 2 and not argument.startswith('['):
                 logger.error("Invalid input format for seasons or episodes")
@@ -90,158 +65,781 @@ def grab_scrape_info() -> dict[str, Union[ParseResult, str]]:
                     raise exceptions.InvalidInput('Invalid input format for seasons or episodes')
 
     return {
-        'url': url,
-        'seasons': args.seasons,
-        'episodes': args.episodes,
+        'url': parsed_url,
+        'seasons': seasons,
+        'episodes': episodes,
     }
 
-def run_scrape(url: ParseResult, seasons_regex: str, episodes_regex: str) -> Optional[list[str]]:
-    """ Run the actual scraping funtions """
+def check_driver_options() -> None:
+    """ Check the options of the driver pools """
+    if args.pool_size < 1 or args.max_driver_uses < 1:
+        logger.error("Invalid driver pool options")
+        raise exceptions.InvalidInput('Driver pool size and max driver uses must be at least 1')
 
-    supported_sites: dict[str, Callable[[ParseResult, str], Optional[list[str]]]]
-    supported_sites = {
-        'www.thenetnaija.com': scrapeSites.netnaija,
-        'www.lightdl.xyz': scrapeSites.lightdl,
-        'o2tvseries.com': scrapeSites.o2tvseries,
-    }
-    if url.netloc not in supported_sites:
+def check_scrape_options() -> None:
+    """ Check the options shared by every scrape """
+    check_driver_options()
+
+    if args.max_series < 1:
+        logger.error("Invalid max series")
+        raise exceptions.InvalidInput('Max series must be at least 1')
+
+def grab_scrape_info() -> dict[str, Union[ParseResult, str]]:
+    """ Grab information passed through command-line arguments """
+
+    logger.debug("Grabbing scrape info from arguments")
+    return check_scrape_info(args.url, args.seasons, args.episodes)
+
+def grab_batch_info() -> list[dict[str, Union[ParseResult, str]]]:
+    """ Grab the series to scrape from the batch file, one per line as: URL [--seasons S] [--episodes E] """
+
+    logger.debug("Grabbing scrape info from batch file %s", args.batch)
+    if args.seasons is not None or args.episodes is not None:
+        logger.error("Seasons or episodes given with batch")
+        raise exceptions.InvalidInput('Give seasons and episodes for each url in the batch file instead')
+
+    batch_info = []
+    urls = set()
+    with open(args.batch) as f:
+        for line_number, line in enumerate(f, start=1):
+            try:
+                tokens = shlex.split(line, comments=True)
+            except ValueError as e:
+                raise exceptions.InvalidInput(f'Invalid batch file line {line_number}: {e}')
+            if not tokens:
+                continue
+
+            url, *options = tokens
+            spec: dict[str, Optional[str]] = {'seasons': None, 'episodes': None}
+            while options:
+                option = options.pop(0)
+                if option.lstrip('-') not in spec or not option.startswith('--') or not options:
+                    logger.error("Invalid batch file line %s", line_number)
+                    raise exceptions.InvalidInput(f'Invalid batch file line {line_number}: {line.strip()}')
+                spec[option.lstrip('-')] = options.pop(0)
+
+            #the journal keys entries by url, so one url with two specs would mix up their pages
+            if url in urls:
+                logger.error("Duplicate url in batch file")
+                raise exceptions.InvalidInput(f'Url on batch file line {line_number} is already in the batch')
+            urls.add(url)
+
+            batch_info.append(check_scrape_info(url, spec['seasons'], spec['episodes']))
+
+    if not batch_info:
+        logger.error("Empty batch file")
+        raise exceptions.InvalidInput('Batch file has no urls')
+
+    return batch_info
+
+def run_scrape(url: ParseResult, seasons: Selection, episodes: Selection, sched: 'scheduler.Scheduler', scrape_journal: Optional[journal.Journal] = None) -> Iterator[output.Link]:
+    """ Run the actual scraping funtions, returning the links as they are resolved """
+
+    site = sites.get_site(url.netloc)
+    if site is None:
         logger.error("Website from url not implemented")
         raise exceptions.UnimplementedSite('Getting download links from that site is not yet implimented')
 
-    return supported_sites[url.netloc](url, seasons_regex, episodes_regex)
+    return site.load().scrape(
+        url,
+        seasons,
+        episodes,
+        sched,
+        scrape_journal=scrape_journal
+    )
 
-def parse_scrape_info(scrape_info: str) -> str:
+def parse_scrape_info(scrape_info: str) -> Selection:
     """ Parses info passed into seasons/episodes commmand-line arguments """
 
     logger.debug("Parsing scrape info")
-    separated = set()
+    try:
+        return Selection.parse(scrape_info)
+    except ValueError as e:
+        logger.warning("Invalid input for seasons or episodes: %s", e)
+        raise exceptions.InvalidInput("Invalid input format for seasons or episodes")
 
-    if scrape_info.strip().isdigit():
-        separated.add(scrape_info.strip())
+def construct_scrape_selections(scrape_info: dict[str, Any]) -> dict[str, Any]:
+    """ Construct the selections of seasons/episodes to scrape """
 
-    else:
-        scrape_info = scrape_info.strip()
-        scrape_info = scrape_info.lstrip('[').rstrip(']')
-        scrape_info = scrape_info.split(',')
-        for info in scrape_info:
-            if '[' in info or ']' in info:
-                    logger.error("Invalid input format for seasons or episodes")
-                    raise exceptions.InvalidInput('Invalid input format for seasons or episodes')
-
-            if '-' in info:
-                first, last = info.split('-')
-                first = int(first.strip()); last = int(last.strip())
-                list(separated.add(str(season_episode_number)) for season_episode_number in range(first, last + 1))
-            elif info.strip().isdigit():
-                separated.add(info.strip())
+    logger.debug("Constructing scrape selections")
+    for info, url_pattern in ('seasons', r'/season-(\d{1,6})'), ('episodes', r'/episode-(\d{1,6})'):
+        in_url = re.search(url_pattern, scrape_info['url'].geturl())
 
-    if separated:
-        return '|'.join(separated)
+        if scrape_info[info] is not None:
+            if in_url:
+                logger.warning("%s already specified in url", info[:-1].capitalize())
+                raise exceptions.InvalidInput(f"{info[:-1].capitalize()} already specified in url")
 
-    logger.warning("No valid input for seasons or episodes")
-    raise exceptions.InvalidInput("No valid input for seasons or episodes")
+            scrape_info[info] = parse_scrape_info(scrape_info[info])
+        elif in_url:
+            scrape_info[info] = Selection.single(int(in_url.group(1)))
+        else:
+            scrape_info[info] = Selection.everything()
 
-def construct_scrape_regex_patterns(scrape_info: dict[str, Union[ParseResult, str]]) -> dict[str, Union[ParseResult, str]]:
-    """ Construct regex patterns for seasons/episodes """
+    return scrape_info
 
-    logger.debug("Constructing scrape regexes")
-    for info in scrape_info:
-        if info == 'url':
-            continue
+def scrape_scope(scrape_info: dict[str, Union[ParseResult, str]]) -> str:
+    """ Describe a scrape, so a journal is only resumed by the same scrape """
+    return f"{scrape_info['url'].geturl()} seasons={scrape_info['seasons']} episodes={scrape_info['episodes']}"
 
-        if info == 'seasons':
-            if scrape_info[info] is not None:
-                if re.search(r'/season-\d{1,6}', scrape_info['url'].geturl()):
-                    logger.warning("Season already specified in url")
-                    raise exceptions.InvalidInput("Season already specified in url")
+def open_journal(scope: str) -> Optional[journal.Journal]:
+    """ Open the journal of a scrape if it is resumed or a journal file was given, so other scrapes write nothing to disk """
+    if not args.resume and args.journal is None:
+        return None
+    return journal.Journal(args.journal or journal.DEFAULT_JOURNAL, resume=args.resume, scope=scope)
 
-                scrape_info['seasons'] = parse_scrape_info(scrape_info[info])
-            else:
-                s = re.search(r'/season-(\d{1,6})', scrape_info['url'].geturl())
-                if s:
-                    scrape_info['seasons'] = s.group(1)
-                else:
-                    scrape_info['seasons'] = r'\d{1,6}'
-
-        if info == 'episodes':
-            if scrape_info[info] is not None:
-                if re.search(r'/episode-\d{1,6}', scrape_info['url'].geturl()):
-                    logger.warning("Episode already specified in url")
-                    raise exceptions.InvalidInput("Episode already specified in url")
-
-                scrape_info['episodes'] = parse_scrape_info(scrape_info[info])
-            else:
-                e = re.search(r'/episode-(\d{1,6})', scrape_info['url'].geturl())
-                if e:
-                    scrape_info['episodes'] = e.group(1)
-                else:
-                    scrape_info['episodes'] = r'\d{1,6}'
+def close_journal(scrape_journal: Optional[journal.Journal], finished: bool) -> None:
+    """ Remove the journal of a finished scrape, keeping it to resume an unfinished one """
+    if scrape_journal is None:
+        return
+    if finished:
+        scrape_journal.remove()
+    else:
+        scrape_journal.close()
 
-    return scrape_info
+def series_output_path(url: ParseResult) -> str:
+    """ Get the path a series' links are written to when writing each series to its own file """
+    name = re.sub(r'[^\w.-]+', '-', url.netloc + url.path).strip('-')
+    extension = 'jsonl' if args.format == 'jsonl' else 'txt'
+    return os.path.join(args.output_dir, f"{name}.{extension}")
 
 def scrape_main() -> None:
     """ Main function for scrape """
+    from ketter_links import drivers, scheduler, verify
 
     logger.info("Starting scrape")
-    search_info = construct_scrape_regex_patterns(grab_scrape_info())
-    links = run_scrape(
-        url=search_info['url'],
-        seasons_regex=search_info['seasons'],
-        episodes_regex=search_info['episodes']
-    )
-    if links:
-        logger.debug("Writing urls to file")
-        with open('urls.txt', 'w') as f:
+    if args.connect is not None:
+        return client_scrape_main()
+    if args.queue is not None:
+        return queue_scrape_main()
+
+    configure_fetching()
+    check_scrape_options()
+    drivers.configure(args.driver_profile, args.user_data_dir)
+    verify.configure(enabled=args.verify)
+    if args.batch is not None:
+        return batch_scrape_main()
+
+    search_info = construct_scrape_selections(grab_scrape_info())
+    scrape_journal = open_journal(scrape_scope(search_info))
+
+    with scheduler.Scheduler(pool_size=args.pool_size, max_driver_uses=args.max_driver_uses) as sched:
+        links = run_scrape(
+            url=search_info['url'],
+            seasons=search_info['seasons'],
+            episodes=search_info['episodes'],
+            sched=sched,
+            scrape_journal=scrape_journal
+        )
+
+        logger.debug("Writing urls to %s as they are resolved", args.output)
+        with output.LinkWriter(args.output, args.format) as writer:
             for link in links:
-                f.write(link + '\n')
+                writer.write(link)
+
+    #a finished scrape leaves nothing to resume
+    close_journal(scrape_journal, finished=bool(writer.count))
+    if not writer.count:
+        logger.warning("No links available")
+
+def batch_scrape_main() -> None:
+    """ Scrape every series in the batch file at once, sharing connections, drivers and per host limits """
+    from ketter_links import scheduler
+
+    batch_info = [ construct_scrape_selections(scrape_info) for scrape_info in grab_batch_info() ]
+    scopes = [ scrape_scope(scrape_info) for scrape_info in batch_info ]
+    scrape_journal = open_journal('\n'.join(scopes))
+
+    writers: dict[str, output.LinkWriter] = {}
+    counts = dict.fromkeys(scopes, 0)
+    with scheduler.Scheduler(
+            max_series=args.max_series,
+            pool_size=args.pool_size,
+            max_driver_uses=args.max_driver_uses
+            ) as sched, contextlib.ExitStack() as stack:
+
+        #check every url before any scraping starts
+        jobs = {
+            scope: run_scrape(
+                url=scrape_info['url'],
+                seasons=scrape_info['seasons'],
+                episodes=scrape_info['episodes'],
+                sched=sched,
+                scrape_journal=scrape_journal
+            )
+            for scope, scrape_info in zip(scopes, batch_info)
+        }
+        urls = { scope: scrape_info['url'] for scope, scrape_info in zip(scopes, batch_info) }
+
+        if args.output_dir is None:
+            logger.debug("Writing urls of all series to %s as they are resolved", args.output)
+            merged_writer = stack.enter_context(output.LinkWriter(args.output, args.format))
+        else:
+            logger.debug("Writing urls of each series to %s as they are resolved", args.output_dir)
+            os.makedirs(args.output_dir, exist_ok=True)
+
+        for scope, link in sched.run(jobs):
+            counts[scope] += 1
+            if args.output_dir is None:
+                merged_writer.write(link, series=urls[scope].geturl())
+                continue
+
+            if scope not in writers:
+                writers[scope] = stack.enter_context(output.LinkWriter(series_output_path(urls[scope]), args.format))
+            writers[scope].write(link)
+
+        failed = sched.failed
+
+    for scope, count in counts.items():
+        if not count and scope not in failed:
+            logger.warning("No links available for %s", urls[scope].geturl())
+
+    #a batch is finished once every series is, leaving nothing to resume
+    close_journal(scrape_journal, finished=all(counts.values()) and not failed)
+
+QUEUE_INTERVAL = 1 #seconds between checks for links the workers resolved
+
+def queue_scrape_main() -> None:
+    """ Queue the scrape for workers to run, writing the links they resolve as they finish """
+    from ketter_links import workqueue
+
+    if args.resume or args.output_dir is not None or args.verify:
+        logger.error("Option not supported with a queue")
+        raise exceptions.InvalidInput('A queued scrape cannot be resumed, written to --output-dir or verified, pass --verify to the workers instead')
+
+    if args.batch is not None:
+        series_info = [ construct_scrape_selections(scrape_info) for scrape_info in grab_batch_info() ]
     else:
+        series_info = [ construct_scrape_selections(grab_scrape_info()) ]
+
+    work_queue = workqueue.WorkQueue(args.queue)
+    job = uuid.uuid4().hex
+    try:
+        for scrape_info in series_info:
+            url = scrape_info['url'].geturl()
+            work_queue.enqueue(job, workqueue.WorkQueue.CRAWL, url, workqueue.crawl_payload(url, scrape_info['seasons'], scrape_info['episodes']))
+        print(f"Queued job {job} on {args.queue}, waiting for workers", file=sys.stderr, flush=True)
+
+        logger.debug("Writing urls to %s as workers resolve them", args.output)
+        with output.LinkWriter(args.output, args.format) as writer:
+            while True:
+                #counted before collecting, so links resolved in between are collected on the next check
+                counts = work_queue.counts(job)
+                for result in work_queue.collect(job):
+                    series = result.pop('series')
+                    link = output.Link(**result)
+                    if args.batch is None:
+                        writer.write(link)
+                    else:
+                        writer.write(link, series=series)
+
+                if not counts.get('pending') and not counts.get('leased'):
+                    break
+                time.sleep(QUEUE_INTERVAL)
+    finally:
+        work_queue.close()
+
+    if counts.get('failed'):
+        logger.warning("%s tasks of job %s failed", counts['failed'], job)
+    if not writer.count:
         logger.warning("No links available")
 
 # Searching functions
-def grab_search_info() -> dict[str,str]:
-    """ Grab information passed through command-line arguments and modify it """
-    logger.debug("Grabbing search info from arguments")
+SEARCH_TIMEOUT = 30 #seconds to wait for each site's search results
+
+def check_search_info(series: str, season: Optional[str], episode: Optional[str]) -> dict[str,str]:
+    """ Check the series, season and episode to search for and modify them """
 
-    if (args.season is not None and not args.season.isdigit()) or (args.episode is not None and not args.episode.isdigit()):
+    if (season is not None and not season.isdigit()) or (episode is not None and not episode.isdigit()):
         logger.error("Invalid input format for seasons or episodes")
         raise exceptions.InvalidInput('Invalid input format for seasons or episodes')
 
     return {
-        'series': args.series,
-        'season': 'season ' + args.season if args.season else args.season,
-        'episode': 'episode ' + args.episode if args.episode else args.episode,
+        'series': series,
+        'season': 'season ' + season if season else season,
+        'episode': 'episode ' + episode if episode else episode,
     }
 
-def run_search(search_info: dict[str, str]) -> dict[str, Optional[set[str]]]:
-    """ Run the actual searching funtions """
+def grab_search_info() -> dict[str,str]:
+    """ Grab information passed through command-line arguments and modify it """
+    logger.debug("Grabbing search info from arguments")
+    return check_search_info(args.series, args.season, args.episode)
+
+def run_search(
+        search_info: dict[str, str],
+        timeout: float = SEARCH_TIMEOUT,
+        callback: Optional[Callable[[str, Optional[set[str]]], None]] = None
+        ) -> dict[str, Optional[set[str]]]:
+    """ Run the actual searching funtions, searching all sites at once """
     results = dict()
 
-    func: Callable[[str], Optional[set[str]]]
-    for func in searchSites.netnaija, searchSites.lightdl:
-        if not search_info['season']:
-            results[func.__name__] = func(
-                search_info['series']
-            )
-        elif search_info['season'] and search_info['episode']:
-            results[func.__name__] = func(
-                ' '.join([search_info['series'], search_info['season'], search_info['episode']])
-            )
-        else:
-            results[func.__name__] = func(
-                ' '.join([search_info['series'], search_info['season']])
-            )
+    if not search_info['season']:
+        search_string = search_info['series']
+    elif search_info['season'] and search_info['episode']:
+        search_string = ' '.join([search_info['series'], search_info['season'], search_info['episode']])
+    else:
+        search_string = ' '.join([search_info['series'], search_info['season']])
+
+    def finish(name: str, result: Optional[set[str]]) -> None:
+        results[name] = result
+        if callback is not None:
+            callback(name, result)
+
+    def search_site(site: sites.Site) -> Optional[set[str]]:
+        #the site's plugin is imported in the worker, so sites load in parallel
+        return site.load().search(search_string)
+
+    searchable_sites = sites.searchable_sites()
+    executor = ThreadPoolExecutor(max_workers=len(searchable_sites), thread_name_prefix='search')
+    futures = { executor.submit(search_site, site): site.name for site in searchable_sites }
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error("%s search failed: %s", futures[future], e)
+                result = None
+            finish(futures[future], result)
+    except FuturesTimeoutError:
+        for future, name in futures.items():
+            if not future.done():
+                logger.warning("%s search timed out after %s seconds", name, timeout)
+                finish(name, None)
+    finally:
+        #do not wait for a site that timed out
+        executor.shutdown(wait=False, cancel_futures=True)
 
     return results
 
+def print_search_result(name: str, links: Optional[set[str]]) -> None:
+    """ Print a site's search results as soon as the site answers """
+    print(f"{name.upper()}: {links}", flush=True)
+
 def search_main() -> None:
     """ Main function for search """
 
     logger.info("Starting search")
-    links = run_search(grab_search_info())
-    if links:
-        logger.info("Printing links")
-        for key in links:
-            print(f"{key.upper()}: {links[key]}")
+    if args.timeout <= 0:
+        logger.error("Invalid search timeout")
+        raise exceptions.InvalidInput('Search timeout must be more than 0 seconds')
+
+    if args.connect is not None:
+        return client_search_main()
+
+    configure_fetching()
+    configure_index()
+    logger.info("Printing links as each site answers")
+    run_search(grab_search_info(), timeout=args.timeout, callback=print_search_result)
+
+# Indexing functions
+def configure_index() -> None:
+    """ Configure the title index searches answer from, from command-line arguments """
+    from ketter_links import index
+    index.configure(enabled=not getattr(args, 'no_index', False), path=args.index_file)
+
+def index_main() -> None:
+    """ Main function for index """
+
+    logger.info("Starting index refresh")
+    if args.max_pages is not None and args.max_pages < 1:
+        logger.error("Invalid max pages")
+        raise exceptions.InvalidInput('Max pages must be at least 1')
+
+    configure_fetching()
+    configure_index()
+
+    options: dict[str, Any] = {'full': args.full}
+    if args.max_pages is not None:
+        options['max_pages'] = args.max_pages
+
+    def refresh(site: sites.Site) -> int:
+        return site.load().refresh_index(**options)
+
+    #sites are refreshed at once, each at its own rate
+    searchable_sites = sites.searchable_sites()
+    with ThreadPoolExecutor(max_workers=len(searchable_sites), thread_name_prefix='index') as executor:
+        futures = { executor.submit(refresh, site): site.name for site in searchable_sites }
+        for future in as_completed(futures):
+            try:
+                print(f"{futures[future].upper()}: {future.result()} new titles", flush=True)
+            except Exception as e:
+                logger.error("%s index refresh failed: %s", futures[future], e)
+
+# Watching functions
+def follow_series(watcher: 'watch.Watcher') -> None:
+    """ Follow the series passed in, taking the episodes it lists now as seen """
+    from ketter_links import watch
+
+    scrape_info = construct_scrape_selections(check_scrape_info(args.add, args.seasons, args.episodes))
+    series = watch.WatchedSeries(scrape_info['url'].geturl(), scrape_info['seasons'], scrape_info['episodes'])
+    count = watcher.follow(series)
+    print(f"Following {series.url}, {count} episodes listed so far")
+
+def list_watched(watchlist: 'watch.Watchlist') -> None:
+    """ Print every followed series """
+
+    for series in watchlist.series():
+        checked_at = watchlist.checked_at(series.url)
+        checked = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(checked_at)) if checked_at else 'never'
+        print(f"{series.url} seasons={series.seasons} episodes={series.episodes} checked={checked}")
+
+def poll_watched(watcher: 'watch.Watcher') -> None:
+    """ Poll the followed series as each is due, writing links to their new episodes """
+
+    logger.debug("Appending urls of new episodes to %s as they are resolved", args.output)
+    with output.LinkWriter(args.output, args.format, append=True) as writer:
+        while True:
+            due = watcher.due(0 if args.once else args.interval)
+            if due:
+                jobs = { series.url: watcher.poll(series) for series in due }
+                for url, link in watcher.sched.run(jobs):
+                    writer.write(link, series=url)
+
+            wait = watcher.next_due(args.interval)
+            if args.once or wait is None:
+                return
+            logger.debug("Next series due in %s seconds", round(wait))
+            time.sleep(wait)
+
+def watch_main() -> None:
+    """ Main function for watch """
+    from ketter_links import drivers, scheduler, verify, watch
+
+    logger.info("Starting watch")
+    if (args.seasons is not None or args.episodes is not None) and args.add is None:
+        logger.error("Seasons or episodes given without a series to follow")
+        raise exceptions.InvalidInput('Seasons and episodes can only be given with --add')
+
+    if args.interval <= 0:
+        logger.error("Invalid interval")
+        raise exceptions.InvalidInput('Interval must be more than 0 seconds')
+
+    watchlist = watch.Watchlist(args.watchlist or watch.DEFAULT_WATCHLIST)
+    try:
+        if args.list:
+            return list_watched(watchlist)
+
+        if args.remove is not None:
+            if not watchlist.remove(args.remove):
+                logger.warning("%s is not followed", args.remove)
+            return
+
+        if args.add is None and not watchlist.series():
+            logger.warning("No series followed, add one with --add")
+            return
+
+        configure_fetching()
+        check_scrape_options()
+        drivers.configure(args.driver_profile, args.user_data_dir)
+        verify.configure(enabled=args.verify)
+        with scheduler.Scheduler(
+                max_series=args.max_series,
+                pool_size=args.pool_size,
+                max_driver_uses=args.max_driver_uses
+                ) as sched:
+            watcher = watch.Watcher(watchlist, sched)
+            if args.add is not None:
+                return follow_series(watcher)
+            poll_watched(watcher)
+    finally:
+        watchlist.close()
+
+# Worker functions
+def worker_main() -> None:
+    """ Main function for worker """
+    from ketter_links import drivers, scheduler, verify, workqueue
+
+    logger.info("Starting worker")
+    if args.concurrency < 1:
+        logger.error("Invalid concurrency")
+        raise exceptions.InvalidInput('Concurrency must be at least 1')
+
+    check_driver_options()
+
+    configure_fetching()
+    drivers.configure(args.driver_profile, args.user_data_dir)
+    verify.configure(enabled=args.verify)
+
+    #finish the running tasks and quit the drivers when stopped
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    work_queue = workqueue.WorkQueue(args.queue)
+    try:
+        with scheduler.Scheduler(pool_size=args.pool_size, max_driver_uses=args.max_driver_uses) as sched:
+            worker = workqueue.Worker(work_queue, sched, kinds=args.kinds, concurrency=args.concurrency)
+            print(f"Working on {args.queue} as {worker.name}", file=sys.stderr, flush=True)
+            try:
+                worker.run(exit_when_idle=args.exit_when_idle)
+            except KeyboardInterrupt:
+                logger.info("Stopping worker")
+    finally:
+        work_queue.close()
+
+# Daemon functions
+def serve_scrape(request: dict[str, Any], sched: 'scheduler.Scheduler') -> Iterator[dict[str, Any]]:
+    """ Check the series a client sent to the daemon, returning their links as they are resolved """
+
+    series = request.get('series')
+    if (
+            not isinstance(series, list) or not series
+            or not all(isinstance(info, dict) and isinstance(info.get('url'), str) for info in series)
+            or not all(isinstance(info.get(key), (str, type(None))) for info in series for key in ('seasons', 'episodes'))
+            ):
+        logger.error("Invalid series in scrape request")
+        raise exceptions.InvalidInput('Scrape request must have a list of series, each with a url and optional seasons and episodes')
+
+    batch_info = [ construct_scrape_selections(check_scrape_info(info['url'], info.get('seasons'), info.get('episodes'))) for info in series ]
+
+    #the scheduler and its failed series are shared by every job, so each job's keys are its own
+    job = object()
+    jobs = {
+        (job, info['url']): run_scrape(
+            url=scrape_info['url'],
+            seasons=scrape_info['seasons'],
+            episodes=scrape_info['episodes'],
+            sched=sched
+        )
+        for info, scrape_info in zip(series, batch_info)
+    }
+
+    def links() -> Iterator[dict[str, Any]]:
+        try:
+            for (_, url), link in sched.run(jobs):
+                yield {'series': url, **link._asdict()}
+            failed = [ url for _, url in jobs if (job, url) in sched.failed ]
+        finally:
+            sched.failed.difference_update(jobs)
+
+        for url in failed:
+            yield {'series': url, 'failed': True}
+
+    return links()
+
+def serve_search(request: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """ Check the search a client sent to the daemon, returning each site's results as soon as the site answers """
+
+    if not isinstance(request.get('series'), str) or not all(isinstance(request.get(key), (str, type(None))) for key in ('season', 'episode')):
+        logger.error("Invalid search request")
+        raise exceptions.InvalidInput('Search request must have a series and optional season and episode')
+
+    timeout = request.get('timeout') or SEARCH_TIMEOUT
+    if not isinstance(timeout, (int, float)) or timeout <= 0:
+        logger.error("Invalid search timeout")
+        raise exceptions.InvalidInput('Search timeout must be more than 0 seconds')
+
+    search_info = check_search_info(request['series'], request.get('season'), request.get('episode'))
+    results: queue.Queue = queue.Queue()
+    done = object()
+
+    def search() -> None:
+        try:
+            run_search(search_info, timeout=timeout, callback=lambda name, links: results.put((name, links)))
+        finally:
+            results.put(done)
+
+    threading.Thread(target=search, name='daemon-search', daemon=True).start()
+
+    def answers() -> Iterator[dict[str, Any]]:
+        while True:
+            result = results.get()
+            if result is done:
+                return
+            name, links = result
+            yield {'site': name, 'links': sorted(links) if links is not None else None}
+
+    return answers()
+
+def serve_main() -> None:
+    """ Main function for serve """
+    from ketter_links import daemon, drivers, scheduler, verify
+
+    logger.info("Starting daemon")
+    configure_fetching()
+    check_scrape_options()
+    drivers.configure(args.driver_profile, args.user_data_dir)
+    verify.configure(enabled=args.verify)
+    configure_index()
+
+    #quit the drivers and remove the socket when stopped
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    with scheduler.Scheduler(
+            max_series=args.max_series,
+            pool_size=args.pool_size,
+            max_driver_uses=args.max_driver_uses
+            ) as sched:
+        try:
+            server = daemon.make_server(args.address, {
+                'scrape': functools.partial(serve_scrape, sched=sched),
+                'search': serve_search,
+            })
+        except ValueError as e:
+            logger.error("Invalid daemon address")
+            raise exceptions.InvalidInput(str(e))
+
+        print(f"Serving on {args.address}", file=sys.stderr, flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Stopping daemon")
+        finally:
+            server.close()
+
+def client_scrape_main() -> None:
+    """ Forward the scrape to a daemon, writing the links it streams back """
+    from ketter_links import daemon
+
+    if args.resume:
+        logger.error("Cannot resume a forwarded scrape")
+        raise exceptions.InvalidInput('A scrape forwarded to a daemon cannot be resumed')
+
+    batch_info = grab_batch_info() if args.batch is not None else [grab_scrape_info()]
+    series = [
+        {'url': scrape_info['url'].geturl(), 'seasons': scrape_info['seasons'], 'episodes': scrape_info['episodes']}
+        for scrape_info in batch_info
+    ]
+    counts = dict.fromkeys((info['url'] for info in series), 0)
+
+    logger.debug("Forwarding scrape of %s series to %s", len(series), args.connect)
+    with contextlib.ExitStack() as stack:
+        writers: dict[str, output.LinkWriter] = {}
+        if args.batch is None or args.output_dir is None:
+            merged_writer = stack.enter_context(output.LinkWriter(args.output, args.format))
+        else:
+            os.makedirs(args.output_dir, exist_ok=True)
+
+        for message in daemon.Client(args.connect).scrape(series):
+            url = message['series']
+            if message.get('failed'):
+                logger.error("Scraping %s failed on the daemon", url)
+                continue
+
+            counts[url] += 1
+            link = output.Link(message['url'], message['season'], message['episode'], message['source'], message.get('size'), message.get('accept_ranges'))
+            if args.batch is None:
+                merged_writer.write(link)
+            elif args.output_dir is None:
+                merged_writer.write(link, series=url)
+            else:
+                if url not in writers:
+                    writers[url] = stack.enter_context(output.LinkWriter(series_output_path(urlparse(url)), args.format))
+                writers[url].write(link)
+
+    for url, count in counts.items():
+        if not count:
+            logger.warning("No links available for %s", url)
+
+def client_search_main() -> None:
+    """ Forward the search to a daemon, printing each site's results as soon as the site answers """
+    from ketter_links import daemon
+
+    grab_search_info()
+    logger.debug("Forwarding search to %s", args.connect)
+    for message in daemon.Client(args.connect).search(args.series, args.season, args.episode, timeout=args.timeout):
+        links = message['links']
+        print_search_result(message['site'], set(links) if links is not None else None)
+
+def configure_fetching() -> None:
+    """ Configure how pages are fetched and parsed from command-line arguments """
+    from ketter_links import cache, parsing, ratelimit, transport
+    if args.parser not in parsing.available_backends():
+        logger.error("Parser backend not installed")
+        raise exceptions.InvalidInput(f'The {args.parser} parser is not installed')
+
+    if args.rate <= 0:
+        logger.error("Invalid rate")
+        raise exceptions.InvalidInput('Rate must be more than 0 requests per second')
+
+    if args.connections_per_host < 1:
+        logger.error("Invalid connections per host")
+        raise exceptions.InvalidInput('Connections per host must be at least 1')
+
+    if args.parse_processes < 0:
+        logger.error("Invalid parse processes")
+        raise exceptions.InvalidInput('Parse processes cannot be negative')
+
+    parsing.configure(args.parser, processes=args.parse_processes)
+    cache.configure(enabled=not args.no_cache, cache_dir=args.cache_dir)
+    ratelimit.configure(rate=args.rate)
+    transport.configure(pool_maxsize=args.connections_per_host)
+
+def write_metrics() -> None:
+    """ Write the run's metrics to the file passed in, if any """
+    if args.metrics is None:
+        return
+
+    logger.info("Writing metrics to %s", args.metrics)
+    try:
+        metrics.get_metrics().write(args.metrics, args.metrics_format)
+    except OSError as e:
+        logger.error("Could not write metrics: %s", e)
+
+def add_driver_arguments(sub_command_parser: argparse.ArgumentParser) -> None:
+    """ Add the browser driver arguments to a subcommand's parser """
+    sub_command_parser.add_argument('--pool-size', help='''
+        The number of browser drivers to keep open and resolve download links with in parallel.
+        Default is 1.
+        ''',
+        type=int, default=1, required=False)
+    sub_command_parser.add_argument('--max-driver-uses', help='''
+        The number of download links a browser driver resolves before it is closed and replaced
+        with a fresh one. Default is 50.
+        ''',
+        type=int, default=50, required=False)
+    sub_command_parser.add_argument('--driver-profile', help='''
+        How browser drivers are launched. 'full' opens a visible browser that loads everything.
+        'light' runs headless, stops waiting once the page's html is ready and blocks images, media,
+        fonts and ad hosts, except where a site needs them. Default is full.
+        ''',
+        choices=('full', 'light'), default='full', required=False)
+    sub_command_parser.add_argument('--user-data-dir', help='''
+        A directory to keep the browser drivers' profiles in, so their cache and cookies are reused
+        across drivers and runs, instead of browsing incognito
+        ''',
+        required=False)
+
+def add_fetching_arguments(sub_command_parser: argparse.ArgumentParser) -> None:
+    """ Add the page fetching and parsing arguments to a subcommand's parser """
+    sub_command_parser.add_argument('--parser', help='''
+        The HTML parser to parse pages with. lxml and selectolax are faster, but must be installed
+        separately. Default is html.parser.
+        ''',
+        choices=('html.parser', 'lxml', 'selectolax'), default='html.parser', required=False)
+    sub_command_parser.add_argument('--parse-processes', help='''
+        The number of processes to extract links from pages in, so batch scrapes and daemons parse
+        many pages at once on more than one core. Default is 0, extracting links in the threads
+        that fetch the pages.
+        ''',
+        type=int, default=0, required=False)
+    sub_command_parser.add_argument('--no-cache', help='''
+        Do not read pages from, or save pages to, the response cache
+        ''',
+        action='store_true', required=False)
+    sub_command_parser.add_argument('--cache-dir', help=f'''
+        The directory to keep the response cache in. Default is {CACHE_DIR}
+        ''',
+        required=False)
+    sub_command_parser.add_argument('--rate', help='''
+        The number of requests per second to send to each site. Sites that answer with 429 or 503,
+        or ask for a wait with Retry-After, are backed off from for as long as they ask. Default is
+        4.
+        ''',
+        type=float, default=4.0, required=False)
+    sub_command_parser.add_argument('--connections-per-host', help='''
+        The number of connections to keep open to each site, so later requests skip the TCP and TLS
+        handshakes. Default is 16.
+        ''',
+        type=int, default=16, required=False)
+    sub_command_parser.add_argument('--metrics', help='''
+        The file to write the run's metrics to when it ends: the time spent fetching, parsing,
+        matching and driving browsers, and counts of requests, bytes, cache hits and browser launches
+        ''',
+        required=False)
+    sub_command_parser.add_argument('--metrics-format', help='''
+        The format to write metrics in. Default is json if the metrics file ends with .json,
+        otherwise the prometheus text format.
+        ''',
+        choices=metrics.FORMATS, required=False)
 
 
 if __name__ == "__main__":
@@ -249,11 +847,28 @@ if __name__ == "__main__":
     logger.debug("Creating argument parser")
     parser = argparse.ArgumentParser()
 
+    #options shared by the subcommands that resolve links
+    verify_parser = argparse.ArgumentParser(add_help=False)
+    verify_parser.add_argument('--verify', help='''
+        Probe every final link with HEAD or one byte ranged GET requests before writing it. Dead
+        links are resolved again once, and dropped if still dead; workers try the task again instead.
+        With --format jsonl, the size of each link and whether its server takes range requests are
+        written too.
+        ''',
+        action='store_true')
+
     #Create subparsers
-    sub_parser = parser.add_subparsers(title='Sub-commands', description='You may run --help on either of the following valid subcommands: scrape, search.')
+    sub_parser = parser.add_subparsers(title='Sub-commands', description='You may run --help on either of the following valid subcommands: scrape, search, index, serve, watch, worker.')
 
-    scrape_parser = sub_parser.add_parser('scrape')
-    scrape_parser.add_argument('--url', help='The url of the series to scrape links for', required=True)
+    scrape_parser = sub_parser.add_parser('scrape', parents=[verify_parser])
+    scrape_target = scrape_parser.add_mutually_exclusive_group(required=True)
+    scrape_target.add_argument('--url', help='The url of the series to scrape links for')
+    scrape_target.add_argument('--batch', help='''
+        A file of series to scrape links for all at once, sharing browser drivers and connections.
+        Put one series per line, as its url optionally followed by --seasons and --episodes in the
+        same format as the options below, e.g., "https://o2tvseries.com/Some-Series/index.html
+        --seasons [1-3]". Lines starting with # are ignored.
+        ''')
     scrape_parser.add_argument('--seasons', help='''
         The season(s) of the series to scrape links for. If the url provided is already for a
         specific season, skip this argument. If you want the links for just one season, put the
@@ -275,6 +890,53 @@ if __name__ == "__main__":
         If skipped and episode was not specified in url, default is to get all episodes.
         ''',
         required=False)
+    add_driver_arguments(scrape_parser)
+    scrape_parser.add_argument('--output', help=f'''
+        The file to write download links to, one per line, as soon as each is resolved. It may be a
+        named pipe, so a downloader can start on the links while scraping continues. Use '-' for
+        stdout. Default is {output.DEFAULT_OUTPUT}.
+        ''',
+        default=output.DEFAULT_OUTPUT, required=False)
+    scrape_parser.add_argument('--output-dir', help='''
+        With --batch, write the links of each series to its own file in this directory, named after
+        its url, instead of writing the links of all series to --output
+        ''',
+        required=False)
+    scrape_parser.add_argument('--max-series', help='''
+        With --batch, the number of series to scrape at once. Default is 4.
+        ''',
+        type=int, default=4, required=False)
+    scrape_parser.add_argument('--format', help='''
+        The format to write download links in: text writes just the links, jsonl writes a JSON
+        object per link with its season, episode and the page it was resolved from. Default is text.
+        ''',
+        choices=output.FORMATS, default='text', required=False)
+    scrape_parser.add_argument('--journal', help=f'''
+        The file to record crawled pages and resolved download links in as the scrape goes, so an
+        interrupted scrape can be resumed with --resume. It is removed once the scrape finishes.
+        No journal is kept unless this or --resume is given. Default with --resume is {journal.DEFAULT_JOURNAL}.
+        ''',
+        required=False)
+    scrape_parser.add_argument('--resume', help='''
+        Resume an interrupted scrape from its journal, skipping the pages and links it finished, and
+        keep journaling it. The url, seasons and episodes must be the same as those of the
+        interrupted scrape, which must have been given --journal or --resume too.
+        ''',
+        action='store_true', required=False)
+    scrape_parser.add_argument('--queue', help=f'''
+        Queue the scrape on a work queue instead of running it, so worker processes started with
+        the worker subcommand, on this host or on others sharing the queue file, crawl the pages and
+        resolve the links. Links are written as the workers resolve them. Pass the queue file, or
+        nothing for {DEFAULT_QUEUE}.
+        ''',
+        nargs='?', const=DEFAULT_QUEUE, required=False)
+    scrape_parser.add_argument('--connect', help=f'''
+        Forward the scrape to a daemon started with serve, skipping the startup of
+        connections and browsers, and write the links it streams back. Journals are not kept. Pass the unix socket
+        path or the http://localhost:PORT url it serves on, or nothing for {DEFAULT_ADDRESS}.
+        ''',
+        nargs='?', const=DEFAULT_ADDRESS, required=False)
+    add_fetching_arguments(scrape_parser)
     scrape_parser.set_defaults(func=scrape_main)
 
     search_parser = sub_parser.add_parser('search')
@@ -287,8 +949,135 @@ if __name__ == "__main__":
         The episode of the season of the series to search for, e.g. "--episode 5"
         ''',
         required=False)
+    search_parser.add_argument('--timeout', help=f'''
+        The number of seconds to wait for each site's search results. Sites that take longer are
+        skipped. Default is {SEARCH_TIMEOUT}.
+        ''',
+        type=float, default=SEARCH_TIMEOUT, required=False)
+    search_parser.add_argument('--connect', help=f'''
+        Forward the search to a daemon started with serve, skipping the startup of
+        connections, and print the results it streams back. Pass the unix socket
+        path or the http://localhost:PORT url it serves on, or nothing for {DEFAULT_ADDRESS}.
+        ''',
+        nargs='?', const=DEFAULT_ADDRESS, required=False)
+    search_parser.add_argument('--index-file', help=f'''
+        The title index searches answer from before searching sites live. Build and refresh it with
+        the index subcommand. Default is {DEFAULT_INDEX}.
+        ''',
+        required=False)
+    search_parser.add_argument('--no-index', help='Always search sites live, without the title index', action='store_true')
+    add_fetching_arguments(search_parser)
     search_parser.set_defaults(func=search_main)
 
+    index_parser = sub_parser.add_parser('index')
+    index_parser.add_argument('--full', help='''
+        Read every listing page of each site, instead of stopping at the first page with no new
+        titles. The first refresh of a site always reads every page.
+        ''',
+        action='store_true', required=False)
+    index_parser.add_argument('--max-pages', help='''
+        The number of listing pages of each site to read at most
+        ''',
+        type=int, required=False)
+    index_parser.add_argument('--index-file', help=f'''
+        The title index searches answer from before searching sites live. Build and refresh it with
+        the index subcommand. Default is {DEFAULT_INDEX}.
+        ''',
+        required=False)
+    add_fetching_arguments(index_parser)
+    index_parser.set_defaults(func=index_main)
+
+    serve_parser = sub_parser.add_parser('serve', parents=[verify_parser])
+    serve_parser.add_argument('--address', help=f'''
+        Where to listen for scrape and search jobs from clients, which send them with --connect:
+        a unix socket path, or an http://localhost:PORT url. Connections, caches and browser
+        drivers are kept open between jobs. To only take jobs from clients that know a shared
+        secret, set it in the KETTER_LINKS_TOKEN environment variable of both the daemon and its
+        clients. Default is {DEFAULT_ADDRESS}.
+        ''',
+        default=DEFAULT_ADDRESS, required=False)
+    serve_parser.add_argument('--max-series', help='''
+        The number of series of each scrape job to scrape at once. Default is 4.
+        ''',
+        type=int, default=4, required=False)
+    add_driver_arguments(serve_parser)
+    serve_parser.add_argument('--index-file', help=f'''
+        The title index searches answer from before searching sites live. Build and refresh it with
+        the index subcommand. Default is {DEFAULT_INDEX}.
+        ''',
+        required=False)
+    serve_parser.add_argument('--no-index', help='Always search sites live, without the title index', action='store_true')
+    add_fetching_arguments(serve_parser)
+    serve_parser.set_defaults(func=serve_main)
+
+    watch_parser = sub_parser.add_parser('watch', parents=[verify_parser])
+    watch_action = watch_parser.add_mutually_exclusive_group()
+    watch_action.add_argument('--add', help='''
+        The url of a series to follow. The episodes it lists now are taken as seen, so only
+        episodes added later are scraped.
+        ''')
+    watch_action.add_argument('--remove', help='The url of a followed series to stop following')
+    watch_action.add_argument('--list', help='Print every followed series', action='store_true')
+    watch_parser.add_argument('--seasons', help='''
+        With --add, the season(s) of the series to follow, in the same format as for scrape.
+        Default is all seasons.
+        ''',
+        required=False)
+    watch_parser.add_argument('--episodes', help='''
+        With --add, the episode(s) of the season(s) to follow, in the same format as for scrape.
+        Default is all episodes.
+        ''',
+        required=False)
+    watch_parser.add_argument('--watchlist', help=f'''
+        The file followed series, the episodes they list and the state of their pages are kept
+        in. Default is {DEFAULT_WATCHLIST}.
+        ''',
+        required=False)
+    watch_parser.add_argument('--interval', help='''
+        Seconds between polls of each followed series. Pages that did not change since the last
+        poll, going by their ETag, Last-Modified and hash, are not listed again. Default is
+        21600.
+        ''',
+        type=float, default=21600.0, required=False)
+    watch_parser.add_argument('--once', help='Poll every followed series once, then exit', action='store_true')
+    watch_parser.add_argument('--output', help=f'''
+        The file to append the download links of new episodes to as soon as each is resolved. Use
+        '-' for stdout. Default is {output.DEFAULT_OUTPUT}.
+        ''',
+        default=output.DEFAULT_OUTPUT, required=False)
+    watch_parser.add_argument('--format', help='''
+        The format to write download links in: text writes just the links, jsonl writes a JSON
+        object per link with its season, episode, series and the page it was resolved from.
+        Default is text.
+        ''',
+        choices=output.FORMATS, default='text', required=False)
+    watch_parser.add_argument('--max-series', help='''
+        The number of followed series to poll at once. Default is 4.
+        ''',
+        type=int, default=4, required=False)
+    add_driver_arguments(watch_parser)
+    add_fetching_arguments(watch_parser)
+    watch_parser.set_defaults(func=watch_main)
+
+    worker_parser = sub_parser.add_parser('worker', parents=[verify_parser])
+    worker_parser.add_argument('--queue', help=f'''
+        The work queue file to claim crawl and resolve tasks from. Workers on other hosts can
+        share it over a filesystem with working locks. Default is {DEFAULT_QUEUE}.
+        ''',
+        default=DEFAULT_QUEUE, required=False)
+    worker_parser.add_argument('--kinds', help='''
+        The kinds of tasks to claim, e.g. only resolve on hosts with browsers. Default is all kinds.
+        ''',
+        nargs='+', choices=TASK_KINDS, default=list(TASK_KINDS), required=False)
+    worker_parser.add_argument('--concurrency', help='''
+        The number of tasks to run at once. Default is 4.
+        ''',
+        type=int, default=4, required=False)
+    worker_parser.add_argument('--exit-when-idle', help='Exit once the queue has no tasks pending or running, instead of waiting for more', action='store_true')
+    add_driver_arguments(worker_parser)
+    add_fetching_arguments(worker_parser)
+    worker_parser.set_defaults(func=worker_main)
+
     #Print help and exit if no command-line arguments are supplied
     if len(sys.argv) < 2:
         logger.error("No arguments supplied")
@@ -298,5 +1087,12 @@ if __name__ == "__main__":
     # Parse arguments
     args = parser.parse_args()
 
-    #run main func
-    args.func()
+    #run main func, writing metrics even if it fails, to show where it was slow
+    try:
+        args.func()
+    finally:
+        #only subcommands that fetch pages load the parsers
+        if 'ketter_links.parsing' in sys.modules:
+            from ketter_links import parsing
+            parsing.close()
+        write_metrics()
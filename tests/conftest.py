@@ -0,0 +1,20 @@
+##Written by kelseykm
+
+import pytest
+from typing import Iterator
+
+from ketter_links import cache, parsing, ratelimit, transport, verify
+from benchmarks.server import Shape, StandInServer
+
+@pytest.fixture
+def stand_in(tmp_path: str) -> Iterator[StandInServer]:
+    """ Serve every site from a local stand-in, with the shared transport routed to it """
+    with StandInServer(shape=Shape(seasons=2, episodes=3)) as server:
+        cache.configure(enabled=True, cache_dir=str(tmp_path))
+        ratelimit.configure(rate=1000)
+        transport.configure(origins=server.origins, dns_ttl=0)
+        verify.configure(enabled=False)
+        parsing.configure()
+        yield server
+        transport.configure()
+        cache.configure(enabled=False)
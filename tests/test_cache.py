@@ -0,0 +1,11 @@
+##Written by kelseykm
+
+from ketter_links import transport
+
+def test_cache_hit_keeps_url_after_redirects(stand_in):
+    sess = transport.get_transport().session()
+    url = 'https://www.thenetnaija.com/videos/series/1-show/season-1/episode-1/download'
+    fetched = sess.get(url)
+    cached = sess.get(url)
+    assert getattr(cached, 'from_cache', False)
+    assert cached.url == fetched.url == 'https://www.sabishare.com/file/1-1'
@@ -0,0 +1,63 @@
+##Written by kelseykm
+
+import threading
+import time
+
+from ketter_links.crawler import Crawler
+
+class InFlight:
+    """ Counts the calls running at once, keeping the most seen """
+
+    def __init__(self) -> None:
+        self.now = 0
+        self.most = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, url: str) -> str:
+        with self._lock:
+            self.now += 1
+            self.most = max(self.most, self.now)
+        time.sleep(0.02)
+        with self._lock:
+            self.now -= 1
+        return url
+
+def test_map_keeps_order_of_urls():
+    urls = [ f'https://a.example/{i}' for i in range(20) ]
+    with Crawler(max_workers=4) as crawler:
+        assert crawler.map(lambda url, suffix: url + suffix, urls, '!') == [ url + '!' for url in urls ]
+
+def test_fetches_are_capped_per_host():
+    in_flight = InFlight()
+    with Crawler(max_workers=8, max_per_host=2) as crawler:
+        crawler.map(in_flight, [ f'https://a.example/{i}' for i in range(8) ])
+    assert in_flight.most == 2
+
+def test_hosts_are_capped_separately():
+    in_flight = InFlight()
+    with Crawler(max_workers=8, max_per_host=2) as crawler:
+        crawler.map(in_flight, [ f'https://{host}.example/{i}' for host in 'ab' for i in range(4) ])
+    assert in_flight.most == 4
+
+def test_nested_map_runs_inline():
+    #a pool of one worker would deadlock if the inner map waited on the pool
+    with Crawler(max_workers=1) as crawler:
+        def season(url: str) -> list[str]:
+            return crawler.map(lambda episode: episode, [ f'{url}/{i}' for i in range(3) ])
+        assert crawler.map(season, ['https://a.example/1', 'https://a.example/2']) == [
+            [ f'https://a.example/{season}/{i}' for i in range(3) ] for season in (1, 2)
+        ]
+
+def test_imap_pulls_urls_lazily():
+    pulled = []
+    def urls():
+        for i in range(100):
+            pulled.append(i)
+            yield f'https://a.example/{i}'
+
+    with Crawler(max_workers=2) as crawler:
+        results = crawler.imap(lambda url: url, urls())
+        assert next(results) == 'https://a.example/0'
+        #only a window of urls is pulled ahead of the results
+        assert len(pulled) <= 2 * 2 + 1
+        assert list(results) == [ f'https://a.example/{i}' for i in range(1, 100) ]
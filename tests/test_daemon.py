@@ -0,0 +1,83 @@
+##Written by kelseykm
+
+import json
+import os
+import threading
+
+import pytest
+
+from ketter_links import daemon
+from ketter_links.exceptions import DaemonError, InvalidInput
+
+def echo(request):
+    """ Stream each series of the request back """
+    if 'series' not in request:
+        raise InvalidInput('No series given')
+    return iter([ {'series': series} for series in request['series'] ])
+
+@pytest.fixture
+def serve(tmp_path, monkeypatch):
+    monkeypatch.delenv(daemon.TOKEN_ENV, raising=False)
+    servers = []
+
+    def serve(token=None):
+        server = daemon.make_server(os.path.join(tmp_path, 'd.sock'), {'scrape': echo}, token=token)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server.path
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.close()
+
+def post(path, body, headers):
+    connection = daemon.UnixHTTPConnection(path, timeout=5)
+    try:
+        connection.request('POST', '/scrape', body=body, headers=headers)
+        resp = connection.getresponse()
+        return resp.status, resp.read()
+    finally:
+        connection.close()
+
+def test_client_streams_job_messages(serve):
+    path = serve()
+    assert list(daemon.Client(path).run('scrape', {'series': ['a', 'b']})) == [{'series': 'a'}, {'series': 'b'}]
+
+def test_bad_request_raises_invalid_input(serve):
+    path = serve()
+    with pytest.raises(InvalidInput):
+        list(daemon.Client(path).run('scrape', {}))
+
+def test_unknown_job(serve):
+    path = serve()
+    with pytest.raises(DaemonError):
+        list(daemon.Client(path).run('delete', {}))
+
+@pytest.mark.parametrize('content_type', [None, 'text/plain', 'application/x-www-form-urlencoded'])
+def test_only_json_requests_are_taken(serve, content_type):
+    path = serve()
+    headers = {'Content-Type': content_type} if content_type else {}
+    status, _ = post(path, json.dumps({'series': ['a']}), headers)
+    assert status == 415
+
+def test_json_with_charset_is_taken(serve):
+    path = serve()
+    status, body = post(path, json.dumps({'series': ['a']}), {'Content-Type': 'application/json; charset=utf-8'})
+    assert status == 200 and json.loads(body) == {'series': 'a'}
+
+def test_token_is_required_when_set(serve):
+    path = serve(token='secret')
+    with pytest.raises(DaemonError):
+        list(daemon.Client(path).run('scrape', {'series': ['a']}))
+    with pytest.raises(DaemonError):
+        list(daemon.Client(path, token='guess').run('scrape', {'series': ['a']}))
+    assert list(daemon.Client(path, token='secret').run('scrape', {'series': ['a']})) == [{'series': 'a'}]
+
+def test_token_is_read_from_environment(serve, monkeypatch):
+    monkeypatch.setenv(daemon.TOKEN_ENV, 'secret')
+    path = serve()
+    assert list(daemon.Client(path).run('scrape', {'series': ['a']})) == [{'series': 'a'}]
+    monkeypatch.delenv(daemon.TOKEN_ENV)
+    with pytest.raises(DaemonError):
+        list(daemon.Client(path).run('scrape', {'series': ['a']}))
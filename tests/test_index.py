@@ -0,0 +1,61 @@
+##Written by kelseykm
+
+import os
+
+import pytest
+
+from ketter_links.index import IndexEntry, TitleIndex, normalize, trigrams
+
+SITE = 'www.lightdl.xyz'
+
+def entry(title: str, site: str = SITE, season: int = None) -> IndexEntry:
+    slug = normalize(title).replace(' ', '-')
+    return IndexEntry(site, title, slug, f'https://{site}/{slug}.html', f'https://{site}/{slug}.html', season)
+
+@pytest.fixture
+def title_index(tmp_path):
+    title_index = TitleIndex(os.path.join(tmp_path, 'titles.sqlite3'))
+    yield title_index
+    title_index.close()
+
+def test_normalize_and_trigrams():
+    assert normalize("The Boys: Season 2 (2020)") == 'the boys season 2 2020'
+    assert trigrams('ab') == {'  a', ' ab', 'ab '}
+
+def test_add_skips_titles_already_indexed(title_index):
+    assert title_index.add([entry('Some Series'), entry('Another Series')]) == 2
+    assert title_index.add([entry('Some Series'), entry('Third Series')]) == 1
+
+def test_lookup_by_prefix(title_index):
+    title_index.add([entry('Some Series Season 1'), entry('Some Series Season 2'), entry('Other Show')])
+    titles = { found.title for found in title_index.lookup(SITE, 'some series') }
+    assert titles == {'Some Series Season 1', 'Some Series Season 2'}
+
+def test_lookup_tolerates_typos(title_index):
+    title_index.add([entry('Breaking Bad'), entry('Better Call Saul')])
+    assert [ found.title for found in title_index.lookup(SITE, 'braking bad') ] == ['Breaking Bad']
+
+def test_lookup_is_per_site(title_index):
+    title_index.add([entry('Some Series', site='www.thenetnaija.com')])
+    assert title_index.lookup(SITE, 'Some Series') == []
+    assert title_index.lookup(SITE, '!!!') == []
+
+def test_refresh_stops_at_first_page_with_nothing_new(title_index):
+    pages = { 1: [entry('One'), entry('Two')], 2: [entry('Three')], 3: [entry('Four')] }
+    read = []
+    def listing_page(page: int) -> list[IndexEntry]:
+        read.append(page)
+        return pages.get(page, [])
+
+    assert title_index.refresh(SITE, listing_page, max_pages=10) == 4
+    assert title_index.refreshed_at(SITE) is not None
+
+    read.clear()
+    pages[1] = [entry('Five'), entry('One')]
+    assert title_index.refresh(SITE, listing_page, max_pages=10) == 1
+    assert read == [1, 2]
+
+def test_match_tells_prefix_from_near_matches(title_index):
+    title_index.add([entry('Breaking Bad'), entry('Breaking Point')])
+    assert [ (found.title, prefixed) for found, prefixed in title_index.match(SITE, 'breaking b') ] == [('Breaking Bad', True)]
+    assert [ (found.title, prefixed) for found, prefixed in title_index.match(SITE, 'braking bad') ] == [('Breaking Bad', False)]
@@ -0,0 +1,62 @@
+##Written by kelseykm
+
+import os
+
+from ketter_links.journal import Journal
+
+def test_resume_skips_finished_entries(tmp_path):
+    path = os.path.join(tmp_path, 'urls.journal')
+    journal = Journal(path, scope='show')
+    journal.record(Journal.LINK, 'https://a', 'https://file/a')
+    journal.close()
+
+    calls = []
+    def resolve(url: str):
+        calls.append(url)
+        return url + '/resolved'
+
+    journal = Journal(path, resume=True, scope='show')
+    resolve = journal.journaled(Journal.LINK, resolve)
+    assert resolve('https://a') == 'https://file/a'
+    assert resolve('https://b') == 'https://b/resolved'
+    assert calls == ['https://b']
+    journal.close()
+
+def test_failures_are_not_recorded(tmp_path):
+    path = os.path.join(tmp_path, 'urls.journal')
+    journal = Journal(path, scope='show')
+    journal.journaled(Journal.LINK, lambda url: None)('https://a')
+    journal.close()
+
+    journal = Journal(path, resume=True, scope='show')
+    assert journal.get(Journal.LINK, 'https://a') == (False, None)
+    journal.close()
+
+def test_different_scope_starts_over(tmp_path):
+    path = os.path.join(tmp_path, 'urls.journal')
+    journal = Journal(path, scope='show seasons 1')
+    journal.record(Journal.PAGE, 'https://a', ['https://a/1'])
+    journal.close()
+
+    journal = Journal(path, resume=True, scope='show seasons 2')
+    assert journal.get(Journal.PAGE, 'https://a') == (False, None)
+    journal.close()
+
+def test_line_cut_short_is_skipped(tmp_path):
+    path = os.path.join(tmp_path, 'urls.journal')
+    journal = Journal(path, scope='show')
+    journal.record(Journal.LINK, 'https://a', 'https://file/a')
+    journal.close()
+    with open(path, 'a') as f:
+        f.write('{"kind": "link", "key": "https://b"')
+
+    journal = Journal(path, resume=True, scope='show')
+    assert journal.get(Journal.LINK, 'https://a') == (True, 'https://file/a')
+    assert journal.get(Journal.LINK, 'https://b') == (False, None)
+    journal.record(Journal.LINK, 'https://c', 'https://file/c')
+    journal.close()
+
+    journal = Journal(path, resume=True, scope='show')
+    assert journal.get(Journal.LINK, 'https://c') == (True, 'https://file/c')
+    journal.remove()
+    assert not os.path.exists(path)
@@ -0,0 +1,76 @@
+##Written by kelseykm
+
+import argparse
+import os
+import subprocess
+import sys
+
+import pytest
+
+import main
+from ketter_links import cache, daemon, drivers, index, journal, parsing, pool, ratelimit, scheduler, transport, watch, workqueue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def imported_after(argv, then=''):
+    """ Run main.py with argv in a fresh interpreter, then the code in then, and get the heavy modules it imported """
+    code = (
+        "import runpy, sys\n"
+        f"sys.argv = ['main.py', *{argv!r}]\n"
+        "try:\n"
+        "    runpy.run_path('main.py', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"{then}"
+        "print(sorted(module for module in ('requests', 'bs4', 'lxml', 'selectolax', 'selenium') if module in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+@pytest.mark.parametrize('argv', [
+    ['--help'],
+    ['scrape', '--help'],
+    ['worker', '--help'],
+    ['scrape', '--url', 'https://o2tvseries.com/Show/index.html', '--no-such-option'],
+    ['search'],
+])
+def test_help_and_argument_errors_import_nothing_heavy(argv):
+    assert imported_after(argv) == '[]'
+
+def test_cli_and_sites_do_not_import_selenium():
+    then = (
+        "from ketter_links import sites\n"
+        "for site in ('www.thenetnaija.com', 'www.lightdl.xyz', 'o2tvseries.com'):\n"
+        "    sites.get_site(site).load()\n"
+    )
+    assert 'selenium' not in imported_after(['--help'], then)
+
+def test_argument_defaults_match_subsystems():
+    assert (main.CACHE_DIR, main.DEFAULT_QUEUE, main.DEFAULT_ADDRESS, main.DEFAULT_INDEX, main.DEFAULT_WATCHLIST) == (
+        cache.DEFAULT_CACHE_DIR, workqueue.DEFAULT_QUEUE, daemon.DEFAULT_ADDRESS, index.DEFAULT_INDEX, watch.DEFAULT_WATCHLIST
+    )
+    assert main.TASK_KINDS == workqueue.WorkQueue.KINDS
+    assert (pool.DriverPool.MAX_USES, drivers.DEFAULT_PROFILE, drivers.PROFILES) == (50, 'full', ('full', 'light'))
+    assert (parsing.DEFAULT_BACKEND, parsing.BACKENDS) == ('html.parser', ('html.parser', 'lxml', 'selectolax'))
+    assert (ratelimit.HostLimiter.RATE, transport.Transport.POOL_MAXSIZE) == (4.0, 16)
+    assert (scheduler.Scheduler.MAX_SERIES, workqueue.Worker.CONCURRENCY, watch.Watcher.INTERVAL) == (4, 4, 21600)
+
+def test_scrape_keeps_no_journal_unless_asked(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, 'args', argparse.Namespace(resume=False, journal=None), raising=False)
+    assert main.open_journal('show') is None
+    assert os.listdir(tmp_path) == []
+
+def test_scrape_journals_when_resuming_or_given_a_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, 'args', argparse.Namespace(resume=True, journal=None), raising=False)
+    scrape_journal = main.open_journal('show')
+    assert scrape_journal.path == journal.DEFAULT_JOURNAL
+    main.close_journal(scrape_journal, finished=False)
+    assert os.path.exists(journal.DEFAULT_JOURNAL)
+
+    path = os.path.join(tmp_path, 'show.journal')
+    monkeypatch.setattr(main, 'args', argparse.Namespace(resume=False, journal=path), raising=False)
+    scrape_journal = main.open_journal('show')
+    main.close_journal(scrape_journal, finished=True)
+    assert not os.path.exists(path)
@@ -0,0 +1,73 @@
+##Written by kelseykm
+
+import re
+
+import pytest
+
+from ketter_links import parsing
+from ketter_links.scraper import NetNaija
+from ketter_links.selection import Selection
+from benchmarks import fixtures
+
+PAGE = b'''<html><body>
+<div class="post first"><a href="/a" title="A">Season 1</a><span>skip</span></div>
+<div class="post"><a href="/b">Season 2</a></div>
+<div class="sidebar"><a href="/c">Season 3</a></div>
+<p><a href="/d" data-id="d-1">Other</a></p>
+</body></html>'''
+
+SERIES = 'https://www.thenetnaija.com/videos/series/1-show'
+SEASON = f'{SERIES}/season-1'
+
+@pytest.fixture(params=parsing.available_backends())
+def backend(request):
+    return request.param
+
+def test_find_all_by_class_and_text(backend):
+    page = parsing.parse(PAGE, backend=backend)
+    posts = page.find_all('div', {'class': 'post'})
+    assert [ post.find('a').get('href') for post in posts ] == ['/a', '/b']
+    assert [ link.get('href') for link in page.find_all('a', text=re.compile(r'^Season \d$')) ] == ['/a', '/b', '/c']
+    assert page.find('a', {'data-id': re.compile(r'^d-')}).text() == 'Other'
+    assert page.find('table') is None
+
+def test_only_keeps_listed_tags(backend):
+    page = parsing.parse(PAGE, only={'div': {'class': 'post'}}, backend=backend)
+    assert [ link.get('href') for link in page.find_all('a') ][:2] == ['/a', '/b']
+    if backend != 'selectolax':
+        #selectolax parses the whole page, the soup backends skip tags outside only
+        assert [ link.get('href') for link in page.find_all('a') ] == ['/a', '/b']
+
+def test_backends_extract_the_same_links(backend):
+    page = fixtures.netnaija_season(SERIES, 1, 20)
+    parsing.configure(backend)
+    try:
+        links = parsing.extract(NetNaija.extract_episode_links, page, Selection.parse('[3-5]'))
+    finally:
+        parsing.configure()
+    assert links == [ f'{SEASON}/episode-{episode}/download' for episode in (3, 4, 5) ]
+
+def test_extract_in_parse_processes():
+    page = fixtures.netnaija_season(SERIES, 1, 20)
+    parsing.configure(processes=1)
+    try:
+        links = parsing.extract(NetNaija.extract_episode_links, page, Selection.single(7))
+    finally:
+        parsing.configure()
+    assert links == [f'{SEASON}/episode-7/download']
+
+def test_stream_yields_tags_as_they_close():
+    chunks = [b'<html><body><a href="/one">Sea', b'son 1</a><a href="/two">Other</a>', b'<a href="/three">Season 3</a></body></html>']
+    found = parsing.iter_stream(iter(chunks), 'a', text=re.compile(r'^Season \d$'))
+    assert [ element.get('href') for element in found ] == ['/one', '/three']
+
+def test_stream_decodes_characters_split_across_chunks():
+    data = '<a href="/é">Épisode</a>'.encode()
+    chunks = [ data[i:i + 1] for i in range(len(data)) ]
+    assert [ element.text() for element in parsing.iter_stream(iter(chunks), 'a') ] == ['Épisode']
+
+def test_configure_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        parsing.configure('html5lib')
+    with pytest.raises(ValueError):
+        parsing.configure(parsing.DEFAULT_BACKEND, processes=-1)
@@ -0,0 +1,59 @@
+##Written by kelseykm
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from ketter_links.pool import DriverPool
+
+class FakeDriver:
+    """ Stands in for a browser driver, resolving every url to itself """
+
+    launched: list['FakeDriver'] = []
+
+    def __init__(self) -> None:
+        self.quit = False
+        self.crash = False
+        FakeDriver.launched.append(self)
+
+    def get_download_link(self, url: str) -> str:
+        if self.crash:
+            raise WebDriverException("chrome not reachable")
+        return url
+
+    def quit_driver(self) -> None:
+        assert not self.quit, "driver quit twice"
+        self.quit = True
+
+@pytest.fixture(autouse=True)
+def launched():
+    FakeDriver.launched = []
+    yield FakeDriver.launched
+
+def test_close_quits_checked_out_drivers(launched):
+    pool = DriverPool(FakeDriver, size=2)
+    idle, busy = pool.acquire(), pool.acquire()
+    pool.release(idle)
+    pool.close()
+    assert idle.quit and busy.quit
+
+def test_release_after_close_quits_driver(launched):
+    pool = DriverPool(FakeDriver, size=1)
+    driver = pool.acquire()
+    pool.close()
+    pool.release(driver)
+    assert driver.quit
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+def test_worn_out_driver_is_recycled(launched):
+    with DriverPool(FakeDriver, size=1, max_uses=2) as pool:
+        assert pool.resolve_all(['a', 'b', 'c']) == ['a', 'b', 'c']
+    assert len(launched) == 2
+    assert all(driver.quit for driver in launched)
+
+def test_crashed_driver_is_replaced(launched):
+    with DriverPool(FakeDriver, size=1) as pool:
+        pool.acquire().crash = True
+        pool.release(launched[0])
+        assert pool.resolve('a') == 'a'
+    assert len(launched) == 2 and launched[0].quit
@@ -0,0 +1,89 @@
+##Written by kelseykm
+
+import http.server
+import threading
+from typing import Iterator
+
+import pytest
+import requests
+
+from ketter_links import ratelimit
+from ketter_links.ratelimit import RateLimited
+
+class ScriptedHandler(http.server.BaseHTTPRequestHandler):
+    """ Answers each request with the next status and headers of the server's script """
+
+    def _answer(self) -> None:
+        self.server.requests.append(self.command)
+        status, headers = self.server.script.pop(0) if self.server.script else (200, {})
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_POST = _answer
+
+    def log_message(self, *args) -> None:
+        pass
+
+@pytest.fixture
+def scripted() -> Iterator[http.server.HTTPServer]:
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ScriptedHandler)
+    server.script, server.requests = [], []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def session(max_throttled_retries: int = ratelimit.RateLimitedAdapter.MAX_RETRIES) -> requests.Session:
+    sess = requests.Session()
+    adapter = ratelimit.RateLimitedAdapter(ratelimit.RateLimiter(rate=1000), max_throttled_retries=max_throttled_retries)
+    sess.mount('http://', adapter)
+    return sess
+
+def url(server: http.server.HTTPServer) -> str:
+    return f'http://127.0.0.1:{server.server_address[1]}/'
+
+def test_throttled_get_is_retried(scripted):
+    scripted.script = [(429, {'Retry-After': '0'}), (503, {'Retry-After': '0'}), (200, {})]
+    assert session().get(url(scripted)).status_code == 200
+    assert scripted.requests == ['GET'] * 3
+
+@pytest.mark.parametrize('status', [500, 502, 504])
+def test_server_errors_go_to_caller(scripted, status):
+    scripted.script = [(status, {})]
+    assert session().get(url(scripted)).status_code == status
+    assert len(scripted.requests) == 1
+
+def test_retry_after_marks_any_status_throttled(scripted):
+    scripted.script = [(500, {'Retry-After': '0'}), (200, {})]
+    assert session().get(url(scripted)).status_code == 200
+    assert len(scripted.requests) == 2
+
+def test_throttled_post_is_not_retried(scripted):
+    scripted.script = [(429, {'Retry-After': '0'}), (200, {})]
+    assert session().post(url(scripted), data=b'{}').status_code == 429
+    assert scripted.requests == ['POST']
+
+def test_gives_up_after_max_retries(scripted):
+    scripted.script = [(429, {'Retry-After': '0'})] * 3
+    with pytest.raises(RateLimited):
+        session(max_throttled_retries=2).get(url(scripted))
+    assert len(scripted.requests) == 3
+
+def test_retry_after_date_and_seconds():
+    resp = requests.models.Response()
+    resp.headers['Retry-After'] = '7'
+    assert ratelimit.retry_after(resp) == 7.0
+    resp.headers['Retry-After'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    assert ratelimit.retry_after(resp) == 0.0
+    resp.headers['Retry-After'] = 'soon'
+    assert ratelimit.retry_after(resp) is None
+
+def test_host_limiter_halves_concurrency_when_throttled():
+    limiter = ratelimit.HostLimiter('example.com', initial_concurrency=4)
+    limiter.acquire()
+    assert limiter.release(throttled=True, delay=0) == 0
+    assert limiter.concurrency == 2
@@ -0,0 +1,48 @@
+##Written by kelseykm
+
+import pytest
+
+from ketter_links import parsing, resolvers, transport
+from ketter_links.exceptions import ResolverFailed
+
+NETNAIJA_DOWNLOAD = 'https://www.thenetnaija.com/videos/series/1-show/season-1/episode-2/download'
+NETNAIJA_SEASON = 'https://www.thenetnaija.com/videos/series/1-show/season-1'
+
+@pytest.mark.parametrize('backend', parsing.available_backends())
+def test_sabishare_resolves_download_button_xhr(stand_in, backend):
+    parsing.configure(backend)
+    sess = transport.get_transport().session(cached=False)
+    assert resolvers.Sabishare(sess).get_download_link(NETNAIJA_DOWNLOAD) == 'https://files.example.com/netnaija/show.S01E02.mp4'
+
+def test_sabishare_missing_file(stand_in):
+    sess = transport.get_transport().session(cached=False)
+    assert resolvers.Sabishare(sess).get_download_link('https://www.sabishare.com/file/missing') is None
+
+def test_sabishare_fails_without_download_button(stand_in):
+    sess = transport.get_transport().session(cached=False)
+    with pytest.raises(ResolverFailed):
+        resolvers.Sabishare(sess).get_download_link(NETNAIJA_SEASON)
+
+def test_sabishare_button_pointing_at_file(stand_in):
+    sess = transport.get_transport().session(cached=False)
+    assert resolvers.Sabishare(sess).get_download_link('https://www.sabishare.com/direct/1-2') == 'https://files.example.com/netnaija/show.S01E02.mp4'
+    #the file is not downloaded to find that out
+    assert transport.get_transport().stats()['files.example.com']['bytes'] < 1024
+
+@pytest.mark.parametrize('data, link', [
+    ({'data': {'thumbnail': 'https://img/poster.jpg', 'download_url': 'https://files/a.mp4'}}, 'https://files/a.mp4'),
+    ({'files': [{'poster': 'https://img/poster.jpg'}, {'link': 'https://files/b.mp4'}]}, 'https://files/b.mp4'),
+    ({'thumbnail': 'https://img/poster.jpg', 'tracking': {'pixel': 'https://t/p.gif'}}, None),
+    (['https://img/poster.jpg'], None),
+])
+def test_sabishare_link_only_taken_from_link_keys(data, link):
+    assert resolvers.Sabishare(None)._link_from_json(data) == link
+
+def test_o2tvseries_follows_redirects_to_file(stand_in):
+    sess = transport.get_transport().session(cached=False)
+    link = resolvers.O2tvSeries(sess).get_download_link('https://o2tvseries.com/download/2/3/hd')
+    assert link == 'https://files.example.com/o2tvseries/show.S02E03.hd.mp4'
+
+def test_o2tvseries_meta_refresh():
+    page = parsing.parse(b'<html><head><meta http-equiv="Refresh" content="0; url=/next"></head></html>', only=resolvers.O2tvSeries.PAGE_TAGS)
+    assert resolvers.O2tvSeries(None)._meta_refresh(page, 'https://o2tvseries.com/a/b') == 'https://o2tvseries.com/next'
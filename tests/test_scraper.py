@@ -0,0 +1,87 @@
+##Written by kelseykm
+
+import os
+from urllib.parse import urlparse
+
+from ketter_links import resolvers, scraper, transport
+from ketter_links.journal import Journal
+from ketter_links.output import Link
+from ketter_links.selection import Selection
+
+NETNAIJA_DOWNLOAD = 'https://www.thenetnaija.com/videos/series/1-show/season-1/episode-2/download'
+NETNAIJA_SEASON = 'https://www.thenetnaija.com/videos/series/1-show/season-1'
+
+class RecordingPool:
+    """ Stands in for a driver pool, recording the urls it is asked to resolve """
+
+    def __init__(self, link: str = 'https://files.example.com/from-browser.mp4') -> None:
+        self.link = link
+        self.urls: list[str] = []
+
+    def resolve(self, url: str) -> str:
+        self.urls.append(url)
+        return self.link
+
+def test_resolve_does_not_use_driver_pool_when_http_works(stand_in):
+    pool = RecordingPool()
+    link = scraper.resolve_link(Link(NETNAIJA_DOWNLOAD, 1, 2), transport.get_transport(), resolvers.Sabishare, pool)
+    assert link == Link('https://files.example.com/netnaija/show.S01E02.mp4', 1, 2, source=NETNAIJA_DOWNLOAD)
+    assert pool.urls == []
+
+def test_resolve_falls_back_to_driver_pool(stand_in):
+    pool = RecordingPool()
+    link = scraper.resolve_link(Link(NETNAIJA_SEASON, 1, None), transport.get_transport(), resolvers.Sabishare, pool)
+    assert link.url == pool.link
+    assert pool.urls == [NETNAIJA_SEASON]
+
+def test_netnaija_journals_each_page(stand_in, tmp_path):
+    series = 'https://www.thenetnaija.com/videos/series/1-show'
+    seasons = [ f'{series}/season-{season}' for season in (1, 2) ]
+    scrape_journal = Journal(os.path.join(tmp_path, 'urls.journal'), scope='show')
+    netnaija = scraper.NetNaija(urlparse(series), Selection.everything(), Selection.single(2), journal=scrape_journal)
+    assert [ link.url for link in netnaija.iter_download_pages() ] == [ f'{season}/episode-2/download' for season in seasons ]
+    assert scrape_journal.get(Journal.PAGE, series) == (True, seasons)
+    assert scrape_journal.get(Journal.PAGE, seasons[0]) == (True, [f'{seasons[0]}/episode-2/download'])
+    scrape_journal.close()
+
+    #a resumed scrape reads only the pages it did not finish, here the pages of season 2
+    scrape_journal = Journal(os.path.join(tmp_path, 'urls.journal'), resume=True, scope='show')
+    scrape_journal.record(Journal.PAGE, seasons[0], ['https://www.thenetnaija.com/journaled/download'])
+    netnaija = scraper.NetNaija(urlparse(series), Selection.everything(), Selection.single(2), journal=scrape_journal)
+    assert [ link.url for link in netnaija.iter_download_pages() ] == ['https://www.thenetnaija.com/journaled/download', f'{seasons[1]}/episode-2/download']
+    scrape_journal.close()
+
+def o2tvseries(episodes: Selection) -> scraper.O2tvSeries:
+    return scraper.O2tvSeries(urlparse('https://o2tvseries.com/Show'), Selection.everything(), episodes)
+
+def o2tvseries_pages(count: int) -> list[str]:
+    return [ f'https://o2tvseries.com/Show/Season-1/page{page}.html' for page in range(1, count + 1) ]
+
+def test_o2tvseries_plans_pages_from_first_page():
+    pages = o2tvseries_pages(5)
+    first_page = [ (number, f'/{number}') for number in range(1, 11) ]
+    assert o2tvseries(Selection.parse('[23-24]'))._plan_pages(first_page, pages) == ([pages[2]], [pages[1], pages[3], pages[4]])
+    assert o2tvseries(Selection.parse('[9-12]'))._plan_pages(first_page, pages) == ([pages[1]], pages[2:])
+    #episodes numbered past the last page are on no page
+    assert o2tvseries(Selection.parse('[60-70]'))._plan_pages(first_page, pages) == ([], pages[1:])
+
+def test_o2tvseries_plans_pages_of_newest_first_seasons():
+    pages = o2tvseries_pages(5)
+    first_page = [ (number, f'/{number}') for number in range(50, 40, -1) ]
+    assert o2tvseries(Selection.parse('[5]'))._plan_pages(first_page, pages) == ([pages[4]], pages[1:4])
+
+def test_o2tvseries_reads_every_page_when_it_cannot_plan():
+    pages = o2tvseries_pages(3)
+    first_page = [ (number, f'/{number}') for number in range(1, 11) ]
+    assert o2tvseries(Selection.everything())._plan_pages(first_page, pages) == (pages[1:], [])
+    assert o2tvseries(Selection.parse('[15]'))._plan_pages([], pages) == (pages[1:], [])
+    unnumbered = ['https://o2tvseries.com/Show/Season-1/next.html']
+    assert o2tvseries(Selection.parse('[15]'))._plan_pages(first_page, unnumbered) == (unnumbered, [])
+
+def test_o2tvseries_missing_episodes():
+    o2 = o2tvseries(Selection.parse('[1-10]'))
+    assert o2._missing_episodes([1, 2, 4])
+    assert not o2._missing_episodes([1, 2, 3])
+    assert not o2._missing_episodes([])
+    #gaps outside the selection do not count
+    assert not o2tvseries(Selection.parse('[1-2]'))._missing_episodes([1, 2, 5])
@@ -0,0 +1,49 @@
+##Written by kelseykm
+
+import os
+
+import pytest
+
+from ketter_links import index, search, sites
+from ketter_links.index import IndexEntry
+
+LIGHTDL = 'www.lightdl.xyz'
+INDEXED = 'https://www.lightdl.xyz/2021/01/show-42.html'
+
+@pytest.fixture
+def title_index(stand_in, tmp_path):
+    index.configure(path=os.path.join(tmp_path, 'titles.sqlite3'))
+    index.get_index().add([IndexEntry(search.LightDl.SITE, 'Show 42', 'show-42', INDEXED, INDEXED)])
+    yield index.get_index()
+    index.configure(enabled=False)
+
+def live_search(links):
+    calls = []
+    def search_live():
+        calls.append(True)
+        return links
+    return search_live, calls
+
+def test_exact_match_skips_live_search():
+    search_live, calls = live_search({'https://live'})
+    assert search.search_indexed(search.IndexMatch({'https://indexed'}, exact=True), search_live) == {'https://indexed'}
+    assert calls == []
+
+def test_near_match_is_merged_with_live_search():
+    search_live, calls = live_search({'https://live'})
+    assert search.search_indexed(search.IndexMatch({'https://indexed'}), search_live) == {'https://indexed', 'https://live'}
+    assert calls == [True]
+
+def test_no_results_anywhere():
+    search_live, _ = live_search(None)
+    assert search.search_indexed(search.IndexMatch(set()), search_live) is None
+
+def test_lightdl_answers_title_prefix_from_index(title_index):
+    assert search.LightDl('show 4').lookup() == search.IndexMatch({INDEXED}, exact=True)
+    assert sites.get_site(LIGHTDL).load().search('show 42') == {INDEXED}
+
+def test_lightdl_searches_live_on_near_match(title_index):
+    assert search.LightDl('shows 42').lookup() == search.IndexMatch({INDEXED})
+    links = sites.get_site(LIGHTDL).load().search('shows 42')
+    #the live results come from the stand-in's search page, which lists the query as its titles
+    assert INDEXED in links and len(links) > 1
@@ -0,0 +1,49 @@
+##Written by kelseykm
+
+import re
+
+import pytest
+
+from ketter_links.selection import MAX_NUMBER, Selection
+
+def test_parse_single_number():
+    assert Selection.parse('5').intervals == [(5, 5)]
+
+def test_parse_merges_overlapping_and_touching_intervals():
+    selection = Selection.parse('[9-11,1,4,2-3,10-12]')
+    assert selection.intervals == [(1, 4), (9, 12)]
+    assert list(selection) == [1, 2, 3, 4, 9, 10, 11, 12]
+    assert len(selection) == 8
+
+@pytest.mark.parametrize('spec', ['3-7', '[3-7', '[]', '[a]', '[7-3]'])
+def test_parse_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        Selection.parse(spec)
+
+def test_membership():
+    selection = Selection.parse('[4,9-11]')
+    assert 4 in selection and 10 in selection
+    assert 5 not in selection and 12 not in selection and 0 not in selection
+    assert '4' not in selection
+
+def test_everything():
+    selection = Selection.everything()
+    assert selection.is_everything()
+    assert 0 in selection and MAX_NUMBER in selection
+    assert str(selection) == 'all'
+
+@pytest.mark.parametrize('text', ['all', '5', '1-5,9', '2,4,6-8'])
+def test_load_reads_back_str(text):
+    assert str(Selection.load(text)) == text
+
+def test_first_last_and_empty():
+    assert (Selection.parse('[4,9-11]').first(), Selection.parse('[4,9-11]').last()) == (4, 11)
+    assert not Selection()
+    assert Selection().first() is None
+
+def test_select_matches_number_in_text():
+    pattern = re.compile(r's0?(\d{1,6})e0?(\d{1,6})', re.I)
+    seasons = Selection.single(2)
+    assert seasons.select('Show S02E05', pattern, 1)
+    assert not seasons.select('Show S03E05', pattern, 1)
+    assert not seasons.select('Show trailer', pattern, 1)
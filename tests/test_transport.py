@@ -0,0 +1,49 @@
+##Written by kelseykm
+
+import socket
+
+import urllib3.util.connection
+
+from ketter_links import resolvers, scraper, transport
+from ketter_links.output import Link
+from .test_scraper import NETNAIJA_DOWNLOAD, RecordingPool
+
+SERIES = 'https://www.thenetnaija.com/videos/series/1-show'
+
+def test_uncached_session_skips_cache(stand_in):
+    sess = transport.get_transport().session(cached=False)
+    sess.get(SERIES)
+    assert transport.get_transport().session().cache.get(SERIES) is None
+
+def test_resolved_pages_are_not_cached(stand_in):
+    sess = transport.get_transport().session()
+    scraper.resolve_link(Link(NETNAIJA_DOWNLOAD, 1, 2), transport.get_transport(), resolvers.Sabishare, RecordingPool())
+    assert sess.cache.get(NETNAIJA_DOWNLOAD) is None
+    assert sess.cache.get('https://www.sabishare.com/api/download/1-2') is None
+
+def test_dns_cache_skips_repeated_lookups(stand_in, monkeypatch):
+    lookups = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting_getaddrinfo(host, *args, **kwargs):
+        lookups.append(host)
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, 'getaddrinfo', counting_getaddrinfo)
+    port = stand_in.server_address[1]
+    origins = { host: f'http://localhost:{port}' for host in stand_in.origins }
+
+    with transport.Transport(origins=origins, dns_ttl=60) as trans:
+        for _ in range(2):
+            assert trans.session(cached=False).get(SERIES).status_code == 200
+            #drop the connections, so the next request opens a new one
+            trans.adapter.close()
+    assert lookups.count('localhost') == 1
+
+def test_dns_cache_is_not_installed_globally(stand_in):
+    create_connection = urllib3.util.connection.create_connection
+    with transport.Transport(origins=stand_in.origins, dns_ttl=60) as trans:
+        assert trans.dns_cache is not None
+        assert urllib3.util.connection.create_connection is create_connection
+        assert trans.session(cached=False).get(SERIES).status_code == 200
+    assert transport.Transport(dns_ttl=0).dns_cache is None
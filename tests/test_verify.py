@@ -0,0 +1,53 @@
+##Written by kelseykm
+
+from ketter_links import transport, verify
+from ketter_links.crawler import Crawler
+from ketter_links.output import Link
+from ketter_links.verify import Probe, Verifier
+
+FILE = 'https://files.example.com/lightdl/show.S01E01.mkv'
+DEAD = 'https://www.sabishare.com/gone/show.S01E02.mkv'
+
+def test_probe_live_link(stand_in):
+    verifier = Verifier(transport.get_transport())
+    assert verifier.probe(FILE) == Probe(True, 200, 1024, True)
+
+def test_probe_with_ranged_get(stand_in):
+    verifier = Verifier(transport.get_transport())
+    assert verifier._ranged_get(FILE) == Probe(True, 206, 1024, True)
+    #only one byte was asked for
+    assert transport.get_transport().stats()['files.example.com']['bytes'] < 1024
+
+def test_probe_dead_link(stand_in):
+    verifier = Verifier(transport.get_transport())
+    assert verifier.probe(DEAD) == Probe(False, 404)
+
+def test_verify_drops_dead_links_and_resolves_them_again(stand_in):
+    verifier = Verifier(transport.get_transport())
+    links = [
+        Link(FILE, 1, 1, source='https://www.lightdl.xyz/2021/01/show.html'),
+        Link(DEAD, 1, 2, source='https://source/2'),
+        Link(DEAD.replace('E02', 'E03'), 1, 3),
+    ]
+    resolved = []
+    def resolve(source):
+        resolved.append(source)
+        return FILE.replace('E01', 'E02')
+
+    with Crawler(max_workers=2) as crawler:
+        verified = list(verifier.verify(links, crawler, resolve))
+
+    assert resolved == ['https://source/2']
+    assert [ (link.url, link.episode, link.size, link.accept_ranges) for link in verified ] == [
+        (FILE, 1, 1024, True),
+        (FILE.replace('E01', 'E02'), 2, 1024, True),
+    ]
+
+def test_verifier_only_when_enabled(stand_in):
+    try:
+        verify.configure(enabled=True)
+        assert isinstance(verify.get_verifier(), Verifier)
+        assert verify.get_verifier() is verify.get_verifier()
+    finally:
+        verify.configure()
+    assert verify.get_verifier() is None
@@ -0,0 +1,68 @@
+##Written by kelseykm
+
+import os
+
+from ketter_links import scheduler
+from ketter_links.selection import Selection
+from ketter_links.watch import PageState, WatchedSeries, Watcher, Watchlist
+
+SERIES = 'https://www.thenetnaija.com/videos/series/1-show'
+
+class RecordingWatcher(Watcher):
+    """ Watcher recording the series it lists episodes of again """
+
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self.listed: list[WatchedSeries] = []
+
+    def _list(self, series: WatchedSeries, states: dict[str, PageState]) -> None:
+        self.listed.append(series)
+        super()._list(series, states)
+
+def test_watchlist_keeps_unseen_episodes(tmp_path):
+    watchlist = Watchlist(os.path.join(tmp_path, 'watchlist.sqlite3'))
+    watchlist.add(WatchedSeries(SERIES, Selection.everything(), Selection.everything()))
+    assert watchlist.list_episodes(SERIES, [(1, 1), (1, 2)], seen=True) == 2
+    #episodes already listed are not listed again
+    assert watchlist.list_episodes(SERIES, [(1, 2), (1, 3), (2, 1)]) == 2
+    watchlist.mark_seen(SERIES, 2, 1)
+    assert watchlist.unseen(SERIES) == [(1, 3)]
+
+    watchlist.set_pages(SERIES, {f'{SERIES}/season-1': PageState('"v1"', None, 'abc')})
+    assert watchlist.pages(SERIES) == {f'{SERIES}/season-1': PageState('"v1"', None, 'abc')}
+    assert watchlist.remove(SERIES)
+    assert watchlist.series() == [] and watchlist.unseen(SERIES) == [] and watchlist.pages(SERIES) == {}
+    assert not watchlist.remove(SERIES)
+    watchlist.close()
+
+def test_poll_resolves_only_new_episodes(stand_in, tmp_path):
+    watchlist = Watchlist(os.path.join(tmp_path, 'watchlist.sqlite3'))
+    series = WatchedSeries(SERIES, Selection.everything(), Selection.everything())
+    with scheduler.Scheduler() as sched:
+        watcher = RecordingWatcher(watchlist, sched)
+
+        assert watcher.follow(series) == 6
+        #the series page is watched too, for new seasons
+        assert set(watchlist.pages(SERIES)) == {SERIES, f'{SERIES}/season-1', f'{SERIES}/season-2'}
+
+        #unchanged pages are not listed again
+        assert list(watcher.poll(series)) == []
+        assert watcher.listed == []
+
+        stand_in.shape.episodes = 4
+        assert [ (link.season, link.episode) for link in watcher.poll(series) ] == [(1, 4), (2, 4)]
+        assert watcher.listed == [series]
+        assert watchlist.unseen(SERIES) == []
+        assert list(watcher.poll(series)) == []
+    watchlist.close()
+
+def test_due_series(tmp_path):
+    watchlist = Watchlist(os.path.join(tmp_path, 'watchlist.sqlite3'))
+    series = WatchedSeries(SERIES, Selection.everything(), Selection.everything())
+    watchlist.add(series)
+    watcher = Watcher(watchlist, None)
+    assert watcher.due() == [series] and watcher.next_due() == 0.0
+    watchlist.mark_checked(SERIES)
+    assert watcher.due() == [] and watcher.next_due() > Watcher.INTERVAL - 60
+    assert watcher.due(interval=0) == [series]
+    watchlist.close()
@@ -0,0 +1,173 @@
+##Written by kelseykm
+
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from ketter_links import scheduler, workqueue
+from ketter_links.selection import Selection
+from ketter_links.workqueue import WorkQueue
+
+JOB = 'job'
+
+@pytest.fixture
+def work_queue(tmp_path):
+    work_queue = WorkQueue(os.path.join(tmp_path, 'queue.sqlite3'), max_attempts=2)
+    yield work_queue
+    work_queue.close()
+
+def test_enqueue_skips_duplicates(work_queue):
+    assert work_queue.enqueue(JOB, WorkQueue.RESOLVE, 'a', {})
+    assert not work_queue.enqueue(JOB, WorkQueue.RESOLVE, 'a', {})
+    assert work_queue.enqueue(JOB, WorkQueue.CRAWL, 'a', {})
+    assert work_queue.counts(JOB) == {'pending': 2}
+
+def test_claim_takes_oldest_task_of_kinds(work_queue):
+    work_queue.enqueue(JOB, WorkQueue.CRAWL, 'a', {'n': 1})
+    work_queue.enqueue(JOB, WorkQueue.RESOLVE, 'b', {'n': 2})
+    task = work_queue.claim('w1', kinds=[WorkQueue.RESOLVE])
+    assert (task.kind, task.payload, task.attempts) == (WorkQueue.RESOLVE, {'n': 2}, 1)
+    assert work_queue.claim('w1', kinds=[WorkQueue.RESOLVE]) is None
+    assert work_queue.counts(JOB) == {'pending': 1, 'leased': 1}
+
+def test_expired_lease_is_claimed_again(work_queue):
+    work_queue.enqueue(JOB, WorkQueue.RESOLVE, 'a', {})
+    task = work_queue.claim('w1', lease=0.05)
+    assert work_queue.claim('w2') is None
+    time.sleep(0.1)
+
+    retried = work_queue.claim('w2')
+    assert retried.id == task.id and retried.attempts == 2
+    #the first worker lost the task, so it can neither keep nor finish it
+    assert not work_queue.heartbeat(task, 'w1')
+    assert not work_queue.complete(task, 'w1', 'late')
+    assert work_queue.complete(retried, 'w2', 'done')
+    assert work_queue.collect(JOB) == ['done']
+    assert work_queue.collect(JOB) == []
+
+def test_heartbeat_keeps_lease(work_queue):
+    work_queue.enqueue(JOB, WorkQueue.RESOLVE, 'a', {})
+    task = work_queue.claim('w1', lease=0.1)
+    time.sleep(0.06)
+    assert work_queue.heartbeat(task, 'w1', lease=0.1)
+    time.sleep(0.06)
+    assert work_queue.claim('w2') is None
+
+def test_failed_task_backs_off_then_fails_for_good(work_queue):
+    work_queue.RETRY_DELAY = 0.05
+    work_queue.enqueue(JOB, WorkQueue.RESOLVE, 'a', {})
+    task = work_queue.claim('w1')
+    assert work_queue.fail(task, 'w1', 'broken')
+    assert work_queue.counts(JOB) == {'pending': 1}
+    assert work_queue.claim('w1') is None
+    time.sleep(0.1)
+
+    task = work_queue.claim('w1')
+    assert task.attempts == 2
+    assert work_queue.fail(task, 'w1', 'broken')
+    assert work_queue.counts(JOB) == {'failed': 1}
+    assert work_queue.claim('w1') is None
+
+def test_expired_lease_on_last_attempt_fails(work_queue):
+    work_queue.enqueue(JOB, WorkQueue.RESOLVE, 'a', {})
+    work_queue.claim('w1', lease=0)
+    time.sleep(0.01)
+    work_queue.claim('w2', lease=0)
+    time.sleep(0.01)
+    assert work_queue.claim('w3') is None
+    assert work_queue.counts(JOB) == {'failed': 1}
+
+def test_worker_scrapes_queued_series(stand_in, work_queue):
+    urls = ['https://www.thenetnaija.com/videos/series/1-show', 'https://www.lightdl.xyz/2021/01/show.html']
+    for url in urls:
+        work_queue.enqueue(JOB, WorkQueue.CRAWL, url, workqueue.crawl_payload(url, Selection.everything(), Selection.single(2)))
+
+    with scheduler.Scheduler() as sched:
+        workqueue.Worker(work_queue, sched, concurrency=2).run(exit_when_idle=True)
+
+    assert work_queue.counts(JOB) == {'done': 6}
+    results = work_queue.collect(JOB)
+    assert sorted((result['series'], result['season'], result['episode']) for result in results) == [
+        (url, season, 2) for url in sorted(urls) for season in (1, 2)
+    ]
+
+def test_idle_worker_waits_for_tasks_backing_off(stand_in, work_queue):
+    series = 'https://www.lightdl.xyz/2021/01/show.html'
+    link = {'url': 'https://files.example.com/lightdl/show.S01E01.mkv', 'season': 1, 'episode': 1, 'source': series, 'size': None, 'accept_ranges': None}
+    work_queue.enqueue(JOB, WorkQueue.RESOLVE, link['url'], {'series': series, 'link': link})
+    task = work_queue.claim('w1')
+    work_queue.RETRY_DELAY = 0.5
+    work_queue.fail(task, 'w1', 'broken')
+
+    with scheduler.Scheduler() as sched:
+        worker = workqueue.Worker(work_queue, sched, concurrency=2)
+        worker.IDLE_INTERVAL = 0.1
+        worker.run(exit_when_idle=True)
+
+    assert work_queue.counts(JOB) == {'done': 1}
+
+class FlakyQueue(WorkQueue):
+    """ Work queue whose database is locked for the first calls of some methods """
+
+    def __init__(self, *args, locked=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.locked = dict(locked or {})
+
+    def _check(self, method):
+        if self.locked.get(method):
+            self.locked[method] -= 1
+            raise sqlite3.OperationalError('database is locked')
+
+    def claim(self, *args, **kwargs):
+        self._check('claim')
+        return super().claim(*args, **kwargs)
+
+    def counts(self, *args, **kwargs):
+        self._check('counts')
+        return super().counts(*args, **kwargs)
+
+    def complete(self, *args, **kwargs):
+        self._check('complete')
+        return super().complete(*args, **kwargs)
+
+def resolve_payload(episode):
+    series = 'https://www.lightdl.xyz/2021/01/show.html'
+    url = f'https://files.example.com/lightdl/show.S01E0{episode}.mkv'
+    return url, {'series': series, 'link': {'url': url, 'season': 1, 'episode': episode, 'source': series, 'size': None, 'accept_ranges': None}}
+
+def test_worker_survives_locked_database(stand_in, tmp_path):
+    flaky = FlakyQueue(os.path.join(tmp_path, 'flaky.sqlite3'), locked={'claim': 2, 'counts': 1})
+    flaky.enqueue(JOB, WorkQueue.RESOLVE, *resolve_payload(1))
+
+    with scheduler.Scheduler() as sched:
+        worker = workqueue.Worker(flaky, sched, concurrency=1)
+        worker.IDLE_INTERVAL = 0.01
+        worker.run(exit_when_idle=True)
+
+    assert flaky.locked == {'claim': 0, 'counts': 0}
+    assert flaky.counts(JOB) == {'done': 1}
+    flaky.close()
+
+def test_worker_keeps_going_when_result_cannot_be_recorded(stand_in, tmp_path):
+    flaky = FlakyQueue(os.path.join(tmp_path, 'flaky.sqlite3'), locked={'complete': 1})
+    for episode in (1, 2):
+        flaky.enqueue(JOB, WorkQueue.RESOLVE, *resolve_payload(episode))
+
+    stop = threading.Event()
+    with scheduler.Scheduler() as sched:
+        worker = workqueue.Worker(flaky, sched, concurrency=1)
+        worker.IDLE_INTERVAL = 0.01
+        thread = threading.Thread(target=worker.run, args=(stop,))
+        thread.start()
+        deadline = time.monotonic() + 10
+        while flaky.counts(JOB).get('done') != 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stop.set()
+        thread.join()
+
+    #the task whose result was lost keeps its lease until it runs out, then goes to a worker again
+    assert flaky.counts(JOB) == {'done': 1, 'leased': 1}
+    flaky.close()